@@ -11,6 +11,8 @@ from django.utils.safestring import mark_safe
 from django.db.models import Sum, Count, Q
 from django.utils import timezone
 
+from core.utils.profiling import invalidate_profiled_users, profiled_users_timeout
+
 
 
 # =====================================================
@@ -24,12 +26,16 @@ class OrganizationAdmin(admin.ModelAdmin):
     readonly_fields = ['id', 'created_at', 'updated_at']
     ordering = ['-created_at']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(users_total=Count('customusers'))
+
     def total_users(self, obj):
-        count = obj.customusers.count()
+        count = obj.users_total
         # Adjust app name if CustomUser belongs to 'accounts' app
         url = reverse('admin:accounts_customuser_changelist') + f'?organization__id__exact={obj.id}'
         return format_html('<a href="{}">{} users</a>', url, count)
     total_users.short_description = 'Users'
+    total_users.admin_order_field = 'users_total'
     
 
 
@@ -40,9 +46,10 @@ class OrganizationAdmin(admin.ModelAdmin):
 class CustomUserAdmin(UserAdmin):
     model = CustomUser
     list_display = ['email', 'get_full_name', 'role', 'organization', 'is_owner', 'is_verified', 'is_active', 'status_badge', 'created_at']
-    list_filter = ['role', 'is_active', 'is_verified', 'is_owner', 'is_terminated', 'is_block', 'organization', 'created_at']
+    list_filter = ['role', 'is_active', 'is_verified', 'is_owner', 'is_terminated', 'is_block', 'profile_requests', 'organization', 'created_at']
     search_fields = ['email', 'first_name', 'last_name', 'phone']
     ordering = ['-created_at']
+    list_select_related = ['organization']
     readonly_fields = ['id', 'last_login', 'created_at', 'updated_at', 'user_activity']
     
     fieldsets = (
@@ -60,6 +67,10 @@ class CustomUserAdmin(UserAdmin):
         ('Status Flags', {
             'fields': ('is_verified', 'is_terminated', 'is_block')
         }),
+        ('Diagnostics', {
+            'fields': ('profile_requests',),
+            'classes': ('collapse',)
+        }),
         ('Activity', {
             'fields': ('user_activity',),
             'classes': ('collapse',)
@@ -112,6 +123,20 @@ class CustomUserAdmin(UserAdmin):
         return mark_safe(activity)
     user_activity.short_description = 'User Activity'
 
+    actions = ['enable_profiling', 'disable_profiling']
+
+    def enable_profiling(self, request, queryset):
+        updated = queryset.update(profile_requests=True)
+        invalidate_profiled_users()
+        self.message_user(request, f'Request profiling enabled for {updated} user(s); all workers follow within {profiled_users_timeout()}s.')
+    enable_profiling.short_description = 'Enable request profiling for selected users'
+
+    def disable_profiling(self, request, queryset):
+        updated = queryset.update(profile_requests=False)
+        invalidate_profiled_users()
+        self.message_user(request, f'Request profiling disabled for {updated} user(s); all workers follow within {profiled_users_timeout()}s.')
+    disable_profiling.short_description = 'Disable request profiling for selected users'
+
 
 
 
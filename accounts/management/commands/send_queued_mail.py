@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import QueuedMail
+from accounts.utils.mail import deliver_queued_mail
+
+
+class Command(BaseCommand):
+    help = (
+        "Send queued mails the background sender did not get to (e.g. lost with a restart) "
+        "or that failed. Run it from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, default=60,
+                            help="Only mails queued at least this many seconds ago (default 60), "
+                                 "so ones the background sender is still handling are left alone")
+        parser.add_argument("--max-attempts", type=int, default=5, help="Give up on a mail after this many failures")
+
+    def handle(self, *args, **options):
+        mails = QueuedMail.objects.filter(
+            sent_at__isnull=True,
+            attempts__lt=options["max_attempts"],
+            created_at__lte=timezone.now() - timedelta(seconds=options["older_than"]),
+        ).order_by("id").values_list("id", flat=True)
+        sent = failed = 0
+        for mail_id in list(mails):
+            if deliver_queued_mail(mail_id):
+                sent += 1
+            else:
+                failed += 1
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} queued mails, {failed} failed."))
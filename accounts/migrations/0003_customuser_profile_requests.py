@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_customuser_phone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='profile_requests',
+            field=models.BooleanField(default=False, help_text="Profile this user's requests (needs PROFILING_ENABLED)"),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_customuser_profile_requests'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='db_alias',
+            field=models.CharField(default='default', max_length=100),
+        ),
+    ]
@@ -21,6 +21,9 @@ class Organization(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    # Database (one of DATABASE_SHARDS) holding this organization's inventory data;
+    # change it only with `manage.py move_organization`
+    db_alias = models.CharField(max_length=100, default="default")
 
     def __str__(self):
         return self.name
@@ -51,6 +54,7 @@ class CustomUser(AbstractUser):
     is_active = models.BooleanField(default=True)
     is_terminated = models.BooleanField(default=False)
     is_block = models.BooleanField(default=False)
+    profile_requests = models.BooleanField(default=False, help_text="Profile this user's requests (needs PROFILING_ENABLED)")
 
     last_login = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True, blank=True)
@@ -154,3 +158,24 @@ class VerificationOTP(models.Model):
 
 #========================== OTP END ==========================
 
+
+
+# -----------------------
+# Outgoing mail queue
+# -----------------------
+class QueuedMail(models.Model):
+    """
+    Mails handed to the background sender. Stored in the same transaction as
+    the rows they are about, so a restart does not lose them: unsent rows are
+    retried by `manage.py send_queued_mail`. The payload (it may hold a
+    generated password) is cleared once the mail is sent.
+    """
+    id = models.BigAutoField(primary_key=True)
+    payload = models.JSONField(default=dict)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    def __str__(self):
+        return f"Mail {self.pk} ({'sent' if self.sent_at else 'queued'})"
@@ -1,7 +1,13 @@
 import random
 import string
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
 from rest_framework import serializers
 from accounts.models import CustomUser, Organization
+from accounts.utils.mail import queue_login_credentials_mail
+from accounts.utils.password import hash_passwords
+from core.utils.sharding import bulk_copy_to_shard, organization_db
 
 
 def generate_random_password(length=10):
@@ -86,3 +92,118 @@ class OperatorSerializer(serializers.ModelSerializer):
         # Attach generated password (for returning to API)
         user.generated_password = password
         return user
+
+
+
+# -----------------------
+# Bulk operator provisioning
+# -----------------------
+class OperatorBulkItemSerializer(serializers.Serializer):
+    # Plain fields on purpose: ModelSerializer would add a UniqueValidator per
+    # row (one query each); uniqueness is checked for the whole batch at once.
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default="")
+    last_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default="")
+    email = serializers.EmailField()
+    phone = serializers.CharField(max_length=20, required=False, allow_blank=True, allow_null=True, default=None)
+    password = serializers.CharField(write_only=True, required=False, allow_blank=True, default="")
+
+    def validate_phone(self, value):
+        return value or None
+
+
+class OperatorBulkCreateSerializer(serializers.Serializer):
+    MAX_OPERATORS = 500
+
+    operators = OperatorBulkItemSerializer(many=True, allow_empty=False, max_length=MAX_OPERATORS)
+    send_credentials = serializers.BooleanField(required=False, default=True)
+
+    def validate_operators(self, rows):
+        errors = [{} for _ in rows]
+
+        # Duplicates inside the uploaded batch
+        seen_emails, seen_phones = {}, {}
+        for index, row in enumerate(rows):
+            email = row["email"].lower()
+            if email in seen_emails:
+                errors[index]["email"] = [f"Duplicate of row {seen_emails[email] + 1}."]
+            seen_emails.setdefault(email, index)
+            phone = row["phone"]
+            if phone:
+                if phone in seen_phones:
+                    errors[index]["phone"] = [f"Duplicate of row {seen_phones[phone] + 1}."]
+                seen_phones.setdefault(phone, index)
+
+        # Collisions with existing users, in one query
+        taken = CustomUser.objects.annotate(email_lower=Lower("email")).filter(
+            Q(email_lower__in=list(seen_emails)) | Q(phone__in=list(seen_phones))
+        ).values_list("email", "phone")
+        taken_emails = {email.lower() for email, _ in taken}
+        taken_phones = {phone for _, phone in taken if phone}
+        for index, row in enumerate(rows):
+            if row["email"].lower() in taken_emails:
+                errors[index].setdefault("email", []).append("User with this email already exists.")
+            if row["phone"] in taken_phones:
+                errors[index].setdefault("phone", []).append("User with this phone already exists.")
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return rows
+
+    def create(self, validated_data):
+        request = self.context.get("request")
+        organization = request.user.organization
+        rows = validated_data["operators"]
+
+        passwords = [row["password"] or generate_random_password() for row in rows]
+        hashed_passwords = hash_passwords(passwords)
+        usernames = generate_unique_usernames([row["first_name"] for row in rows])
+
+        users = [
+            CustomUser(
+                username=username,
+                email=row["email"],
+                first_name=row["first_name"],
+                last_name=row["last_name"],
+                phone=row["phone"],
+                password=hashed_password,
+                organization=organization,
+                is_active=True,
+                is_verified=True,
+            )
+            for row, username, hashed_password in zip(rows, usernames, hashed_passwords)
+        ]
+
+        with transaction.atomic():
+            CustomUser.objects.bulk_create(users, batch_size=200)
+            bulk_copy_to_shard(users, organization_db(organization))
+            if validated_data["send_credentials"]:
+                # Queued with the users: sent after commit, dropped on rollback
+                for user, password in zip(users, passwords):
+                    queue_login_credentials_mail(user, password)
+
+        # Attach generated passwords (for returning to API)
+        for user, password in zip(users, passwords):
+            user.generated_password = password
+        return users
+
+
+def generate_unique_usernames(first_names):
+    """Build one username per name, checking collisions for the whole batch in one query."""
+    def candidate(first_name):
+        base_username = (first_name or "operator").replace(" ", "").lower()
+        random_suffix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=6))
+        return f"{base_username}{random_suffix}"
+
+    usernames = [candidate(first_name) for first_name in first_names]
+    while True:
+        taken = set(CustomUser.objects.filter(username__in=usernames).values_list("username", flat=True))
+        seen = set()
+        clashes = []
+        for index, username in enumerate(usernames):
+            if username in taken or username in seen:
+                clashes.append(index)
+            seen.add(username)
+        if not clashes:
+            return usernames
+        for index in clashes:
+            usernames[index] = candidate(first_names[index])
@@ -1,3 +1,159 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import check_password
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts import urls as accounts_urls
+from accounts.models import CustomUser, QueuedMail
+from accounts.utils import mail as mail_utils
+from core.utils.query_budget import QueryBudgetMixin, seed_organization, get_routes
+
+
+# =====================================================
+# API query budgets
+# =====================================================
+class AccountsRouteBudgetTests(QueryBudgetMixin, TestCase):
+    """Every GET route in accounts stays within query_budgets.json."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+        seed_organization("Other Budget Org")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_routes(self):
+        operator = CustomUser.objects.filter(organization=self.organization, role="operator").first()
+        url_kwargs = {
+            "operator-detail": {"id": operator.pk},
+        }
+        routes = {}
+        for route, pattern in get_routes(accounts_urls.urlpatterns, prefix="/api/"):
+            url = reverse(pattern.name, kwargs=url_kwargs.get(pattern.name))
+            routes[f"GET {route}"] = url
+        self.assert_route_budgets(routes)
+
+
+# =====================================================
+# Bulk operator provisioning
+# =====================================================
+class OperatorBulkCreateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Send on this thread: a background one cannot see the test transaction
+        self.enterContext(mock.patch.object(
+            mail_utils._mail_executor, "submit",
+            side_effect=lambda job, *args: mock.Mock(add_done_callback=lambda callback: job(*args)),
+        ))
+
+    def create(self, data, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse("operator-bulk-create"), data, **kwargs)
+
+    def test_json(self):
+        response = self.create({"operators": [
+            {"first_name": "Rahim", "email": "rahim@example.com", "phone": "01700000001"},
+            {"first_name": "Karim", "email": "karim@example.com", "password": "Given-pass-1"},
+        ], "send_credentials": False}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["count"], 2)
+        karim = CustomUser.objects.get(email="karim@example.com")
+        self.assertEqual(karim.organization, self.organization)
+        self.assertTrue(check_password("Given-pass-1", karim.password))
+        self.assertEqual(mail.outbox, [])
+
+    def test_csv_file_and_body(self):
+        upload = SimpleUploadedFile("operators.csv", b"first_name,email\nRahim,rahim@example.com\n", "text/csv")
+        self.assertEqual(self.create({"file": upload, "send_credentials": "false"}, format="multipart").status_code, 201)
+        response = self.create(
+            "first_name,email,phone\nKarim,karim@example.com,01700000002\n", content_type="text/csv",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(CustomUser.objects.get(email="karim@example.com").phone, "01700000002")
+
+    def test_duplicates_in_batch(self):
+        response = self.create({"operators": [
+            {"email": "same@example.com", "phone": "01700000003"},
+            {"email": "SAME@example.com", "phone": "01700000003"},
+        ]}, format="json")
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()["operators"]
+        self.assertIn("Duplicate of row 1.", errors[1]["email"])
+        self.assertIn("Duplicate of row 1.", errors[1]["phone"])
+        self.assertFalse(CustomUser.objects.filter(email__iexact="same@example.com").exists())
+
+    def test_collisions_with_existing_users_ignore_case(self):
+        response = self.create({"operators": [{"email": self.user.email.upper()}]}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("User with this email already exists.", response.json()["operators"][0]["email"])
+
+    @override_settings(PASSWORD_HASHING_WORKERS=2)
+    def test_hashes_on_the_process_pool(self):
+        operators = [{"email": f"pool{i}@example.com", "password": f"Pool-pass-{i}"} for i in range(4)]
+        response = self.create({"operators": operators, "send_credentials": False}, format="json")
+        self.assertEqual(response.status_code, 201)
+        user = CustomUser.objects.get(email="pool3@example.com")
+        self.assertTrue(check_password("Pool-pass-3", user.password))
+
+    def test_credential_mails_are_queued_and_sent(self):
+        response = self.create({"operators": [{"first_name": "Rahim", "email": "rahim@example.com"}]}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([message.to for message in mail.outbox], [["rahim@example.com"]])
+        queued = QueuedMail.objects.get()
+        self.assertIsNotNone(queued.sent_at)
+        self.assertEqual(queued.payload, {})  # the password is not kept
+
+    def test_unsent_mails_survive_for_the_retry_command(self):
+        # The process died before the background sender ran
+        with mock.patch.object(mail_utils, "submit_queued_mail"):
+            self.create({"operators": [{"email": "late@example.com"}]}, format="json")
+        self.assertEqual(mail.outbox, [])
+        call_command("send_queued_mail", older_than=0, stdout=mock.Mock())
+        self.assertEqual([message.to for message in mail.outbox], [["late@example.com"]])
+        self.assertIsNotNone(QueuedMail.objects.get().sent_at)
+
+
+# =====================================================
+# Token responses
+# =====================================================
+class TokenResponseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+        cls.user.phone = "01700000009"
+        cls.user.set_password("Login-pass-1")
+        cls.user.save()
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def post(self, path, data):
+        return self.client.post(path, data, format="json", HTTP_ACCEPT_ENCODING="gzip, br")
+
+    def test_tokens_are_not_compressed_or_cached(self):
+        login = self.post(reverse("user-login"), {"email": self.user.email, "password": "Login-pass-1"})
+        self.assertEqual(login.status_code, 200)
+        obtained = self.post("/api/access-token/", {
+            "username": self.user.username, "phone_number": self.user.phone, "password": "Login-pass-1",
+        })
+        self.assertEqual(obtained.status_code, 200)
+        refreshed = self.post("/api/refresh-token/", {"refresh": login.json()["refresh_token"]})
+        self.assertEqual(refreshed.status_code, 200, refreshed.content)
+        for response in (login, obtained, refreshed):
+            # Large enough to be compressed otherwise
+            self.assertGreater(len(response.content), 500)
+            self.assertFalse(response.has_header("Content-Encoding"))
+            self.assertIn("no-store", response["Cache-Control"])
+            self.assertIn("no-transform", response["Cache-Control"])
@@ -19,6 +19,7 @@ from accounts.view.views import (
 
 from accounts.view.operator_views import (
     OperatorCreateAPIView,
+    OperatorBulkCreateAPIView,
     OperatorListAPIView,
     OperatorDetailAPIView,
     OperatorDeleteAPIView,
@@ -52,6 +53,7 @@ urlpatterns = [
     #-------------------- User Management --------------------------
     path("user-list/", OperatorListAPIView.as_view(), name="operator-list"),
     path("user/create/", OperatorCreateAPIView.as_view(), name="operator-create"),
+    path("user/bulk-create/", OperatorBulkCreateAPIView.as_view(), name="operator-bulk-create"),
     path("user/<str:id>/details/", OperatorDetailAPIView.as_view(), name="operator-detail"),
     path("user/<str:id>/delete/", OperatorDeleteAPIView.as_view(), name="operator-delete"),
 
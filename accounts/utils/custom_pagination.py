@@ -1,4 +1,20 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 class OrderPagination(PageNumberPagination):
     page_size = 10  # Set 10 items per page
@@ -25,4 +41,201 @@ class CustomPageNumberPagination(PageNumberPagination):
             except (TypeError, ValueError):
                 pass
 
-        return self.page_size
\ No newline at end of file
+        return self.page_size
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids `SELECT COUNT(*)` on very large tables (the admin
+    changelists of Sale and StockMovement; API lists use keyset pagination,
+    which never counts).
+
+    On PostgreSQL the planner's row estimate is used (pg_class.reltuples for an
+    unfiltered table, EXPLAIN for a filtered one). Elsewhere the last exact count
+    for the same query is cached. Either way, estimates below
+    `PAGINATION_EXACT_COUNT_THRESHOLD` are replaced by an exact count so small
+    result sets stay accurate.
+    """
+    @property
+    def exact_count_threshold(self):
+        return getattr(settings, "PAGINATION_EXACT_COUNT_THRESHOLD", 10000)
+
+    @property
+    def count_cache_timeout(self):
+        return getattr(settings, "PAGINATION_COUNT_CACHE_TIMEOUT", 300)
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+
+        estimate = self.estimated_count()
+        if estimate is not None and estimate >= self.exact_count_threshold:
+            return estimate
+
+        count = self.object_list.count()
+        if count >= self.exact_count_threshold:
+            cache.set(self.count_cache_key(), count, self.count_cache_timeout)
+        return count
+
+    def estimated_count(self):
+        connection = connections[self.object_list.db]
+        if connection.vendor == "postgresql":
+            return self.planner_estimate(connection)
+        return cache.get(self.count_cache_key())
+
+    def planner_estimate(self, connection):
+        queryset = self.object_list
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+                # reltuples is -1 for tables that were never analyzed
+                return row[0] if row and row[0] >= 0 else None
+
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+
+    def count_cache_key(self):
+        sql, params = self.object_list.order_by().query.sql_with_params()
+        digest = hashlib.md5(f"{sql}|{params!r}".encode()).hexdigest()
+        return f"pagination-count:{self.object_list.db}:{digest}"
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset ("seek") pagination: each page is `WHERE (created_at, id) < cursor
+    ORDER BY created_at DESC, id DESC LIMIT n`, so deep pages cost the same as
+    the first and rows inserted meanwhile never shift or repeat a page.
+
+    The ordering must end in a unique field. Views may set `cursor_ordering`
+    (model fields only) to override the default newest-first order.
+    """
+    cursor_query_param = "cursor"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+    ordering = ("-created_at", "-id")
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = tuple(getattr(view, "cursor_ordering", None) or self.ordering)
+        self.fields = [queryset.model._meta.get_field(name.lstrip("-")) for name in self.ordering]
+
+        cursor = self.decode_cursor(request)
+        if cursor is None:
+            values, reverse = None, False
+        else:
+            values, reverse = cursor
+            queryset = queryset.filter(self.seek_filter(values, reverse))
+        ordering = self.flip(self.ordering) if reverse else self.ordering
+
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            # Walking backwards: we came from a later page, so there is always a next one
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    @staticmethod
+    def flip(ordering):
+        return tuple(name[1:] if name.startswith("-") else f"-{name}" for name in ordering)
+
+    def seek_filter(self, values, reverse):
+        """Rows strictly after `values` in the (possibly reversed) ordering, as one Q."""
+        seek = Q()
+        for index, name in enumerate(self.ordering):
+            descending = name.startswith("-") != reverse
+            lookup = "lt" if descending else "gt"
+            ties = {field.attname: value for field, value in zip(self.fields[:index], values)}
+            seek |= Q(**ties, **{f"{self.fields[index].attname}__{lookup}": values[index]})
+        return seek
+
+    # -----------------------
+    # Cursors
+    # -----------------------
+    @staticmethod
+    def cursor_value(row, field):
+        # Rows are model instances, or dicts on `.values()` querysets
+        value = row[field.attname] if isinstance(row, dict) else field.value_from_object(row)
+        return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+    def encode_cursor(self, row, reverse):
+        payload = {"v": [self.cursor_value(row, field) for field in self.fields]}
+        if reverse:
+            payload["r"] = 1
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+            values = [field.to_python(value) for field, value in zip(self.fields, payload["v"], strict=True)]
+        except (binascii.Error, ValueError, TypeError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, bool(payload.get("r"))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param, "required": False, "in": "query",
+                "description": "Opaque cursor taken from the `next` or `previous` link.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param, "required": False, "in": "query",
+                "description": f"Results per page (at most {self.max_page_size}).",
+                "schema": {"type": "integer"},
+            },
+        ]
@@ -1,5 +1,9 @@
+import logging
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
 
 from django.utils import timezone
 from django.core.mail import send_mail
@@ -11,17 +15,26 @@ from django.shortcuts import render
 from django.core.mail import EmailMultiAlternatives
 
 from accounts.utils.otp import generate_otp
-from accounts.models import Organization, CustomUser, OtpTypes, VerificationOTP, VerificationTokens, TokenTypes
+from core.utils.metrics import MAIL_QUEUE_DEPTH, REGISTRY
+from accounts.models import Organization, CustomUser, OtpTypes, QueuedMail, VerificationOTP, VerificationTokens, TokenTypes
 from django.contrib.auth import get_user_model
 User = get_user_model()
 
+logger = logging.getLogger("accounts.mail")
+
+
+# Background sender so API requests never wait on SMTP. Mails are stored in
+# QueuedMail first; ones lost with a restart are sent by `manage.py send_queued_mail`.
+_mail_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mail")
+
 
 # Send Mail-- New Updated Code 
 def send_mail(payload: dict) -> bool:
     email = payload['recipient_list']
     mail_type = payload['mail_type']
 
-    print("==============payload===========: ", payload)
+    # Never log the payload itself: credential mails carry a password
+    logger.info("Sending %s mail", mail_type)
     
     # Determine HTML template based on mail type
     if mail_type == 'registration':
@@ -53,7 +66,7 @@ def send_mail(payload: dict) -> bool:
         
     else:
         subject = 'Welcome to PIMS Word!'
-        print("Invalid mail type.")
+        logger.error("Invalid mail type %r", mail_type)
         return False
 
     # Render the HTML template with the context data
@@ -71,7 +84,7 @@ def send_mail(payload: dict) -> bool:
         to_email = email  # Use the email address directly if it's a string
 
     else:
-        print("Invalid email format.")
+        logger.error("Invalid recipient for %s mail", mail_type)
         return False
     
     # Create the email message object
@@ -81,8 +94,8 @@ def send_mail(payload: dict) -> bool:
     try:
         msg.send()
         return True
-    except Exception as e:
-        print(str(e))
+    except Exception:
+        logger.exception("Sending %s mail failed", mail_type)
         return False
     
     
@@ -129,9 +142,9 @@ def send_email_verification_token(user: User, email: str | None = None, name: st
     success = send_mail(payload)
     
     if success:
-        print(f"Verification email sent to {user.email}")
+        logger.info("Verification email sent to user %s", user.pk)
     else:
-        print(f"Failed to send verification email to {user.email}")
+        logger.warning("Failed to send verification email to user %s", user.pk)
 
 
 
@@ -180,10 +193,49 @@ def send_reset_otp_mail(user: User) -> None:
 
 
 
+def queue_mail(payload: dict) -> None:
+    """
+    Store a mail payload and hand it to the background sender once the
+    surrounding transaction commits. Call it inside the transaction that
+    creates what the mail is about: both are kept or lost together.
+    """
+    mail = QueuedMail.objects.create(payload=payload)
+    transaction.on_commit(lambda: submit_queued_mail(mail.pk))
+
 
+def submit_queued_mail(mail_id: int) -> None:
+    MAIL_QUEUE_DEPTH.inc()
+    _mail_executor.submit(deliver_queued_mail, mail_id).add_done_callback(_mail_done)
 
 
+def deliver_queued_mail(mail_id: int) -> bool:
+    """Send one queued mail unless it was sent already; the payload is cleared once sent."""
+    close_old_connections()
+    try:
+        mail = QueuedMail.objects.filter(pk=mail_id, sent_at__isnull=True).first()
+        if mail is None:
+            return False
+        if send_mail(mail.payload):
+            QueuedMail.objects.filter(pk=mail_id).update(sent_at=timezone.now(), payload={})
+            return True
+        QueuedMail.objects.filter(pk=mail_id).update(attempts=F("attempts") + 1, last_error="Sending failed")
+        return False
+    finally:
+        close_old_connections()
 
 
+def _mail_done(future) -> None:
+    MAIL_QUEUE_DEPTH.dec()
+    REGISTRY.maybe_flush()
 
 
+def queue_login_credentials_mail(user: User, password: str) -> None:
+    payload = {
+        "recipient_list": [user.email],
+        "mail_type": "login_reds",
+        "name": f"{user.first_name} {user.last_name}".strip() or user.email,
+        "email": user.email,
+        "username": user.username,
+        "password": password,
+    }
+    queue_mail(payload)
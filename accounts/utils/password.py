@@ -0,0 +1,59 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+
+# Below this many passwords a process pool costs more than it saves.
+PARALLEL_HASHING_THRESHOLD = 4
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    # A spawned worker starts from a fresh interpreter: load settings (PASSWORD_HASHERS) only
+    django.setup()
+
+
+def hashing_workers() -> int:
+    return getattr(settings, "PASSWORD_HASHING_WORKERS", min(4, os.cpu_count() or 1))
+
+
+def hashing_pool() -> ProcessPoolExecutor | None:
+    """
+    This process's hashing pool, created on first use and reused by every
+    request afterwards; None when PASSWORD_HASHING_WORKERS allows one worker.
+
+    Workers are spawned rather than forked, so they never inherit the web
+    worker's database connections, sockets or threads.
+    """
+    global _pool
+    workers = hashing_workers()
+    if workers <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker,
+            )
+        return _pool
+
+
+def hash_passwords(passwords: list[str]) -> list[str]:
+    """
+    Hash a batch of raw passwords, spreading the work across the hashing pool.
+
+    Password hashers are deliberately slow and hold the GIL, so threads don't
+    help; separate processes let a bulk import use every core. Order is kept.
+    """
+    pool = hashing_pool() if len(passwords) >= PARALLEL_HASHING_THRESHOLD else None
+    if pool is None:
+        return [make_password(password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (hashing_workers() * 4))
+    return list(pool.map(make_password, passwords, chunksize=chunksize))
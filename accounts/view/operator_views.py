@@ -1,4 +1,7 @@
+import csv
+import io
 from rest_framework.views import APIView
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser, BaseParser
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.shortcuts import get_object_or_404
@@ -8,7 +11,7 @@ from rest_framework.permissions import IsAuthenticated
 
 
 from accounts.models import CustomUser, Organization
-from accounts.serializer.operator_serializers import OperatorSerializer
+from accounts.serializer.operator_serializers import OperatorSerializer, OperatorBulkCreateSerializer
 
 
 # Filtering Class
@@ -39,7 +42,7 @@ class OperatorListAPIView(APIView):
         # ✅ Filter only operators in this organization
         queryset = CustomUser.objects.filter(
             organization=user.organization
-        )
+        ).select_related("organization")
 
         # Apply filters
         filterset = OperatorFilter(request.GET, queryset=queryset)
@@ -81,6 +84,68 @@ class OperatorCreateAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+# CSV body parser (text/csv uploads for bulk provisioning)
+class CSVTextParser(BaseParser):
+    media_type = "text/csv"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return {"csv": stream.read().decode("utf-8-sig")}
+
+
+def read_operator_rows(data, files):
+    """
+    Accepts `{"operators": [...]}`, a bare JSON list, an uploaded CSV `file`,
+    or a raw text/csv body. CSV headers match the JSON keys.
+    """
+    if "file" in files:
+        text = files["file"].read().decode("utf-8-sig")
+    elif isinstance(data, dict) and "csv" in data:
+        text = data["csv"]
+    elif isinstance(data, list):
+        return data
+    else:
+        return data.get("operators", [])
+
+    rows = []
+    for row in csv.DictReader(io.StringIO(text)):
+        rows.append({key.strip(): (value or "").strip() for key, value in row.items() if key})
+    return rows
+
+
+# Bulk Create Operators
+class OperatorBulkCreateAPIView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [JSONParser, MultiPartParser, FormParser, CSVTextParser]
+
+    def post(self, request):
+        # Operators cannot create new operators
+        if request.user.role == "operator":
+            return Response(
+                {"error": "User are not allowed to create new operators."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        # Must belong to an organization
+        if not request.user.organization:
+            return Response(
+                {"error": "You are not assigned to any organization."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        payload = {"operators": read_operator_rows(request.data, request.FILES)}
+        if not isinstance(request.data, list) and "send_credentials" in request.data:
+            payload["send_credentials"] = request.data.get("send_credentials")
+
+        serializer = OperatorBulkCreateSerializer(data=payload, context={"request": request})
+        if serializer.is_valid():
+            operators = serializer.save()
+            response_data = OperatorSerializer(operators, many=True).data
+            for item, operator in zip(response_data, operators):
+                item["password"] = operator.generated_password
+            return Response({"count": len(operators), "operators": response_data}, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
 # Operator Details
 class OperatorDetailAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -10,6 +10,7 @@ from django.contrib.auth import logout
 from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework.exceptions import AuthenticationFailed, ValidationError, ParseError
 from rest_framework.status import HTTP_200_OK, HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN
 import random, string
@@ -56,17 +57,18 @@ from accounts.utils.mail import send_mail, send_otp_mail, resend_otp_mail, send_
 
 from accounts.models import Organization, CustomUser, TokenTypes, VerificationTokens, OtpTypes, VerificationOTP
 from accounts.utils.otp import generate_otp, otp_send
+from core.utils.compression import CredentialResponseMixin
 
 
 
 #==================== Access and Refresh Token ===============
-class CustomTokenObtainPairView(TokenObtainPairView):
+class CustomTokenObtainPairView(CredentialResponseMixin, TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
 
 
 
-class CustomTokenRefreshView(TokenRefreshView):
+class CustomTokenRefreshView(CredentialResponseMixin, TokenRefreshView):
     def post(self, request, *args, **kwargs):
         try:
             refresh_token = request.data.get("refresh")
@@ -77,9 +79,9 @@ class CustomTokenRefreshView(TokenRefreshView):
             token = RefreshToken(refresh_token)
 
             # Get the user associated with the token
-            user_id = token['user_id']  # Extract user ID from the token
+            user_id = token[jwt_settings.USER_ID_CLAIM]  # Extract user ID from the token
             User = get_user_model()
-            user = User.objects.get(id=user_id)  # Retrieve user using user_id
+            user = User.objects.get(**{jwt_settings.USER_ID_FIELD: user_id})  # Retrieve user using user_id
 
             # Generate a new access token
             access_token = token.access_token
@@ -101,7 +103,7 @@ class CustomTokenRefreshView(TokenRefreshView):
 
 #==================== login(Phone) a user  ===============
 
-class UserLoginView(APIView):
+class UserLoginView(CredentialResponseMixin, APIView):
     permission_classes = [permissions.AllowAny]
 
     def post(self, request):
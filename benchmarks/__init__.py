@@ -0,0 +1,13 @@
+"""
+Micro-benchmarks for serializers, checkout, report builders and PDF rendering.
+
+Run from the project root:
+
+    python -m benchmarks                    # run and compare with baseline.json
+    python -m benchmarks --save-baseline    # record the current timings as the baseline
+    python -m benchmarks -k report          # only cases whose name contains "report"
+
+Everything runs against an in-memory SQLite database filled with a fixed
+synthetic dataset, so timings are repeatable on one machine. Compare results
+only against a baseline recorded on the same hardware.
+"""
@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+from pathlib import Path
+from time import perf_counter
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+import django  # noqa: E402
+
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+BASELINE_FILE = BENCHMARK_DIR / "baseline.json"
+RESULTS_FILE = BENCHMARK_DIR / "results" / "latest.json"
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run the micro-benchmark suite.")
+    parser.add_argument("-k", "--filter", default="", help="Only run cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case (after one warm-up run)")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown of the median over the baseline, as a fraction (default 0.25)")
+    parser.add_argument("--output", type=Path, default=RESULTS_FILE, help=f"Results file (default {RESULTS_FILE})")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE, help=f"Baseline file (default {BASELINE_FILE})")
+    parser.add_argument("--save-baseline", action="store_true", help="Write these results as the new baseline")
+    return parser.parse_args(argv)
+
+
+def time_case(function, fixture, repeat):
+    output = function(fixture)  # warm-up: template loading, query compilation, imports
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function(fixture)
+        timings.append((perf_counter() - start) * 1000)
+    result = {
+        "median_ms": round(statistics.median(timings), 2),
+        "min_ms": round(min(timings), 2),
+        "mean_ms": round(statistics.mean(timings), 2),
+        "runs": repeat,
+    }
+    # Cases returning a list of rows also report throughput
+    if isinstance(output, list) and result["median_ms"]:
+        result["rows"] = len(output)
+        result["rows_per_s"] = round(len(output) / result["median_ms"] * 1000)
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Print each case against the baseline and return the names that regressed."""
+    regressions = []
+    print(f"\n{'case':<32}{'median ms':>12}{'baseline':>12}{'change':>10}{'rows/s':>12}")
+    for name, result in results.items():
+        if "skipped" in result:
+            print(f"{name:<32}{'skipped':>12}  {result['skipped']}")
+            continue
+        throughput = f"{result['rows_per_s']:>12,}" if "rows_per_s" in result else f"{'-':>12}"
+        reference = baseline.get(name, {}).get("median_ms")
+        if reference is None:
+            print(f"{name:<32}{result['median_ms']:>12.2f}{'-':>12}{'new':>10}{throughput}")
+            continue
+        change = result["median_ms"] / reference - 1
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<32}{result['median_ms']:>12.2f}{reference:>12.2f}{change:>+10.0%}{throughput}{flag}")
+    return regressions
+
+
+def write_json(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as output_file:
+        json.dump(data, output_file, indent=2)
+        output_file.write("\n")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    django.setup()
+
+    from django.core.management import call_command
+    from benchmarks.cases import CASES, Fixture
+
+    call_command("migrate", verbosity=0)
+    print("Building fixture data...", flush=True)
+    fixture = Fixture()
+
+    results = {}
+    for name, function in CASES.items():
+        if args.filter not in name:
+            continue
+        print(f"Running {name}...", flush=True)
+        try:
+            results[name] = time_case(function, fixture, args.repeat)
+        except (ImportError, OSError) as exc:
+            # e.g. WeasyPrint without its system libraries; the other cases still run
+            results[name] = {"skipped": f"{type(exc).__name__}: {exc}".splitlines()[0]}
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "cases": results,
+    }
+    write_json(args.output, report)
+    print(f"Results written to {args.output}")
+
+    baseline = {}
+    if args.baseline.exists():
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)["cases"]
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one.")
+
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        # Keep cases that were not part of this (filtered) run
+        baseline.update({name: result for name, result in results.items() if "skipped" not in result})
+        write_json(args.baseline, dict(report, cases=baseline))
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than the baseline by more than {args.tolerance:.0%}: "
+              f"{', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import tempfile
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.test import override_settings
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from core.management.commands.generate_dataset import generate_organization
+from core.models import Product, Sale, StockMovement
+from core.serializers.all_serializers import (
+    ProductSerializer, ProductStockSerializer, SaleSerializer, StockMovementSerializer
+)
+from core.serializers.fast_serializers import (
+    FastProductSerializer, FastProductStockSerializer, FastSaleSummarySerializer, FastStockMovementSerializer
+)
+from core.utils import bootstrap, reports, snapshots
+
+
+FIXTURE_OPTIONS = {
+    "seed": 2024,
+    "users": 2,
+    "categories": 25,
+    "products": 10000,
+    "suppliers": 10,
+    "customers": 200,
+    "sales": 2000,
+    "max_items": 5,
+    "days": 90,
+    "skew": 1.1,
+    "chunk_size": 5000,
+}
+CHECKOUT_LINES = 50
+REPORT_DAYS = 30
+
+CASES = {}
+
+
+def benchmark(name):
+    """Register `function(fixture)` as the benchmark case `name`."""
+    def register(function):
+        CASES[name] = function
+        return function
+    return register
+
+
+class Fixture:
+    """The dataset every case runs against, built once per benchmark run."""
+
+    def __init__(self):
+        generate_organization(0, dict(FIXTURE_OPTIONS, password_hash=make_password("benchmark-pass")))
+        self.user = CustomUser.objects.select_related("organization").get(is_owner=True)
+        self.organization = self.user.organization
+        self.request = SimpleNamespace(user=self.user)
+
+        # Loaded up front so serializer cases time serialization, not the query
+        self.products = list(Product.objects.filter(organization=self.organization).select_related("category"))
+        self.checkout_payload = {
+            "invoice_number": "BENCH-CHECKOUT",
+            "discount": "0",
+            "paid_amount": "0",
+            "items": [
+                {"product": str(product.pk), "quantity": 1, "unit_price": str(product.sell_price)}
+                for product in sorted(self.products, key=lambda product: -product.current_stock)[:CHECKOUT_LINES]
+            ],
+        }
+        self.invoice = (
+            Sale.objects.filter(organization=self.organization)
+            .select_related("organization", "customer")
+            .order_by("-created_at")
+            .first()
+        )
+
+
+# -----------------------
+# Serializers
+# -----------------------
+@benchmark("serialize_products_10k")
+def serialize_products(fixture):
+    return ProductSerializer(fixture.products, many=True).data
+
+
+@benchmark("serialize_product_stock_10k")
+def serialize_product_stock(fixture):
+    return ProductStockSerializer(fixture.products, many=True).data
+
+
+# -----------------------
+# List endpoints: query + serialization, ModelSerializer vs ValuesSerializer
+# -----------------------
+@benchmark("list_products_10k")
+def list_products(fixture):
+    return ProductSerializer(Product.objects.filter(organization=fixture.organization), many=True).data
+
+
+@benchmark("list_products_10k_fast")
+def list_products_fast(fixture):
+    serializer = FastProductSerializer()
+    return serializer.serialize(serializer.values(Product.objects.filter(organization=fixture.organization)))
+
+
+@benchmark("list_stock_movements")
+def list_stock_movements(fixture):
+    return StockMovementSerializer(StockMovement.objects.filter(organization=fixture.organization), many=True).data
+
+
+@benchmark("list_stock_movements_fast")
+def list_stock_movements_fast(fixture):
+    serializer = FastStockMovementSerializer()
+    return serializer.serialize(serializer.values(StockMovement.objects.filter(organization=fixture.organization)))
+
+
+@benchmark("checkout_50_lines")
+def checkout(fixture):
+    # Rolled back so every run sells from the same stock levels
+    with transaction.atomic():
+        serializer = SaleSerializer(data=fixture.checkout_payload, context={"request": fixture.request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save(organization=fixture.organization)
+        transaction.set_rollback(True)
+
+
+# -----------------------
+# Report builders
+# -----------------------
+@benchmark("sales_report_30_days")
+def sales_report(fixture):
+    today = timezone.localdate()
+    sales = reports.sales_report_queryset(fixture.organization, today - timedelta(days=REPORT_DAYS), today)
+    serializer = FastSaleSummarySerializer()
+    return {
+        "summary": reports.sales_report_summary(sales),
+        "sales": serializer.serialize(serializer.values(sales)),
+    }
+
+
+@benchmark("stock_report")
+def stock_report(fixture):
+    products = reports.stock_report_queryset(fixture.organization)
+    serializer = FastProductStockSerializer()
+    return {
+        "summary": reports.stock_report_summary(products),
+        "products": serializer.serialize(serializer.values(products)),
+    }
+
+
+@benchmark("inventory_dashboard")
+def inventory_dashboard(fixture):
+    return reports.build_dashboard({
+        name: section(fixture.organization)
+        for name, section in reports.DASHBOARD_SECTIONS.items()
+    })
+
+
+# -----------------------
+# Offline catalog snapshot
+# -----------------------
+@benchmark("catalog_snapshot_10k")
+def catalog_snapshot(fixture):
+    with tempfile.TemporaryDirectory() as directory, override_settings(CATALOG_SNAPSHOT_DIR=directory):
+        digest = bootstrap.catalog_digest(fixture.organization, "default")
+        return snapshots.write_snapshot(fixture.organization, "default", digest).stat().st_size
+
+
+# -----------------------
+# PDF
+# -----------------------
+@benchmark("invoice_pdf")
+def invoice_pdf(fixture):
+    from weasyprint import HTML
+
+    html_string = render_to_string("invoices/invoice.html", {
+        "sale": fixture.invoice,
+        "org": fixture.organization,
+        "customer": fixture.invoice.customer,
+    })
+    return HTML(string=html_string).write_pdf()
+
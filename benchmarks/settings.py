@@ -0,0 +1,14 @@
+from inventory_project.settings import *  # noqa: F401,F403
+
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+# Fast hashing for fixture users; request logging would only add noise
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+MIDDLEWARE = [m for m in MIDDLEWARE if 'instrumentation' not in m]  # noqa: F405
+LOGGING = {'version': 1, 'disable_existing_loggers': False}
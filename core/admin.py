@@ -9,10 +9,12 @@ from django.utils import timezone
 
 from .models import (
     Category, Product, Supplier, Customer,
-    Sale, SaleItem, Purchase, PurchaseItem, StockMovement, ContactMessage
+    Sale, SaleItem, Purchase, PurchaseItem, StockMovement, ContactMessage, SlowQuery
 )
 
 from accounts.models import Organization, CustomUser
+from accounts.utils.custom_pagination import EstimatedCountPaginator
+from core.utils import admin_stats
 
 # =====================================================
 # Custom Admin Site Configuration
@@ -28,6 +30,17 @@ admin.site.index_title = 'Welcome to Inventory Management System Administration'
 
 
 
+# =====================================================
+# List Filters
+# =====================================================
+class CategoryListFilter(admin.RelatedFieldListFilter):
+    # Category.__str__ shows the organization; load it with the choices
+    def field_choices(self, field, request, model_admin):
+        ordering = self.field_admin_ordering(field, request, model_admin) or ['name']
+        categories = Category.objects.select_related('organization').order_by(*ordering)
+        return [(category.pk, str(category)) for category in categories]
+
+
 # =====================================================
 # Category Admin
 # =====================================================
@@ -38,6 +51,7 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ['name', 'description']
     readonly_fields = ['id', 'created_at']
     ordering = ['name']
+    list_select_related = ['organization']
     
     fieldsets = (
         ('Basic Information', {
@@ -49,11 +63,15 @@ class CategoryAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(products_total=Count('products'))
+
     def product_count(self, obj):
-        count = obj.products.count()
+        count = obj.products_total
         url = reverse('admin:core_product_changelist') + f'?category__id__exact={obj.id}'
         return format_html('<a href="{}">{} products</a>', url, count)
     product_count.short_description = 'Products'
+    product_count.admin_order_field = 'products_total'
 
 
 # =====================================================
@@ -63,11 +81,12 @@ class CategoryAdmin(admin.ModelAdmin):
 class ProductAdmin(admin.ModelAdmin):
     list_display = ['product_id', 'name', 'sku', 'category', 'organization', 'current_stock', 
                    'stock_status', 'sell_price', 'status', 'created_at']
-    list_filter = ['status', 'organization', 'category', 'unit', 'created_at']
+    list_filter = ['status', 'organization', ('category', CategoryListFilter), 'unit', 'created_at']
     search_fields = ['name', 'sku', 'product_id', 'barcode', 'description']
     readonly_fields = ['id', 'created_at', 'updated_at', 'profit_margin', 'product_details']
     ordering = ['-created_at']
     list_per_page = 50
+    list_select_related = ['category__organization', 'organization']
     
     fieldsets = (
         ('Basic Information', {
@@ -108,14 +127,8 @@ class ProductAdmin(admin.ModelAdmin):
     profit_margin.short_description = 'Profit Margin'
     
     def product_details(self, obj):
-        sales = obj.sale_items.aggregate(
-            total_sold=Sum('quantity'),
-            total_revenue=Sum('subtotal')
-        )
-        purchases = obj.purchase_items.aggregate(
-            total_purchased=Sum('quantity'),
-            total_cost=Sum('subtotal')
-        )
+        # One cached dict holds both the sales and purchase aggregates
+        sales = purchases = admin_stats.product_stats(obj)
         
         details = f"""
         <table style="width:100%; border-collapse: collapse;">
@@ -147,6 +160,7 @@ class SupplierAdmin(admin.ModelAdmin):
     search_fields = ['name', 'contact_person', 'email', 'phone']
     readonly_fields = ['id', 'created_at', 'updated_at', 'supplier_stats']
     ordering = ['-created_at']
+    list_select_related = ['organization']
     
     fieldsets = (
         ('Basic Information', {
@@ -168,17 +182,18 @@ class SupplierAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(purchases_total=Count('purchases'))
+
     def total_purchases(self, obj):
-        count = obj.purchases.count()
+        count = obj.purchases_total
         url = reverse('admin:core_purchase_changelist') + f'?supplier__id__exact={obj.id}'
         return format_html('<a href="{}">{} purchases</a>', url, count)
     total_purchases.short_description = 'Purchases'
+    total_purchases.admin_order_field = 'purchases_total'
     
     def supplier_stats(self, obj):
-        purchases = obj.purchases.aggregate(
-            total_purchases=Count('id'),
-            total_amount=Sum('total_amount')
-        )
+        purchases = admin_stats.supplier_stats(obj)
         
         stats = f"""
         <table style="width:100%; border-collapse: collapse;">
@@ -203,6 +218,7 @@ class CustomerAdmin(admin.ModelAdmin):
     search_fields = ['name', 'email', 'mobile']
     readonly_fields = ['id', 'created_at', 'updated_at', 'customer_stats']
     ordering = ['-created_at']
+    list_select_related = ['organization']
     
     fieldsets = (
         ('Basic Information', {
@@ -224,18 +240,18 @@ class CustomerAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(sales_total=Count('sales'))
+
     def total_sales(self, obj):
-        count = obj.sales.count()
+        count = obj.sales_total
         url = reverse('admin:core_sale_changelist') + f'?customer__id__exact={obj.id}'
         return format_html('<a href="{}">{} sales</a>', url, count)
     total_sales.short_description = 'Sales'
+    total_sales.admin_order_field = 'sales_total'
     
     def customer_stats(self, obj):
-        sales = obj.sales.aggregate(
-            total_sales=Count('id'),
-            total_amount=Sum('net_total'),
-            total_paid=Sum('paid_amount')
-        )
+        sales = admin_stats.customer_stats(obj)
         
         stats = f"""
         <table style="width:100%; border-collapse: collapse;">
@@ -274,6 +290,9 @@ class SaleAdmin(admin.ModelAdmin):
     search_fields = ['invoice_number', 'customer__name', 'notes']
     readonly_fields = ['id', 'created_at', 'updated_at', 'sale_summary']
     ordering = ['-created_at']
+    list_select_related = ['customer', 'organization', 'created_by']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     date_hierarchy = 'created_at'
     inlines = [SaleItemInline]
     
@@ -364,6 +383,7 @@ class PurchaseAdmin(admin.ModelAdmin):
     search_fields = ['purchase_number', 'supplier__name', 'notes']
     readonly_fields = ['id', 'created_at', 'updated_at', 'purchase_summary']
     ordering = ['-created_at']
+    list_select_related = ['supplier', 'organization', 'created_by']
     date_hierarchy = 'created_at'
     inlines = [PurchaseItemInline]
     
@@ -421,6 +441,9 @@ class StockMovementAdmin(admin.ModelAdmin):
     search_fields = ['product__name', 'reference_number', 'notes']
     readonly_fields = ['id', 'created_at']
     ordering = ['-created_at']
+    list_select_related = ['product', 'organization', 'created_by']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     date_hierarchy = 'created_at'
     
     fieldsets = (
@@ -489,3 +512,33 @@ class ContactMessageAdmin(admin.ModelAdmin):
     mark_as_unread.short_description = 'Mark selected messages as unread'
 
 
+# =====================================================
+# SlowQuery Admin
+# =====================================================
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ['short_fingerprint', 'short_sql', 'calls', 'total_ms', 'max_ms', 'call_site', 'last_seen']
+    list_filter = ['last_seen']
+    search_fields = ['fingerprint', 'normalized_sql', 'call_site', 'path']
+    list_select_related = ['organization']
+    ordering = ['-total_ms']
+    readonly_fields = [
+        'fingerprint', 'normalized_sql', 'sample_sql', 'calls', 'total_ms', 'max_ms', 'call_site',
+        'path', 'organization', 'formatted_explain', 'first_seen', 'last_seen',
+    ]
+    exclude = ['explain']
+
+    def has_add_permission(self, request):
+        return False
+
+    def short_fingerprint(self, obj):
+        return obj.fingerprint[:12]
+    short_fingerprint.short_description = 'Fingerprint'
+
+    def short_sql(self, obj):
+        return obj.normalized_sql[:120]
+    short_sql.short_description = 'SQL'
+
+    def formatted_explain(self, obj):
+        return format_html('<pre style="white-space:pre-wrap;">{}</pre>', obj.explain or '-')
+    formatted_explain.short_description = 'EXPLAIN'
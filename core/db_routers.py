@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from core.utils import replica, sharding
+
+
+class ShardRouter:
+    """
+    Sends sharded models to the active organization's database. Instances
+    already loaded from a shard keep using it (e.g. `product.save()`).
+    """
+
+    def db_for_model(self, model, **hints):
+        if not sharding.is_sharded(model):
+            return None
+        instance = hints.get("instance")
+        if instance is not None and sharding.is_sharded(type(instance)) and instance._state.db:
+            return instance._state.db
+        alias = sharding.active_db()
+        # On default, leave reads to the replica router
+        return alias if alias and alias != DEFAULT_DB_ALIAS else None
+
+    db_for_read = db_for_model
+    db_for_write = db_for_model
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Organizations and users are copied to every shard their tenant uses
+        if sharding.is_directory(type(obj1)) or sharding.is_directory(type(obj2)):
+            return True
+        return None
+
+
+class ReplicaRouter:
+    """Sends reads inside `read_from_replica()` to the replica; writes always go to default."""
+
+    def db_for_read(self, model, **hints):
+        return replica.db_for_read()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as default
+        primary_and_replica = {DEFAULT_DB_ALIAS, getattr(settings, "REPLICA_DATABASE_ALIAS", None)}
+        if {obj1._state.db, obj2._state.db} <= primary_and_replica:
+            return True
+        return None
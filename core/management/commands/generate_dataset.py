@@ -0,0 +1,280 @@
+import multiprocessing
+import random
+import uuid
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+from time import perf_counter
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from accounts.models import Organization, CustomUser
+from core.models import (
+    Category, Product, Supplier, Customer,
+    Sale, SaleItem, Purchase, PurchaseItem, StockMovement
+)
+
+
+class DatasetWriter:
+    """Buffers rows per model and writes them with chunked bulk_create, parents first."""
+
+    # FK order: a model is flushed only after the models it points to
+    ORDER = [Category, Product, Supplier, Customer, Purchase, PurchaseItem, Sale, SaleItem, StockMovement]
+
+    def __init__(self, chunk_size):
+        self.chunk_size = chunk_size
+        self.pending = {model: [] for model in self.ORDER}
+        self.written = Counter()
+
+    def add(self, obj):
+        rows = self.pending[type(obj)]
+        rows.append(obj)
+        if len(rows) >= self.chunk_size:
+            self.flush(upto=type(obj))
+
+    def flush(self, upto=None):
+        for model in self.ORDER:
+            rows = self.pending[model]
+            if rows:
+                model.objects.bulk_create(rows, batch_size=self.chunk_size)
+                self.written[model.__name__] += len(rows)
+                self.pending[model] = []
+            if model is upto:
+                break
+
+
+def make_uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def organization_rng(seed, index):
+    return random.Random(f"{seed}-{index}")
+
+
+def organization_id(seed, index):
+    """Id that generate_organization gives organization `index` of `seed` (its first draw)."""
+    return make_uuid(organization_rng(seed, index))
+
+
+def generate_organization(index, options):
+    """
+    Generate one organization's data. Runs in the main process or in a worker,
+    and only depends on (seed, index) so results are reproducible either way.
+    """
+    rng = organization_rng(options["seed"], index)
+    writer = DatasetWriter(options["chunk_size"])
+    now = timezone.now()
+    start = now - timedelta(days=options["days"])
+    token = f"{options['seed']}-{index}"
+
+    with transaction.atomic():
+        organization = Organization.objects.create(
+            id=make_uuid(rng), name=f"Dataset Org {index}", email=f"org{index}@dataset.local",
+            created_at=start,
+        )
+        users = [
+            CustomUser(
+                id=make_uuid(rng), username=f"dataset-{token}-user{i}", email=f"user{i}.{token}@dataset.local",
+                first_name=f"User{i}", organization=organization, role="admin" if i == 0 else "operator",
+                is_owner=i == 0, is_verified=True, password=options["password_hash"],
+            )
+            for i in range(options["users"])
+        ]
+        CustomUser.objects.bulk_create(users)
+
+        categories = [
+            Category(id=make_uuid(rng), organization=organization, name=f"Category {i}", created_at=start)
+            for i in range(options["categories"])
+        ]
+        for category in categories:
+            writer.add(category)
+
+        products = []
+        for i in range(options["products"]):
+            purchase_price = Decimal(rng.randint(20, 2000))
+            product = Product(
+                id=make_uuid(rng), organization=organization, category=rng.choice(categories),
+                product_id=f"DS-{token}-{i}", name=f"Product {i}", sku=f"DS-SKU-{token}-{i}",
+                barcode=f"DS-BC-{token}-{i}", purchase_price=purchase_price,
+                sell_price=(purchase_price * Decimal("1.25")).quantize(Decimal("1")),
+                reorder_level=rng.randint(5, 30), created_at=start + timedelta(days=rng.random() * options["days"] / 4),
+            )
+            products.append(product)
+
+        suppliers = [
+            Supplier(id=make_uuid(rng), organization=organization, name=f"Supplier {i}", created_at=start)
+            for i in range(options["suppliers"])
+        ]
+        customers = [
+            Customer(id=make_uuid(rng), organization=organization, name=f"Customer {i}", created_at=start)
+            for i in range(options["customers"])
+        ]
+
+        # Zipf-like popularity: product at rank r is sold ~ 1 / r**skew as often
+        ranked = products[:]
+        rng.shuffle(ranked)
+        cumulative_weights = list(accumulate(1 / (rank ** options["skew"]) for rank in range(1, len(ranked) + 1)))
+
+        # Decide every basket up front so opening stock can cover total demand
+        baskets = []
+        demand = Counter()
+        for i in range(options["sales"]):
+            lines = {}
+            for product in rng.choices(ranked, cum_weights=cumulative_weights, k=rng.randint(1, options["max_items"])):
+                lines[product] = lines.get(product, 0) + rng.randint(1, 3)
+            for product, quantity in lines.items():
+                demand[product] += quantity
+            baskets.append((start + timedelta(seconds=rng.random() * options["days"] * 86400), lines))
+        baskets.sort(key=lambda basket: basket[0])
+
+        # Opening stock: one purchase per product, enough for all sales plus a remainder
+        for product in products:
+            purchased = demand[product] + rng.randint(0, product.reorder_level * 3)
+            product.current_stock = purchased - demand[product]
+            writer.add(product)
+        for supplier in suppliers:
+            writer.add(supplier)
+        for customer in customers:
+            writer.add(customer)
+
+        for i, product in enumerate(products):
+            purchased = product.current_stock + demand[product]
+            if not purchased:
+                continue
+            subtotal = product.purchase_price * purchased
+            purchase = Purchase(
+                id=make_uuid(rng), organization=organization, purchase_number=f"DS-PUR-{token}-{i}",
+                supplier=rng.choice(suppliers) if suppliers else None, total_amount=subtotal,
+                created_by=users[0], created_at=start,
+            )
+            writer.add(purchase)
+            writer.add(PurchaseItem(
+                id=make_uuid(rng), purchase=purchase, product=product, quantity=purchased,
+                unit_price=product.purchase_price, subtotal=subtotal,
+            ))
+            writer.add(StockMovement(
+                id=make_uuid(rng), organization=organization, product=product, movement_type="in",
+                quantity=purchased, reference_number=purchase.purchase_number,
+                created_by=users[0], created_at=start,
+            ))
+
+        for i, (created_at, lines) in enumerate(baskets):
+            total_amount = sum(product.sell_price * quantity for product, quantity in lines.items())
+            discount = (total_amount * Decimal(rng.choice([0, 0, 0, 5, 10])) / 100).quantize(Decimal("0.01"))
+            net_total = total_amount - discount
+            payment_status = rng.choices(["paid", "partial", "due"], weights=[85, 10, 5])[0]
+            paid_amount = {
+                "paid": net_total, "partial": (net_total / 2).quantize(Decimal("0.01")), "due": Decimal(0),
+            }[payment_status]
+            sale = Sale(
+                id=make_uuid(rng), organization=organization, invoice_number=f"DS-INV-{token}-{i}",
+                customer=rng.choice(customers) if customers and rng.random() < 0.7 else None,
+                total_amount=total_amount, discount=discount, net_total=net_total,
+                paid_amount=paid_amount, payment_status=payment_status,
+                created_by=rng.choice(users), created_at=created_at,
+            )
+            writer.add(sale)
+            for product, quantity in lines.items():
+                writer.add(SaleItem(
+                    id=make_uuid(rng), sale=sale, product=product, quantity=quantity,
+                    unit_price=product.sell_price, subtotal=product.sell_price * quantity,
+                ))
+                writer.add(StockMovement(
+                    id=make_uuid(rng), organization=organization, product=product, movement_type="out",
+                    quantity=quantity, reference_number=sale.invoice_number,
+                    created_by=sale.created_by, created_at=created_at,
+                ))
+
+        writer.flush()
+
+    writer.written["CustomUser"] = len(users)
+    writer.written["Organization"] = 1
+    return dict(writer.written)
+
+
+def _generate_in_worker(args):
+    index, options = args
+    try:
+        return generate_organization(index, options)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic, internally consistent dataset (organizations, catalog, "
+        "sales, purchases and stock movements) for load and scale testing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--organizations", type=int, default=10)
+        parser.add_argument("--users", type=int, default=3, help="Users per organization (first one is the owner)")
+        parser.add_argument("--categories", type=int, default=10, help="Categories per organization")
+        parser.add_argument("--products", type=int, default=200, help="Products per organization")
+        parser.add_argument("--suppliers", type=int, default=10, help="Suppliers per organization")
+        parser.add_argument("--customers", type=int, default=100, help="Customers per organization")
+        parser.add_argument("--sales", type=int, default=1000, help="Sales per organization")
+        parser.add_argument("--max-items", type=int, default=5, help="Maximum lines per sale")
+        parser.add_argument("--days", type=int, default=365, help="Spread sales over this many past days")
+        parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for product popularity")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Rows per bulk_create batch")
+        parser.add_argument("--workers", type=int, default=1, help="Generate organizations in parallel processes")
+        parser.add_argument("--password", default="dataset-pass", help="Password for every generated user")
+        parser.add_argument(
+            "--flush", action="store_true",
+            help="Delete organizations a previous run with the same --seed created (and all their data) first",
+        )
+
+    def handle(self, *args, **options):
+        if options["products"] < 1 or options["categories"] < 1 or options["users"] < 1:
+            raise CommandError("--products, --categories and --users must be at least 1.")
+
+        workers = options["workers"]
+        if workers > 1 and connection.vendor == "sqlite":
+            self.stderr.write(self.style.WARNING("SQLite allows a single writer; falling back to --workers 1."))
+            workers = 1
+
+        # Ids depend only on (seed, index): a re-run would collide with the previous run's rows
+        existing = Organization.objects.filter(
+            id__in=[organization_id(options["seed"], index) for index in range(options["organizations"])]
+        )
+        if existing.exists():
+            if not options["flush"]:
+                raise CommandError(
+                    f"{existing.count()} organization(s) generated with --seed {options['seed']} already exist. "
+                    "Pass --flush to replace them or choose another --seed."
+                )
+            with transaction.atomic():
+                # Sale and purchase lines protect their products, so they go before the cascade
+                deleted = sum(
+                    model.objects.filter(organization__in=existing).delete()[0] for model in (Sale, Purchase)
+                )
+                deleted += existing.delete()[0]
+            self.stdout.write(f"Flushed {deleted} rows from the previous run")
+
+        # Hash once: every generated user shares the password
+        options["password_hash"] = make_password(options["password"])
+        jobs = [(index, options) for index in range(options["organizations"])]
+
+        started = perf_counter()
+        totals = Counter()
+        if workers > 1:
+            connections.close_all()  # children must not share the parent's connections
+            with multiprocessing.get_context("fork").Pool(workers) as pool:
+                for written in pool.imap_unordered(_generate_in_worker, jobs):
+                    totals.update(written)
+                    self.stdout.write(f"Organization done: {written}")
+        else:
+            for job in jobs:
+                written = generate_organization(*job)
+                totals.update(written)
+                self.stdout.write(f"Organization {job[0] + 1}/{len(jobs)} done")
+
+        elapsed = perf_counter() - started
+        summary = ", ".join(f"{name}: {count}" for name, count in sorted(totals.items()))
+        self.stdout.write(self.style.SUCCESS(f"Generated in {elapsed:.1f}s - {summary}"))
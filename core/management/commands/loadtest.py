@@ -0,0 +1,239 @@
+import asyncio
+import json
+import random
+import threading
+import uuid
+from collections import defaultdict
+from time import perf_counter
+
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+
+
+DEFAULT_MIX = "login=1,catalog=10,checkout=4,invoice=1,dashboard=2"
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in PosWorkflow.SCENARIOS:
+            raise CommandError(f"Unknown scenario '{name}'. Choose from: {', '.join(PosWorkflow.SCENARIOS)}")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f"Invalid weight for '{name}': {weight}")
+    return mix
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies = defaultdict(list)  # endpoint -> [ms]
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, elapsed_ms, status_code):
+        self.latencies[endpoint].append(elapsed_ms)
+        self.statuses[endpoint][status_code] += 1
+        if status_code >= 400:
+            self.errors[endpoint] += 1
+
+    def report(self, elapsed_s, concurrency):
+        endpoints = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            endpoints[endpoint] = {
+                "requests": len(values),
+                "errors": self.errors[endpoint],
+                "statuses": dict(self.statuses[endpoint]),
+                "throughput_rps": round(len(values) / elapsed_s, 2),
+                "mean_ms": round(sum(values) / len(values), 2),
+                "p50_ms": round(percentile(values, 50), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+                "p99_ms": round(percentile(values, 99), 2),
+                "max_ms": round(values[-1], 2),
+            }
+        total = sum(len(values) for values in self.latencies.values())
+        return {
+            "duration_s": round(elapsed_s, 2),
+            "concurrency": concurrency,
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "throughput_rps": round(total / elapsed_s, 2),
+            "endpoints": endpoints,
+        }
+
+
+class PosWorkflow:
+    """One simulated till: its own HTTP client and the sales it has rung up."""
+
+    SCENARIOS = ("login", "catalog", "checkout", "invoice", "dashboard")
+
+    def __init__(self, base_url, email, password, stats, rng):
+        self.email = email
+        self.password = password
+        self.stats = stats
+        self.rng = rng
+        self.client = httpx.AsyncClient(base_url=base_url.rstrip("/"), timeout=60)
+        self.logged_in = False
+        self.products = []
+        self.sale_ids = []
+
+    async def request(self, endpoint, method, path, **kwargs):
+        start = perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+            status_code = response.status_code
+        except httpx.HTTPError:
+            response, status_code = None, 599
+        self.stats.record(endpoint, (perf_counter() - start) * 1000, status_code)
+        return response
+
+    @staticmethod
+    def results(payload):
+        # List endpoints may be paginated or return a bare list
+        return payload["results"] if isinstance(payload, dict) and "results" in payload else payload
+
+    async def login(self):
+        """A failed login is recorded like any other error; the till retries before its next scenario."""
+        response = await self.request(
+            "login", "POST", "/api/user-login/", json={"email": self.email, "password": self.password},
+        )
+        self.logged_in = response is not None and response.status_code == 200
+        if self.logged_in:
+            self.client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        return self.logged_in
+
+    async def catalog(self):
+        response = await self.request("products", "GET", "/api/products/")
+        await self.request("categories", "GET", "/api/categories/")
+        if response is not None and response.status_code == 200:
+            self.products = [product for product in self.results(response.json()) if product["current_stock"] > 0]
+
+    async def checkout(self):
+        if not self.products:
+            await self.catalog()
+        if not self.products:
+            return
+        basket = self.rng.sample(self.products, k=min(len(self.products), self.rng.randint(1, 5)))
+        payload = {
+            "invoice_number": f"LT-{uuid.uuid4().hex[:16]}",
+            "paid_amount": "0",
+            "items": [
+                {"product": product["id"], "quantity": 1, "unit_price": product["sell_price"]}
+                for product in basket
+            ],
+        }
+        response = await self.request("checkout", "POST", "/api/sales/", json=payload)
+        if response is not None and response.status_code == 201:
+            self.sale_ids.append(response.json()["id"])
+
+    async def invoice(self):
+        if not self.sale_ids:
+            await self.checkout()
+        if self.sale_ids:
+            await self.request("invoice_pdf", "GET", f"/api/v1/invoices/{self.rng.choice(self.sale_ids)}/pdf/")
+
+    async def dashboard(self):
+        await self.request("dashboard", "GET", "/api/v1/dashboard/inventory/")
+
+    async def run(self, scenario):
+        if scenario != "login" and not self.logged_in and not await self.login():
+            return
+        await getattr(self, scenario)()
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a weighted mix of POS workflows (login, catalog fetch, checkout, invoice PDF, "
+        "dashboard) at a given concurrency and report per-endpoint latency percentiles and "
+        "throughput as JSON. Without --url a local server is started against the configured "
+        "database, e.g. one filled by generate_dataset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Base URL of a running server; default starts a local one")
+        parser.add_argument("--email", required=True, help="Login email of an organization user")
+        parser.add_argument("--password", required=True)
+        parser.add_argument("--concurrency", type=int, default=10, help="Simulated tills running in parallel")
+        parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+        parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Scenario weights (default: {DEFAULT_MIX})")
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options["mix"])
+        server = None
+        base_url = options["url"]
+        if not base_url:
+            server = ThreadedWSGIServer(("127.0.0.1", 0), QuietRequestHandler)
+            server.set_app(get_internal_wsgi_application())
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{server.server_port}"
+            self.stderr.write(f"Started local server on {base_url}")
+
+        try:
+            report = asyncio.run(self.run_load(base_url, mix, options))
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as report_file:
+                report_file.write(output + "\n")
+            self.stderr.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    async def run_load(self, base_url, mix, options):
+        concurrency = options["concurrency"]
+        stats = LoadStats()
+        rng = random.Random(options["seed"])
+        scenarios, weights = zip(*mix.items())
+
+        tills = [
+            PosWorkflow(base_url, options["email"], options["password"], stats, random.Random(rng.random()))
+            for _ in range(concurrency)
+        ]
+        try:
+            logged_in = await asyncio.gather(*(till.login() for till in tills))
+            if not any(logged_in):
+                raise CommandError(f"Login failed for {options['email']}; check --email/--password.")
+            if not all(logged_in):
+                self.stderr.write(self.style.WARNING(
+                    f"{logged_in.count(False)} of {concurrency} tills could not log in; they retry during the run."
+                ))
+            await asyncio.gather(*(till.catalog() for till in tills if till.logged_in))
+
+            # Warm-up requests above are not part of the measured run
+            stats = LoadStats()
+            for till in tills:
+                till.stats = stats
+            started = perf_counter()
+            deadline = started + options["duration"]
+
+            async def drive(till):
+                while perf_counter() < deadline:
+                    await till.run(till.rng.choices(scenarios, weights=weights)[0])
+
+            await asyncio.gather(*(drive(till) for till in tills))
+            return stats.report(perf_counter() - started, concurrency)
+        finally:
+            await asyncio.gather(*(till.client.aclose() for till in tills))
@@ -0,0 +1,88 @@
+from itertools import islice
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from accounts.models import Organization, CustomUser
+from core.utils.sharding import (
+    copy_to_shard, forget_organization_db, organization_db, organization_querysets, shard_aliases,
+    shard_local_querysets,
+)
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Move one organization's inventory data to another database in DATABASE_SHARDS. "
+        "Rows are copied in one transaction on the target, verified, the organization is "
+        "switched over, and only then removed from the source. Run it while the organization "
+        "is idle: writes made during the copy are not carried over."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("organization", help="Organization id")
+        parser.add_argument("target", help="Target database alias")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--keep-source", action="store_true", help="Leave the copied rows on the source")
+        parser.add_argument("--dry-run", action="store_true", help="Only print what would be moved")
+
+    def handle(self, *args, **options):
+        try:
+            organization = Organization.objects.get(pk=options["organization"])
+        except (Organization.DoesNotExist, ValueError):
+            raise CommandError(f"Organization {options['organization']} does not exist.")
+
+        source, target = organization_db(organization), options["target"]
+        if target not in shard_aliases():
+            raise CommandError(f"'{target}' is not in DATABASE_SHARDS: {', '.join(shard_aliases())}")
+        if target == source:
+            raise CommandError(f"{organization} is already on '{target}'.")
+
+        querysets = list(organization_querysets(organization, source))
+        counts = {model.__name__: queryset.count() for model, queryset in querysets}
+        summary = ", ".join(f"{name}: {count}" for name, count in counts.items())
+        self.stdout.write(f"Moving {organization} from '{source}' to '{target}' ({summary})")
+        if options["dry_run"]:
+            return
+
+        started = perf_counter()
+        users = list(CustomUser.objects.filter(organization=organization))
+        with transaction.atomic(using=target):
+            # Directory rows first so the copied rows' foreign keys resolve on the target
+            copy_to_shard(organization, target)
+            for user in users:
+                copy_to_shard(user, target)
+            for model, queryset in querysets:
+                for batch in batches(queryset.iterator(chunk_size=options["batch_size"]), options["batch_size"]):
+                    model.objects.using(target).bulk_create(batch)
+                copied = queryset.using(target).count()
+                if copied != counts[model.__name__]:
+                    raise CommandError(
+                        f"{model.__name__}: copied {copied} of {counts[model.__name__]} rows; nothing was changed."
+                    )
+                self.stdout.write(f"  {model.__name__}: {copied}")
+
+        # Switch over; update() so the shard-copy signal does not fire mid-move
+        for alias in {DEFAULT_DB_ALIAS, source, target}:
+            Organization.objects.using(alias).filter(pk=organization.pk).update(db_alias=target)
+        forget_organization_db(organization.pk)
+
+        if not options["keep_source"]:
+            with transaction.atomic(using=source):
+                for model, queryset in reversed(querysets):
+                    queryset.delete()
+                for model, queryset in shard_local_querysets(organization, source):
+                    queryset.delete()
+                if source != DEFAULT_DB_ALIAS:
+                    CustomUser.objects.using(source).filter(organization=organization.pk).delete()
+                    Organization.objects.using(source).filter(pk=organization.pk).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {organization} to '{target}' in {perf_counter() - started:.1f}s"
+        ))
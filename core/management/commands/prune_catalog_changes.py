@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.utils.catalog_sync import prune_changes, retention
+from core.utils.sharding import shard_aliases
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete catalog change-log rows older than CATALOG_CHANGE_RETENTION_DAYS on every "
+        "shard. Terminals holding an older cursor get `reset` and download the catalog again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Keep this many days instead of the setting")
+
+    def handle(self, *args, **options):
+        older_than = timedelta(days=options["days"]) if options["days"] else retention()
+        for alias in shard_aliases():
+            deleted = prune_changes(alias, older_than)
+            self.stdout.write(f"  {alias}: {deleted}")
+        self.stdout.write(self.style.SUCCESS(f"Pruned changes older than {older_than.days} days."))
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import SlowQuery
+
+
+ORDERINGS = {
+    "total": "-total_ms",
+    "max": "-max_ms",
+    "calls": "-calls",
+    "avg": "-avg",
+}
+
+
+class Command(BaseCommand):
+    help = "Print the slowest query fingerprints recorded by the slow-query log."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--order-by", choices=ORDERINGS, default="total",
+                            help="Rank by total time (default), worst single run, call count or average")
+        parser.add_argument("--organization", help="Only fingerprints last seen for this organization id")
+        parser.add_argument("--days", type=int, help="Only fingerprints seen in the last N days")
+        parser.add_argument("--explain", action="store_true", help="Also print the captured EXPLAIN plans")
+        parser.add_argument("--reset", action="store_true", help="Delete all recorded slow queries and exit")
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} slow query fingerprints."))
+            return
+
+        queries = SlowQuery.objects.annotate(avg=F("total_ms") / F("calls"))
+        if options["organization"]:
+            queries = queries.filter(organization_id=options["organization"])
+        if options["days"]:
+            queries = queries.filter(last_seen__gte=timezone.now() - timedelta(days=options["days"]))
+        queries = queries.order_by(ORDERINGS[options["order_by"]])[:options["limit"]]
+
+        if not queries:
+            self.stdout.write("No slow queries recorded.")
+            return
+
+        for rank, query in enumerate(queries, start=1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"#{rank} {query.fingerprint[:12]}  calls={query.calls}  total={query.total_ms:.0f}ms  "
+                f"avg={query.avg_ms:.0f}ms  max={query.max_ms:.0f}ms"
+            ))
+            self.stdout.write(f"  sql:       {query.normalized_sql[:500]}")
+            self.stdout.write(f"  call site: {query.call_site or '-'}")
+            self.stdout.write(f"  last seen: {query.last_seen:%Y-%m-%d %H:%M} on {query.path or '-'} "
+                              f"(organization {query.organization_id or '-'})")
+            if options["explain"] and query.explain:
+                self.stdout.write("  plan:")
+                for line in query.explain.splitlines():
+                    self.stdout.write(f"    {line}")
+            self.stdout.write("")
@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from core.utils.compression import (
+    accepted_encoding, compress_bytes, compress_stream, compress_stream_async, compression_level, is_compressible,
+)
+
+
+class CompressionMiddleware:
+    """
+    Brotli or gzip responses, negotiated from Accept-Encoding (brotli preferred).
+
+    Skipped: bodies under COMPRESSION_MIN_SIZE, types in COMPRESSION_SKIP_TYPES
+    (PDFs, images, archives), responses that already have a Content-Encoding
+    and `Cache-Control: no-transform` (responses carrying tokens, see
+    CredentialResponseMixin). Streaming responses (exports, snapshot
+    files) are compressed incrementally. Levels per content type come from
+    COMPRESSION_LEVELS.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, "COMPRESSION_MIN_SIZE", 500)
+        self.flush_bytes = getattr(settings, "COMPRESSION_STREAM_FLUSH_BYTES", 16384)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not 200 <= response.status_code < 300 or response.status_code == 204:
+            return response
+        if response.has_header("Content-Encoding") or "no-transform" in response.get("Cache-Control", ""):
+            return response
+        content_type = response.get("Content-Type", "")
+        if not is_compressible(content_type):
+            return response
+
+        # Whatever the outcome below, caches must key on Accept-Encoding
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = accepted_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+        level = compression_level(content_type, encoding)
+
+        if response.streaming:
+            length = response.get("Content-Length")
+            if length is not None and int(length) < self.min_size:
+                return response
+            if response.is_async:
+                response.streaming_content = compress_stream_async(
+                    response.streaming_content, encoding, level, self.flush_bytes,
+                )
+            else:
+                response.streaming_content = compress_stream(
+                    response.streaming_content, encoding, level, self.flush_bytes,
+                )
+            del response["Content-Length"]
+        else:
+            if len(response.content) < self.min_size:
+                return response
+            compressed = compress_bytes(response.content, encoding, level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # The body is no longer byte-identical to the uncompressed one
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = f"W/{etag}"
+        response["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,86 @@
+import json
+import logging
+import random
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from core.utils import metrics as prometheus
+from core.utils.instrumentation import collect_metrics
+
+
+logger = logging.getLogger("core.instrumentation")
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Records query count, DB time, serializer time and total time per request.
+
+    The figures are returned in a `Server-Timing` header and logged as one JSON
+    line. Requests slower than SLOW_REQUEST_THRESHOLD_MS are sampled
+    (SLOW_REQUEST_SAMPLE_RATE) and logged with their slowest and repeated SQL.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_threshold = getattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 1000)
+        self.slow_sample_rate = getattr(settings, "SLOW_REQUEST_SAMPLE_RATE", 1.0)
+        self.slow_trace_queries = getattr(settings, "SLOW_REQUEST_TRACE_QUERIES", 10)
+
+    def __call__(self, request):
+        with collect_metrics() as metrics, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics.query_wrapper))
+            response = self.get_response(request)
+
+        total_time = metrics.total_time
+        db_time = metrics.db_time
+        serializer_time = metrics.timings.get("serializer", 0.0)
+
+        server_timing = [
+            f'db;dur={db_time:.1f};desc="{metrics.query_count} queries"',
+            f"serializer;dur={serializer_time:.1f}",
+        ]
+        server_timing += [
+            f"{name};dur={duration:.1f}"
+            for name, duration in metrics.timings.items() if name != "serializer"
+        ]
+        server_timing.append(f"total;dur={total_time:.1f}")
+        response["Server-Timing"] = ", ".join(server_timing)
+
+        user = getattr(request, "user", None)
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "route": getattr(request.resolver_match, "route", None),
+            "status": response.status_code,
+            "organization_id": str(getattr(user, "organization_id", None) or "") or None,
+            "queries": metrics.query_count,
+            "db_ms": round(db_time, 1),
+            "serializer_ms": round(serializer_time, 1),
+            "total_ms": round(total_time, 1),
+        }
+        logger.info(json.dumps(record))
+
+        route = record["route"] or "unmatched"
+        prometheus.REQUEST_LATENCY.observe(
+            total_time / 1000, method=request.method, route=route, status=response.status_code,
+        )
+        prometheus.DB_QUERIES.inc(metrics.query_count, route=route)
+        prometheus.DB_QUERIES_PER_REQUEST.observe(metrics.query_count, route=route)
+        prometheus.DB_TIME.inc(db_time / 1000, route=route)
+        prometheus.REGISTRY.maybe_flush()
+
+        if total_time >= self.slow_threshold and random.random() < self.slow_sample_rate:
+            record["slowest_queries"] = [
+                {"sql": sql, "ms": round(duration, 1)}
+                for sql, duration in metrics.slowest_queries(self.slow_trace_queries)
+            ]
+            record["repeated_queries"] = [
+                {"sql": sql, "count": count}
+                for sql, count in list(metrics.repeated_queries().items())[:self.slow_trace_queries]
+            ]
+            logger.warning(json.dumps(record))
+
+        return response
@@ -0,0 +1,92 @@
+import logging
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import reverse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from core.utils.profiling import RequestProfiler, profiled_user_ids
+
+
+logger = logging.getLogger("core.profiling")
+
+
+def profiling_dir():
+    return Path(getattr(settings, "PROFILING_DIR", Path(settings.BASE_DIR) / "var" / "profiles"))
+
+
+class RequestProfilingMiddleware:
+    """
+    Profiles individual live requests on demand.
+
+    A request is profiled when a staff user sends the PROFILING_HEADER header,
+    or when its user has `profile_requests` switched on in the admin. The
+    cProfile stats and a collapsed-stack file are saved under PROFILING_DIR
+    (outside MEDIA_ROOT) and their staff-only download URLs returned in the
+    `X-Profile` response header.
+
+    Unless PROFILING_ENABLED is set the middleware removes itself at startup,
+    so it costs nothing when off.
+    """
+
+    # cProfile can only trace one request at a time
+    _lock = threading.Lock()
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = getattr(settings, "PROFILING_HEADER", "X-Profile")
+        self.directory = profiling_dir()
+        self.sample_interval = getattr(settings, "PROFILING_SAMPLE_INTERVAL_MS", 5) / 1000
+        self.jwt_authentication = JWTAuthentication()
+
+    def __call__(self, request):
+        if not self.should_profile(request) or not self._lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            with RequestProfiler(self.directory, f"{request.method} {request.path}", self.sample_interval) as profiler:
+                response = self.get_response(request)
+        finally:
+            self._lock.release()
+
+        response[self.header] = ", ".join(
+            reverse("profile-download", args=[f"{profiler.name}{suffix}"]) for suffix in (".prof", ".collapsed")
+        )
+        logger.info("Profiled %s %s -> %s.prof", request.method, request.path, profiler.name)
+        return response
+
+    def should_profile(self, request):
+        requested = self.header in request.headers
+        enabled_users = profiled_user_ids()
+        if not requested and not enabled_users:
+            return False
+
+        # Session users (admin) are already resolved; API clients carry a JWT
+        user = request.user if request.user.is_authenticated else None
+        if user is not None:
+            return user.is_staff if requested else str(user.pk) in enabled_users
+
+        token = self.validated_token(request)
+        if token is None:
+            return False
+        if not requested:
+            return str(token.get(jwt_settings.USER_ID_CLAIM)) in enabled_users
+        try:
+            return self.jwt_authentication.get_user(token).is_staff
+        except AuthenticationFailed:
+            return False
+
+    def validated_token(self, request):
+        header = self.jwt_authentication.get_header(request)
+        raw_token = self.jwt_authentication.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        try:
+            return self.jwt_authentication.get_validated_token(raw_token)
+        except AuthenticationFailed:
+            return None
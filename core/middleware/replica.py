@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.utils.replica import (
+    pin_to_primary, pinned_user_id, reset_pinned_user, reset_sticky, set_pinned_user, set_sticky,
+)
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Read-your-writes for replica routing: a successful unsafe request pins its
+    user to the primary for REPLICA_STICKY_SECONDS with a signed cookie, so
+    whichever worker serves the next request sees it. Session users (admin)
+    are checked here; JWT users are checked by ReplicaReadMixin once DRF has
+    authenticated them.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REPLICA_DATABASE_ALIAS", None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = set_pinned_user(pinned_user_id(request))
+        sticky = set_sticky(request.user)
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_sticky(sticky)
+            reset_pinned_user(pinned)
+
+        if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+            # DRF has replaced request.user with the token user by now
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(response, user.pk, secure=request.is_secure())
+        return response
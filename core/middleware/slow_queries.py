@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.utils.slow_queries import record_slow_queries, submit_events
+
+
+class SlowQueryLogMiddleware:
+    """
+    Records queries slower than SLOW_QUERY_THRESHOLD_MS with the request path
+    and organization; they are saved on a background thread. Set the
+    threshold to None to remove the middleware.
+
+    Sits outside RequestInstrumentationMiddleware so writing the log is not
+    counted in the request's own query figures.
+    """
+
+    def __init__(self, get_response):
+        self.threshold = getattr(settings, "SLOW_QUERY_THRESHOLD_MS", None)
+        if self.threshold is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_slow_queries(self.threshold) as recorder:
+            response = self.get_response(request)
+        if recorder.events:
+            # DRF sets the JWT user on the underlying request during the view
+            user = getattr(request, "user", None)
+            submit_events(recorder.events, path=request.path, organization_id=getattr(user, "organization_id", None))
+        return response
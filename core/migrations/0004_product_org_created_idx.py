@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_organization_db_alias'),
+        ('core', '0003_slowquery'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['organization', 'created_at'], name='product_org_created_idx'),
+        ),
+    ]
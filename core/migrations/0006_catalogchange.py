@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:23
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_organization_db_alias'),
+        ('core', '0005_catalog_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.UUIDField()),
+                ('action', models.CharField(choices=[('upsert', 'Created or updated'), ('delete', 'Deleted')], max_length=10)),
+                ('changed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='catalog_changes', to='accounts.organization')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['organization', 'id'], name='catalogchange_org_id_idx')],
+            },
+        ),
+    ]
@@ -22,6 +22,7 @@ class Category(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} ({self.organization})"
@@ -50,6 +51,16 @@ class Product(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Low-stock / out-of-stock filters within an organization
+            models.Index(fields=["organization", "current_stock", "reorder_level"], name="product_org_stock_idx"),
+            # Product lists, newest first (keyset pagination)
+            models.Index(fields=["organization", "created_at"], name="product_org_created_idx"),
+            # Catalog version (latest change) for conditional GETs
+            models.Index(fields=["organization", "updated_at"], name="product_org_updated_idx"),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.sku})"
 
@@ -110,6 +121,12 @@ class Sale(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Sales lists, date-range reports and dashboard trends
+            models.Index(fields=["organization", "created_at"], name="sale_org_created_idx"),
+        ]
+
     def __str__(self):
         return f"Sale {self.invoice_number}"
 
@@ -168,9 +185,42 @@ class StockMovement(models.Model):
     created_by = models.ForeignKey("accounts.CustomUser", on_delete=models.SET_NULL, null=True, blank=True, related_name="stock_movements_created")
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # Organization movement history, newest first
+            models.Index(fields=["organization", "created_at"], name="stockmove_org_created_idx"),
+            # Per-product movement history
+            models.Index(fields=["product", "created_at"], name="stockmove_prod_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.product} {self.movement_type} {self.quantity}"
 
+# -----------------------
+# CatalogChange (delta sync log)
+# -----------------------
+class CatalogChange(models.Model):
+    """
+    One row per write to an organization's catalog (products, categories,
+    customers), deletions included; the id is the sync cursor.
+    """
+    ACTION_CHOICES = [("upsert", "Created or updated"), ("delete", "Deleted")]
+    id = models.BigAutoField(primary_key=True)
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="catalog_changes")
+    model = models.CharField(max_length=20)
+    object_id = models.UUIDField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Changes after a cursor, per organization
+            models.Index(fields=["organization", "id"], name="catalogchange_org_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.model} {self.object_id}"
+
 # -----------------------
 # ContactMessage
 # -----------------------
@@ -185,3 +235,34 @@ class ContactMessage(models.Model):
 
     def __str__(self):
         return f"Contact from {self.name}: {self.subject}"
+
+
+# -----------------------
+# SlowQuery
+# -----------------------
+class SlowQuery(models.Model):
+    """One row per normalized query that ran slower than SLOW_QUERY_THRESHOLD_MS."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    fingerprint = models.CharField(max_length=40, unique=True)
+    normalized_sql = models.TextField()
+    sample_sql = models.TextField(blank=True)
+    calls = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    # Where it was last seen
+    call_site = models.CharField(max_length=500, blank=True)
+    path = models.CharField(max_length=500, blank=True)
+    organization = models.ForeignKey(Organization, on_delete=models.SET_NULL, null=True, blank=True, related_name="slow_queries")
+    explain = models.TextField(blank=True)
+    first_seen = models.DateTimeField(default=timezone.now)
+    last_seen = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "slow queries"
+
+    @property
+    def avg_ms(self):
+        return self.total_ms / self.calls if self.calls else 0
+
+    def __str__(self):
+        return f"{self.fingerprint[:12]} ({self.calls} calls, max {self.max_ms:.0f}ms)"
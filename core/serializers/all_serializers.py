@@ -6,19 +6,24 @@ from core.models import (
     StockMovement, ContactMessage
 )
 
+from django.db import transaction
 from django.db.models import Sum, F, Q
+from core.utils import metrics
+from core.utils.instrumentation import TimedSerializerMixin
+from core.utils.sharding import organization_db
+from core.utils.sparse_fields import SparseFieldsSerializerMixin
 
 
 
 # -----------------------
 # Organization & User
 # -----------------------
-class OrganizationSerializer(serializers.ModelSerializer):
+class OrganizationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Organization
         fields = "__all__"
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = CustomUser
         fields = ("id","email","first_name","last_name","organization","role","is_owner","is_active")
@@ -27,13 +32,15 @@ class UserSerializer(serializers.ModelSerializer):
 # -----------------------
 # Core models
 # -----------------------
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = "__all__"
         read_only_fields = ["organization", "created_at"]
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
+    expandable_fields = {"category": CategorySerializer}
+
     class Meta:
         model = Product
         fields = "__all__"
@@ -41,13 +48,13 @@ class ProductSerializer(serializers.ModelSerializer):
 
 
 
-class SupplierSerializer(serializers.ModelSerializer):
+class SupplierSerializer(SparseFieldsSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Supplier
         fields = "__all__"
         read_only_fields = ["organization", "created_at", "updated_at"]
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(SparseFieldsSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = "__all__"
@@ -56,14 +63,17 @@ class CustomerSerializer(serializers.ModelSerializer):
 
 
 
-class SaleItemSerializer(serializers.ModelSerializer):
+class SaleItemSerializer(SparseFieldsSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
+    expandable_fields = {"product": ProductSerializer}
+
     class Meta:
         model = SaleItem
         fields = ("product", "quantity", "unit_price", "subtotal")
         read_only_fields = ("subtotal",)
 
-class SaleSerializer(serializers.ModelSerializer):
+class SaleSerializer(SparseFieldsSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
     items = SaleItemSerializer(many=True)
+    expandable_fields = {"customer": CustomerSerializer, "created_by": UserSerializer}
 
     class Meta:
         model = Sale
@@ -73,9 +83,10 @@ class SaleSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         items_data = validated_data.pop("items", [])
         user = self.context['request'].user
+        db = organization_db(user.organization)
 
         # Create Sale
-        sale = Sale.objects.create(
+        sale = Sale.objects.db_manager(db).create(
             created_by=user,
             **validated_data
         )
@@ -89,7 +100,7 @@ class SaleSerializer(serializers.ModelSerializer):
             subtotal = quantity * unit_price
 
             # Create SaleItem
-            SaleItem.objects.create(
+            SaleItem.objects.db_manager(db).create(
                 sale=sale,
                 product=product,
                 quantity=quantity,
@@ -101,7 +112,7 @@ class SaleSerializer(serializers.ModelSerializer):
             total_amount += subtotal
 
             # Create StockMovement (out)
-            StockMovement.objects.create(
+            StockMovement.objects.db_manager(db).create(
                 organization=user.organization,
                 product=product,
                 movement_type="out",
@@ -118,6 +129,12 @@ class SaleSerializer(serializers.ModelSerializer):
         sale.net_total = total_amount - sale.discount + sale.vat
         sale.save()
 
+        # Counted once the sale is committed: a rolled-back checkout is not a sale
+        def count_checkout(line_count=len(items_data)):
+            metrics.CHECKOUTS.inc()
+            metrics.CHECKOUT_ITEMS.inc(line_count)
+
+        transaction.on_commit(count_checkout, using=db)
         return sale
 
 
@@ -126,14 +143,17 @@ class SaleSerializer(serializers.ModelSerializer):
 # -----------------------
 
 
-class PurchaseItemSerializer(serializers.ModelSerializer):
+class PurchaseItemSerializer(SparseFieldsSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
+    expandable_fields = {"product": ProductSerializer}
+
     class Meta:
         model = PurchaseItem
         fields = ("product", "quantity", "unit_price", "subtotal")
         read_only_fields = ("subtotal",)
 
-class PurchaseSerializer(serializers.ModelSerializer):
+class PurchaseSerializer(SparseFieldsSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
     items = PurchaseItemSerializer(many=True)
+    expandable_fields = {"supplier": SupplierSerializer, "created_by": UserSerializer}
 
     class Meta:
         model = Purchase
@@ -143,9 +163,10 @@ class PurchaseSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         items_data = validated_data.pop("items", [])
         user = self.context['request'].user
+        db = organization_db(user.organization)
 
         # Create Purchase
-        purchase = Purchase.objects.create(
+        purchase = Purchase.objects.db_manager(db).create(
             created_by=user,
             **validated_data
         )
@@ -159,7 +180,7 @@ class PurchaseSerializer(serializers.ModelSerializer):
             subtotal = quantity * unit_price
 
             # Create PurchaseItem
-            PurchaseItem.objects.create(
+            PurchaseItem.objects.db_manager(db).create(
                 purchase=purchase,
                 product=product,
                 quantity=quantity,
@@ -171,7 +192,7 @@ class PurchaseSerializer(serializers.ModelSerializer):
             total_amount += subtotal
 
             # Create StockMovement (in)
-            StockMovement.objects.create(
+            StockMovement.objects.db_manager(db).create(
                 organization=user.organization,
                 product=product,
                 movement_type="in",
@@ -193,7 +214,9 @@ class PurchaseSerializer(serializers.ModelSerializer):
 # -----------------------
 # Stock Movement
 # -----------------------
-class StockMovementSerializer(serializers.ModelSerializer):
+class StockMovementSerializer(SparseFieldsSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
+    expandable_fields = {"product": ProductSerializer, "created_by": UserSerializer}
+
     class Meta:
         model = StockMovement
         fields = "__all__"
@@ -202,7 +225,7 @@ class StockMovementSerializer(serializers.ModelSerializer):
 # -----------------------
 # Contact Message
 # -----------------------
-class ContactMessageSerializer(serializers.ModelSerializer):
+class ContactMessageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ContactMessage
         fields = "__all__"
@@ -216,14 +239,14 @@ class ContactMessageSerializer(serializers.ModelSerializer):
 
 
 
-class SaleItemSummarySerializer(serializers.ModelSerializer):
+class SaleItemSummarySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = SaleItem
         # fields = ["id", "product", "quantity", "unit_price", "subtotal"]
         fields = '__all__'
 
 
-class SaleSummarySerializer(serializers.ModelSerializer):
+class SaleSummarySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     customer_name = serializers.SerializerMethodField()
     items_count = serializers.SerializerMethodField()
 
@@ -254,7 +277,7 @@ class SaleSummarySerializer(serializers.ModelSerializer):
 
 
 
-class ProductStockSerializer(serializers.ModelSerializer):
+class ProductStockSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     category_name = serializers.SerializerMethodField()
     stock_value_cost = serializers.SerializerMethodField()
     stock_value_retail = serializers.SerializerMethodField()
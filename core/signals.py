@@ -0,0 +1,116 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from accounts.models import Organization, CustomUser
+from core.models import Category, Customer, Product, Sale, SaleItem, Purchase, PurchaseItem
+from core.utils.admin_stats import invalidate_stats
+from core.utils.catalog_sync import record_change, record_changes
+from core.utils.profiling import invalidate_profiled_users
+from core.utils.snapshots import snapshot_changed_catalog
+from core.utils.sharding import (
+    DEFAULT_ONLY_USER_FIELDS, copy_to_shard, forget_organization_db, organization_db, organization_db_for_id,
+)
+
+
+# -----------------------
+# Admin analytics cache invalidation
+# -----------------------
+# Model -> foreign key whose stats its rows count towards
+STATS_OWNERS = {
+    SaleItem: ("product", "product_id"),
+    PurchaseItem: ("product", "product_id"),
+    Sale: ("customer", "customer_id"),
+    Purchase: ("supplier", "supplier_id"),
+}
+
+
+@receiver(pre_save, sender=SaleItem)
+@receiver(pre_save, sender=PurchaseItem)
+@receiver(pre_save, sender=Sale)
+@receiver(pre_save, sender=Purchase)
+def remember_stats_owner(sender, instance, using, **kwargs):
+    """On updates, keep the stored foreign key: a row moved elsewhere changes both entities' stats."""
+    instance._previous_stats_owner = None
+    if not instance._state.adding:
+        field = STATS_OWNERS[sender][1]
+        instance._previous_stats_owner = (
+            sender.objects.using(using).filter(pk=instance.pk).values_list(field, flat=True).first()
+        )
+
+
+@receiver([post_save, post_delete], sender=SaleItem)
+@receiver([post_save, post_delete], sender=PurchaseItem)
+@receiver([post_save, post_delete], sender=Sale)
+@receiver([post_save, post_delete], sender=Purchase)
+def invalidate_owner_stats(sender, instance, **kwargs):
+    kind, field = STATS_OWNERS[sender]
+    invalidate_stats(kind, getattr(instance, field), getattr(instance, "_previous_stats_owner", None))
+
+
+# -----------------------
+# Request profiling toggle
+# -----------------------
+@receiver([post_save, post_delete], sender=CustomUser)
+def invalidate_profiling_toggle(sender, instance, **kwargs):
+    invalidate_profiled_users()
+
+
+# -----------------------
+# Tenant shards: keep directory copies current
+# -----------------------
+@receiver(post_save, sender=Organization)
+def copy_organization_to_shard(sender, instance, using, **kwargs):
+    if using == DEFAULT_DB_ALIAS:
+        forget_organization_db(instance.pk)
+        copy_to_shard(instance, organization_db(instance))
+
+
+@receiver(post_save, sender=CustomUser)
+def copy_user_to_shard(sender, instance, using, created, update_fields, **kwargs):
+    if using != DEFAULT_DB_ALIAS or not instance.organization_id:
+        return
+    # Logins save last_login only; the shard copy does not need it
+    if update_fields and DEFAULT_ONLY_USER_FIELDS.issuperset(update_fields):
+        return
+    if CustomUser.organization.is_cached(instance):
+        alias = organization_db(instance.organization)
+    else:
+        # A new user must land on the current shard, so their rows' foreign keys resolve
+        alias = organization_db_for_id(instance.organization_id, cached=not created)
+    copy_to_shard(instance, alias)
+
+
+# -----------------------
+# Catalog change log for POS delta sync
+# -----------------------
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Customer)
+def log_catalog_upsert(sender, instance, using, **kwargs):
+    record_change(instance, "upsert", using)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Customer)
+def log_catalog_delete(sender, instance, using, **kwargs):
+    record_change(instance, "delete", using)
+
+
+@receiver(pre_delete, sender=Category)
+def log_uncategorized_products(sender, instance, using, **kwargs):
+    # SET_NULL clears Product.category with a bare UPDATE: no product signals
+    product_ids = instance.products.using(using).values_list("pk", flat=True)
+    record_changes(Product, instance.organization_id, product_ids, "upsert", using)
+
+
+# -----------------------
+# Offline catalog snapshots
+# -----------------------
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Customer)
+def rebuild_catalog_snapshot(sender, instance, using, **kwargs):
+    organization_id = instance.organization_id
+    transaction.on_commit(lambda: snapshot_changed_catalog(organization_id), using=using)
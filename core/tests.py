@@ -1,3 +1,1682 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import zlib
+import io
+import json
+import os
+import random
+import re
+import sqlite3
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import F, Q, Sum
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, force_authenticate
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import RefreshToken
+
+import brotli
+import httpx
+
+from accounts.models import Organization, CustomUser
+from accounts.utils.custom_pagination import EstimatedCountPaginator
+from core.models import (
+    Category, Product, Supplier, Customer,
+    Sale, SaleItem, Purchase, PurchaseItem, StockMovement, ContactMessage, SlowQuery
+)
+from core import urls as core_urls
+from core.management.commands import loadtest
+from core.middleware.compression import CompressionMiddleware
+from core.middleware.profiling import RequestProfilingMiddleware
+from core.serializers.all_serializers import (
+    CategorySerializer, ProductSerializer, CustomerSerializer, StockMovementSerializer, SaleSummarySerializer,
+    ProductStockSerializer,
+)
+from core.serializers.fast_serializers import (
+    FastCategorySerializer, FastProductSerializer, FastCustomerSerializer, FastStockMovementSerializer,
+    FastSaleSummarySerializer, FastProductStockSerializer,
+)
+from core.utils import admin_stats, bootstrap, catalog_sync, metrics, replica, reports, sharding, slow_queries, snapshots
+from core.utils.profiling import invalidate_profiled_users
+from core.utils.query_budget import QueryBudgetMixin, seed_organization, get_routes, router_routes
+
+
+# =====================================================
+# Admin changelist query counts
+# =====================================================
+class AdminChangelistQueryCountTests(TestCase):
+    """
+    Every changelist must issue the same number of queries no matter how many
+    rows are displayed, i.e. no per-row `.count()` or FK lookups.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name="Query Count Org")
+        cls.admin_user = CustomUser.objects.create_superuser(
+            username="admin", email="admin@example.com", password="admin-pass",
+            organization=cls.organization,
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def seed_rows(self, start, count):
+        org = self.organization
+        for i in range(start, start + count):
+            category = Category.objects.create(organization=org, name=f"Category {i}")
+            product = Product.objects.create(
+                organization=org, category=category, product_id=f"P-{i}",
+                name=f"Product {i}", sku=f"SKU-{i}", current_stock=10,
+            )
+            supplier = Supplier.objects.create(organization=org, name=f"Supplier {i}")
+            customer = Customer.objects.create(organization=org, name=f"Customer {i}")
+            sale = Sale.objects.create(
+                organization=org, invoice_number=f"INV-{i}", customer=customer,
+                created_by=self.admin_user,
+            )
+            SaleItem.objects.create(sale=sale, product=product, quantity=1)
+            purchase = Purchase.objects.create(
+                organization=org, purchase_number=f"PUR-{i}", supplier=supplier,
+                created_by=self.admin_user,
+            )
+            PurchaseItem.objects.create(purchase=purchase, product=product, quantity=1)
+            StockMovement.objects.create(
+                organization=org, product=product, movement_type="in", quantity=1,
+                created_by=self.admin_user,
+            )
+            Organization.objects.create(name=f"Tenant {i}")
+            CustomUser.objects.create_user(
+                username=f"user{i}", email=f"user{i}@example.com", organization=org,
+            )
+
+    def changelist_query_count(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assert_fixed_query_count(self, model_name, app_label="core"):
+        url = reverse(f"admin:{app_label}_{model_name}_changelist")
+        self.seed_rows(0, 2)
+        few_rows = self.changelist_query_count(url)
+        self.seed_rows(2, 10)
+        many_rows = self.changelist_query_count(url)
+        self.assertEqual(
+            few_rows, many_rows,
+            f"{model_name} changelist query count grows with the number of rows",
+        )
+
+    def test_category_changelist(self):
+        self.assert_fixed_query_count("category")
+
+    def test_product_changelist(self):
+        self.assert_fixed_query_count("product")
+
+    def test_supplier_changelist(self):
+        self.assert_fixed_query_count("supplier")
+
+    def test_customer_changelist(self):
+        self.assert_fixed_query_count("customer")
+
+    def test_sale_changelist(self):
+        self.assert_fixed_query_count("sale")
+
+    def test_purchase_changelist(self):
+        self.assert_fixed_query_count("purchase")
+
+    def test_stockmovement_changelist(self):
+        self.assert_fixed_query_count("stockmovement")
+
+    def test_organization_changelist(self):
+        self.assert_fixed_query_count("organization", app_label="accounts")
+
+    def test_customuser_changelist(self):
+        self.assert_fixed_query_count("customuser", app_label="accounts")
+
+
+
+# =====================================================
+# Estimated counts for large admin tables
+# =====================================================
+class EstimatedCountPaginatorTests(TestCase):
+    """On SQLite the estimate is the cached last exact count of the same query."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+
+    def setUp(self):
+        cache.clear()
+
+    def count(self):
+        queryset = StockMovement.objects.filter(organization=self.organization).order_by("-id")
+        with CaptureQueriesContext(connection) as queries:
+            count = EstimatedCountPaginator(queryset, 5).count
+        return count, len(queries)
+
+    def add_movement(self):
+        StockMovement.objects.create(
+            organization=self.organization, product=Product.objects.first(), movement_type="in", quantity=1,
+        )
+
+    @override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=5)
+    def test_estimate_at_or_above_threshold(self):
+        exact, queries = self.count()
+        self.assertEqual(queries, 1)
+        self.add_movement()
+        # Served from the cached count, without a COUNT query
+        self.assertEqual(self.count(), (exact, 0))
+
+    @override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=1000)
+    def test_exact_below_threshold(self):
+        exact, _ = self.count()
+        self.add_movement()
+        self.assertEqual(self.count(), (exact + 1, 1))
+
+
+
+# =====================================================
+# Admin analytics cache invalidation
+# =====================================================
+class AdminStatsInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_new_sale_refreshes_customer_stats(self):
+        customer = Customer.objects.filter(organization=self.organization).first()
+        before = admin_stats.customer_stats(customer)["total_sales"]
+        Sale.objects.create(organization=self.organization, invoice_number="NEW", customer=customer)
+        self.assertEqual(admin_stats.customer_stats(customer)["total_sales"], before + 1)
+
+    def test_moved_sale_refreshes_both_customers(self):
+        old, new = Customer.objects.filter(organization=self.organization)[:2]
+        old_total, new_total = admin_stats.customer_stats(old)["total_sales"], admin_stats.customer_stats(new)["total_sales"]
+        sale = Sale.objects.filter(customer=old).first()
+        sale.customer = new
+        sale.save()
+        self.assertEqual(admin_stats.customer_stats(old)["total_sales"], old_total - 1)
+        self.assertEqual(admin_stats.customer_stats(new)["total_sales"], new_total + 1)
+
+    def test_moved_purchase_refreshes_both_suppliers(self):
+        old, new = Supplier.objects.filter(organization=self.organization)[:2]
+        old_total, new_total = admin_stats.supplier_stats(old)["total_purchases"], admin_stats.supplier_stats(new)["total_purchases"]
+        purchase = Purchase.objects.filter(supplier=old).first()
+        purchase.supplier = new
+        purchase.save()
+        self.assertEqual(admin_stats.supplier_stats(old)["total_purchases"], old_total - 1)
+        self.assertEqual(admin_stats.supplier_stats(new)["total_purchases"], new_total + 1)
+
+    def test_moved_sale_item_refreshes_both_products(self):
+        item = SaleItem.objects.filter(sale__organization=self.organization).first()
+        old = item.product
+        new = Product.objects.filter(organization=self.organization).exclude(sale_items__sale=item.sale).first()
+        old_sold, new_sold = admin_stats.product_stats(old)["total_sold"], admin_stats.product_stats(new)["total_sold"] or 0
+        item.product = new
+        item.save()
+        self.assertEqual(admin_stats.product_stats(old)["total_sold"], old_sold - item.quantity)
+        self.assertEqual(admin_stats.product_stats(new)["total_sold"], new_sold + item.quantity)
+
+    def test_deleted_purchase_refreshes_supplier(self):
+        purchase = Purchase.objects.filter(organization=self.organization).first()
+        supplier = purchase.supplier
+        before = admin_stats.supplier_stats(supplier)["total_purchases"]
+        PurchaseItem.objects.filter(purchase=purchase).delete()
+        purchase.delete()
+        self.assertEqual(admin_stats.supplier_stats(supplier)["total_purchases"], before - 1)
+
+
+# =====================================================
+# Request instrumentation
+# =====================================================
+class RequestInstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_header_and_log_line(self):
+        with self.assertLogs("core.instrumentation", "INFO") as logs, CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/products/")
+        self.assertEqual(response.status_code, 200)
+
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="\d+ queries", serializer;dur=[\d.]+, .*total;dur=[\d.]+$')
+        self.assertIn(f'desc="{len(queries)} queries"', timing)
+
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record["method"], "GET")
+        self.assertEqual(record["path"], "/api/products/")
+        self.assertEqual(record["route"], "api/products/$")
+        self.assertEqual(record["status"], 200)
+        self.assertEqual(record["organization_id"], str(self.organization.pk))
+        self.assertEqual(record["queries"], len(queries))
+        self.assertGreaterEqual(record["total_ms"], record["db_ms"])
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0, SLOW_REQUEST_SAMPLE_RATE=1.0)
+    def test_slow_requests_log_their_sql(self):
+        with self.assertLogs("core.instrumentation", "INFO") as logs:
+            self.client.get("/api/products/")
+        slow = [json.loads(record.getMessage()) for record in logs.records if "slowest_queries" in record.getMessage()]
+        self.assertTrue(slow)
+        self.assertTrue(slow[0]["slowest_queries"][0]["sql"].startswith("SELECT"))
+
+
+# =====================================================
+# On-demand request profiling
+# =====================================================
+class RequestProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+        cls.staff = CustomUser.objects.create_user(
+            username="profiler", email="profiler@example.com", organization=cls.organization, is_staff=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.profile_dir.cleanup)
+        overrides = override_settings(PROFILING_ENABLED=True, PROFILING_DIR=Path(self.profile_dir.name))
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.middleware = RequestProfilingMiddleware(lambda request: HttpResponse())
+
+    def request(self, user=None, profile_header=False):
+        headers = {"X-Profile": "1"} if profile_header else {}
+        if user is not None:
+            headers["Authorization"] = f"Bearer {RefreshToken.for_user(user).access_token}"
+        request = RequestFactory().get("/api/products/", headers=headers)
+        request.user = AnonymousUser()
+        return request
+
+    def api_client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+        return client
+
+    def test_should_profile(self):
+        self.assertFalse(self.middleware.should_profile(self.request(self.staff)))
+        self.assertTrue(self.middleware.should_profile(self.request(self.staff, profile_header=True)))
+        self.assertFalse(self.middleware.should_profile(self.request(self.user, profile_header=True)))
+        self.assertFalse(self.middleware.should_profile(self.request(profile_header=True)))
+
+        # The admin toggle profiles a user's requests without the header
+        CustomUser.objects.filter(pk=self.user.pk).update(profile_requests=True)
+        invalidate_profiled_users()
+        self.assertTrue(self.middleware.should_profile(self.request(self.user)))
+        self.assertFalse(self.middleware.should_profile(self.request(self.staff)))
+
+    def test_toggles_from_other_workers_expire_the_cached_users(self):
+        self.assertFalse(self.middleware.should_profile(self.request(self.user)))
+        # Toggled on another worker: this worker's cache is not invalidated
+        CustomUser.objects.filter(pk=self.user.pk).update(profile_requests=True)
+        self.assertFalse(self.middleware.should_profile(self.request(self.user)))
+        with mock.patch("django.core.cache.backends.locmem.time.time", return_value=time.time() + 31):
+            self.assertTrue(self.middleware.should_profile(self.request(self.user)))
+
+    def test_profiles_are_written_outside_media_and_served_to_staff_only(self):
+        response = self.api_client(self.staff).get("/api/products/", headers={"X-Profile": "1"})
+        self.assertEqual(response.status_code, 200)
+        urls = response["X-Profile"].split(", ")
+        self.assertEqual(len(urls), 2)
+        self.assertTrue(all(url.startswith("/profiles/") for url in urls))
+
+        names = sorted(path.name for path in Path(self.profile_dir.name).iterdir())
+        self.assertEqual([name.rsplit(".", 1)[1] for name in names], ["collapsed", "prof"])
+        self.assertFalse(settings.PROFILING_DIR.is_relative_to(settings.MEDIA_ROOT))
+
+        download = self.api_client(self.staff).get(urls[0])
+        self.assertEqual(download.status_code, 200)
+        self.assertGreater(len(b"".join(download.streaming_content)), 0)
+        self.assertEqual(self.api_client(self.user).get(urls[0]).status_code, 403)
+        self.assertEqual(APIClient().get(urls[0]).status_code, 401)
+        self.assertEqual(self.api_client(self.staff).get("/profiles/..prof").status_code, 404)
+        self.assertEqual(self.api_client(self.staff).get("/profiles/missing.prof").status_code, 404)
+
+
+# =====================================================
+# Prometheus metrics
+# =====================================================
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+
+    def setUp(self):
+        metrics_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(metrics_dir.cleanup)
+        self.directory = Path(metrics_dir.name)
+        overrides = override_settings(METRICS_DIR=str(self.directory), METRICS_TOKEN="scrape-token")
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def registry(self):
+        registry = metrics.Registry()
+        counter = metrics.Counter(registry, "jobs_total", "Jobs.", ["kind"])
+        gauge = metrics.Gauge(registry, "queue_depth", "Queued jobs.")
+        self.addCleanup(lambda: registry.worker_lock and registry.worker_lock.close())
+        return registry, counter, gauge
+
+    def test_endpoint_requires_the_token(self):
+        url = reverse("metrics")
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, headers={"Authorization": "Bearer wrong"}).status_code, 403)
+        response = self.client.get(url, headers={"Authorization": "Bearer scrape-token"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"# TYPE pos_checkouts_total counter", response.content)
+        with override_settings(METRICS_TOKEN=""):
+            self.assertEqual(self.client.get(url, headers={"Authorization": "Bearer "}).status_code, 403)
+
+    def test_exited_workers_are_archived_once(self):
+        registry, counter, gauge = self.registry()
+        counter.inc(2, kind="sync")
+        gauge.set(5)
+        # An exited worker that had the same pid: no lock is held on its file
+        dead = f"{os.getpid()}-0123456789ab"
+        (self.directory / f"{dead}.json").write_text(json.dumps({
+            "jobs_total": [[["sync"], 3]], "queue_depth": [[[], 7]],
+        }))
+        (self.directory / f"{dead}.lock").touch()
+
+        for _ in range(2):
+            merged = registry.collect()
+            self.assertEqual(merged["jobs_total"], {("sync",): 5})
+            self.assertEqual(merged["queue_depth"], {(): 5})
+        self.assertEqual(
+            sorted(path.name for path in self.directory.iterdir() if not path.name.startswith(registry.worker)),
+            ["archived.json", "reap.lock"],
+        )
+
+    def test_live_workers_are_not_archived(self):
+        registry, counter, _ = self.registry()
+        other, other_counter, other_gauge = self.registry()
+        counter.inc(kind="sync")
+        other_counter.inc(4, kind="sync")
+        other_gauge.set(2)
+        other.flush()
+        merged = registry.collect()
+        self.assertEqual(merged["jobs_total"], {("sync",): 5})
+        self.assertEqual(merged["queue_depth"], {(): 2})
+        self.assertFalse((self.directory / "archived.json").exists())
+
+    def test_checkouts_are_counted_after_commit(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        product = Product.objects.filter(organization=self.organization, current_stock__gt=0).first()
+        before = metrics.CHECKOUTS.values.get((), 0)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = client.post("/api/sales/", {
+                "invoice_number": "METRICS-1",
+                "items": [{"product": str(product.pk), "quantity": 1, "unit_price": "100"}],
+            }, format="json")
+            self.assertEqual(response.status_code, 201, response.content)
+            self.assertEqual(metrics.CHECKOUTS.values.get((), 0), before)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(metrics.CHECKOUTS.values.get((), 0), before + 1)
+
+
+# =====================================================
+# Slow-query log
+# =====================================================
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+
+    def event(self, sql, params=(), duration=250.0, many=False):
+        return slow_queries.SlowQueryEvent("default", sql, params, many, duration, "core/views/all_view.py:1 in get")
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            slow_queries.normalize_sql("SELECT *  FROM t\n WHERE name = 'O''Brien' AND qty > 10 AND price = 2.50"),
+            "SELECT * FROM t WHERE name = ? AND qty > ? AND price = ?",
+        )
+        self.assertEqual(
+            slow_queries.normalize_sql('SELECT "id" FROM t WHERE "id" IN (%s, %s, %s)'),
+            slow_queries.normalize_sql('SELECT "id" FROM t WHERE "id" IN (%s)'),
+        )
+        # Digits inside identifiers are part of the shape
+        self.assertIn("col2", slow_queries.normalize_sql("SELECT col2 FROM t"))
+
+    def test_fingerprint(self):
+        first = slow_queries.normalize_sql("SELECT * FROM t WHERE id = 1")
+        second = slow_queries.normalize_sql("SELECT * FROM t WHERE id = 2")
+        self.assertEqual(slow_queries.fingerprint(first), slow_queries.fingerprint(second))
+        self.assertEqual(len(slow_queries.fingerprint(first)), 40)
+        self.assertNotEqual(
+            slow_queries.fingerprint(first), slow_queries.fingerprint(slow_queries.normalize_sql("SELECT * FROM u")),
+        )
+
+    def test_save_events_folds_fingerprints_and_stores_plans(self):
+        sql = 'SELECT "core_product"."id" FROM "core_product" WHERE "core_product"."sku" = %s'
+        slow_queries.save_events(
+            [self.event(sql, ("A",), 250), self.event(sql, ("B",), 400)],
+            path="/api/products/", organization_id=self.organization.pk,
+        )
+        row = SlowQuery.objects.get()
+        self.assertEqual((row.calls, row.total_ms, row.max_ms), (2, 650, 400))
+        self.assertEqual(row.sample_sql, sql)
+        self.assertEqual(row.organization_id, self.organization.pk)
+        self.assertIn("core_product", row.explain)
+
+        slow_queries.save_events([self.event(sql, ("C",), 300)], path="/api/products/")
+        row.refresh_from_db()
+        self.assertEqual((row.calls, row.total_ms, row.max_ms), (3, 950, 400))
+
+        # Writes are never EXPLAINed
+        slow_queries.save_events([self.event('UPDATE "core_product" SET "name" = %s', ("x",))])
+        self.assertEqual(SlowQuery.objects.get(normalized_sql__startswith="UPDATE").explain, "")
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_requests_save_events_in_the_background(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch.object(slow_queries._slow_query_executor, "submit") as submit, \
+                self.assertLogs("core.slow_queries", "WARNING"):
+            response = client.get("/api/products/")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(SlowQuery.objects.exists())
+
+        submitted = submit.call_args.args
+        submitted[0](*submitted[1:])
+        self.assertTrue(SlowQuery.objects.filter(path="/api/products/", organization=self.organization).exists())
+
+
+# =====================================================
+# Query plan regression tests
+# =====================================================
+class QueryPlanTests(TestCase):
+    """
+    Runs EXPLAIN on the hot report, dashboard and list queries against
+    generated data and fails if any of them falls back to a full table scan
+    of a large table. PostgreSQL runs with sequential scans disabled so the
+    plan shows whether a usable index exists at all, regardless of table size.
+    """
+    LARGE_TABLES = {"core_product", "core_sale", "core_saleitem", "core_stockmovement"}
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.organizations = [Organization.objects.create(name=f"Plan Org {i}") for i in range(3)]
+        for org_index, org in enumerate(cls.organizations):
+            category = Category.objects.create(organization=org, name=f"Category {org_index}")
+            products = Product.objects.bulk_create([
+                Product(
+                    organization=org, category=category, product_id=f"PLAN-{org_index}-{i}",
+                    name=f"Product {i}", sku=f"PLAN-SKU-{org_index}-{i}",
+                    purchase_price=10, sell_price=12, current_stock=i % 7, reorder_level=3,
+                )
+                for i in range(40)
+            ])
+            sales = Sale.objects.bulk_create([
+                Sale(
+                    organization=org, invoice_number=f"PLAN-INV-{org_index}-{i}",
+                    net_total=100, created_at=now - timedelta(hours=i * 5),
+                )
+                for i in range(150)
+            ])
+            SaleItem.objects.bulk_create([
+                SaleItem(sale=sale, product=products[i % len(products)], quantity=2, unit_price=50, subtotal=100)
+                for i, sale in enumerate(sales)
+            ])
+            StockMovement.objects.bulk_create([
+                StockMovement(
+                    organization=org, product=products[i % len(products)], movement_type="out",
+                    quantity=2, created_at=now - timedelta(hours=i * 5),
+                )
+                for i in range(150)
+            ])
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        cls.organization = cls.organizations[0]
+        cls.product = Product.objects.filter(organization=cls.organization).first()
+
+    def full_scans(self, queryset):
+        """Return the large tables the plan for `queryset` reads end to end."""
+        sql, params = queryset.query.sql_with_params()
+        with transaction.atomic(), connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                return self.postgres_seq_scans(plan[0]["Plan"])
+            if connection.vendor == "sqlite":
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                return {
+                    match.group(1)
+                    for *_, detail in cursor.fetchall()
+                    if (match := re.match(r"SCAN (\w+)", detail))
+                } & self.LARGE_TABLES
+        self.skipTest(f"No plan inspection for {connection.vendor}")
+
+    def postgres_seq_scans(self, node):
+        scans = set()
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in self.LARGE_TABLES:
+            scans.add(node["Relation Name"])
+        for child in node.get("Plans", []):
+            scans |= self.postgres_seq_scans(child)
+        return scans
+
+    def assert_no_full_scans(self, queryset):
+        scans = self.full_scans(queryset)
+        self.assertFalse(scans, f"Query regressed to full scans of {sorted(scans)}:\n{queryset.query}")
+
+    def test_sales_report(self):
+        today = timezone.localdate()
+        sales = reports.sales_report_queryset(self.organization, today - timedelta(days=7), today)
+        self.assert_no_full_scans(sales)
+        self.assert_no_full_scans(SaleItem.objects.filter(sale__in=sales.values("id")))
+
+    def test_stock_report(self):
+        self.assert_no_full_scans(reports.stock_report_queryset(self.organization))
+
+    def test_low_stock_products(self):
+        self.assert_no_full_scans(
+            Product.objects.filter(organization=self.organization, current_stock__lte=F("reorder_level"))
+        )
+
+    def test_dashboard_sales_trend(self):
+        self.assert_no_full_scans(reports.dashboard_sales_trend_queryset(self.organization))
+
+    def test_dashboard_top_products(self):
+        self.assert_no_full_scans(
+            SaleItem.objects.filter(sale__organization=self.organization)
+            .values("product__name")
+            .annotate(total_sold=Sum("quantity"))
+        )
+
+    def test_organization_stock_movements(self):
+        self.assert_no_full_scans(
+            StockMovement.objects.filter(organization=self.organization).order_by("-created_at")
+        )
+
+    def test_organization_sales_list(self):
+        self.assert_no_full_scans(
+            Sale.objects.filter(organization=self.organization).order_by("-created_at")
+        )
+
+    def test_product_keyset_page(self):
+        products = Product.objects.filter(organization=self.organization)
+        last = products.order_by("-created_at", "-id")[10]
+        self.assert_no_full_scans(
+            products.filter(Q(created_at__lt=last.created_at) | Q(created_at=last.created_at, id__lt=last.id))
+            .order_by("-created_at", "-id")[:50]
+        )
+
+    def test_product_stock_movements(self):
+        self.assert_no_full_scans(
+            StockMovement.objects.filter(product=self.product).order_by("-created_at")
+        )
+
+
+# =====================================================
+# API query budgets
+# =====================================================
+class CoreRouteBudgetTests(QueryBudgetMixin, TestCase):
+    """List and detail form of every core route stays within query_budgets.json."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+        seed_organization("Other Budget Org")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def detail_object(self, model):
+        if model is ContactMessage:
+            return model.objects.first()
+        if model is SaleItem:
+            return model.objects.filter(sale__organization=self.organization).first()
+        if model is PurchaseItem:
+            return model.objects.filter(purchase__organization=self.organization).first()
+        return model.objects.filter(organization=self.organization).first()
+
+    def test_router_routes(self):
+        routes = {}
+        for list_url, detail_url, model in router_routes(core_urls.router, prefix="/api/"):
+            routes[f"GET {list_url}"] = list_url
+            routes[f"GET {detail_url}"] = detail_url.format(pk=self.detail_object(model).pk)
+        self.assert_route_budgets(routes)
+
+    def test_custom_routes(self):
+        url_kwargs = {
+            "invoice-pdf-download": {"id": self.detail_object(Sale).pk},
+        }
+        routes = {}
+        for route, pattern in get_routes(core_urls.urlpatterns, prefix="/api/"):
+            url = reverse(pattern.name, kwargs=url_kwargs.get(pattern.name))
+            routes[f"GET {route}"] = url
+        with tempfile.TemporaryDirectory() as pdf_dir, \
+                mock.patch("core.views.all_view.PDF_STORAGE_PATH", pdf_dir):
+            self.assert_route_budgets(routes)
+
+
+# =====================================================
+# Keyset pagination
+# =====================================================
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+        product = Product.objects.filter(organization=cls.organization).first()
+        now = timezone.now()
+        # Pairs share a timestamp so the id tie-break is exercised
+        StockMovement.objects.bulk_create([
+            StockMovement(
+                organization=cls.organization, product=product, movement_type="in",
+                quantity=1, created_at=now - timedelta(minutes=i // 2),
+            )
+            for i in range(25)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, key):
+        ids = []
+        while url:
+            page = self.client.get(url).json()
+            ids += [row["id"] for row in page["results"]]
+            url = page[key]
+        return ids
+
+    def test_pages_cover_every_row_once_in_order(self):
+        expected = [
+            str(pk) for pk in StockMovement.objects.filter(organization=self.organization)
+            .order_by("-created_at", "-id").values_list("id", flat=True)
+        ]
+        self.assertEqual(self.walk("/api/stock-movements/?page_size=7", "next"), expected)
+
+        first = self.client.get("/api/stock-movements/?page_size=7").json()
+        self.assertIsNone(first["previous"])
+        second = self.client.get(first["next"]).json()
+        back = self.client.get(second["previous"]).json()
+        self.assertEqual(back["results"], first["results"])
+
+    def test_cursor_is_stable_across_inserts(self):
+        first = self.client.get("/api/stock-movements/?page_size=5").json()
+        StockMovement.objects.create(
+            organization=self.organization, product=Product.objects.filter(organization=self.organization).first(),
+            movement_type="in", quantity=1,
+        )
+        second = self.client.get(first["next"]).json()
+        seen = {row["id"] for row in first["results"]}
+        self.assertFalse(seen & {row["id"] for row in second["results"]})
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get("/api/stock-movements/?cursor=garbage").status_code, 404)
+
+    def test_small_tables_keep_page_numbers(self):
+        response = self.client.get("/api/categories/?page=1")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("count", response.json())
+
+
+# =====================================================
+# Sparse fieldsets and expansion
+# =====================================================
+class SparseFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()["results"], [query["sql"] for query in queries.captured_queries]
+
+    def test_fields_limit_keys_and_columns(self):
+        rows, queries = self.get("/api/products/?fields=id,name,sell_price")
+        self.assertEqual(set(rows[0]), {"id", "name", "sell_price"})
+        product_query = next(sql for sql in queries if 'FROM "core_product"' in sql)
+        self.assertNotIn('"core_product"."description"', product_query)
+        self.assertNotIn('"core_product"."barcode"', product_query)
+
+    def test_expand_joins_instead_of_extra_queries(self):
+        rows, queries = self.get("/api/products/?fields=id,name,category&expand=category")
+        category = Product.objects.filter(organization=self.organization).exclude(category=None).first().category
+        expanded = next(row["category"] for row in rows if row["category"] and row["category"]["id"] == str(category.pk))
+        self.assertEqual(expanded["name"], category.name)
+        # Categories are joined; the only query of their own is the list's version aggregate
+        self.assertEqual([sql for sql in queries if 'FROM "core_category"' in sql and "COUNT(" not in sql], [])
+
+    def test_nested_items_are_prefetched(self):
+        _, queries = self.get("/api/sales/?expand=customer")
+        self.assertEqual(sum('FROM "core_saleitem"' in sql for sql in queries), 1)
+
+    def test_writes_ignore_fields(self):
+        response = self.client.post("/api/categories/?fields=id", {"name": "Sparse"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["name"], "Sparse")
+
+
+# =====================================================
+# Fast read serializers
+# =====================================================
+class FastSerializerParityTests(TestCase):
+    """Each ValuesSerializer renders exactly the JSON of the ModelSerializer it replaces."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+        # Nulls and empty relations: walk-in sale without items, product without category
+        Sale.objects.create(organization=cls.organization, invoice_number="WALK-IN", discount="1.5")
+        Product.objects.create(organization=cls.organization, name="Loose", sku="LOOSE", product_id="LOOSE")
+
+    def assert_same_json(self, fast_serializer, serializer_class, queryset):
+        expected = JSONRenderer().render(serializer_class(queryset.order_by("id"), many=True).data)
+        fast = JSONRenderer().render(fast_serializer.serialize(fast_serializer.values(queryset.order_by("id"))))
+        self.assertEqual(json.loads(fast), json.loads(expected))
+
+    def test_lists(self):
+        self.assert_same_json(FastCategorySerializer(), CategorySerializer, Category.objects.all())
+        self.assert_same_json(FastProductSerializer(), ProductSerializer, Product.objects.all())
+        self.assert_same_json(FastCustomerSerializer(), CustomerSerializer, Customer.objects.all())
+        self.assert_same_json(FastStockMovementSerializer(), StockMovementSerializer, StockMovement.objects.all())
+
+    def test_reports(self):
+        self.assert_same_json(
+            FastSaleSummarySerializer(), SaleSummarySerializer, reports.sales_report_queryset(self.organization),
+        )
+        self.assert_same_json(
+            FastProductStockSerializer(), ProductStockSerializer, reports.stock_report_queryset(self.organization),
+        )
+
+    def test_fields_subset(self):
+        rows = FastProductSerializer(fields=["id", "sell_price"]).serialize(
+            FastProductSerializer(fields=["id", "sell_price"]).values(Product.objects.all())
+        )
+        self.assertEqual(set(rows[0]), {"id", "sell_price"})
+
+    def test_list_endpoint_pages(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        first = client.get("/api/products/?page_size=2").json()
+        second = client.get(first["next"]).json()
+        self.assertEqual(len(second["results"]), 2)
+        self.assertFalse({row["id"] for row in first["results"]} & {row["id"] for row in second["results"]})
+
+
+# =====================================================
+# Streaming exports
+# =====================================================
+@override_settings(EXPORT_CHUNK_SIZE=3)
+class StreamingExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+        seed_organization("Other Export Org")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson_streams_every_row_unpaginated(self):
+        lines = self.export("/api/products/?format=ndjson&page_size=2").splitlines()
+        self.assertEqual(len(lines), Product.objects.filter(organization=self.organization).count())
+        self.assertEqual(json.loads(lines[0])["organization"], str(self.organization.pk))
+
+    def test_csv_with_nested_rows(self):
+        rows = list(csv.DictReader(io.StringIO(self.export("/api/sales/?format=csv"))))
+        self.assertEqual(len(rows), Sale.objects.filter(organization=self.organization).count())
+        self.assertEqual(len(json.loads(rows[0]["items"])), 2)
+
+    def test_currency_formatting(self):
+        Product.objects.filter(organization=self.organization).update(sell_price=1234567)
+        rows = list(csv.DictReader(io.StringIO(self.export("/api/products/?format=csv&currency=bdt"))))
+        self.assertEqual(rows[0]["sell_price"], "12,34,567.00")
+
+    def test_report_export(self):
+        rows = list(csv.DictReader(io.StringIO(self.export("/api/v1/reports/stock/?format=csv"))))
+        self.assertEqual(len(rows), Product.objects.filter(organization=self.organization).count())
+        self.assertIn("stock_value_cost", rows[0])
+
+
+# =====================================================
+# Conditional GET on catalog lists
+# =====================================================
+class ConditionalCatalogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def revalidate(self, url, etag):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        return response, len(queries)
+
+    def test_unchanged_catalog_is_not_modified(self):
+        # One version aggregate per model the list renders: products also show categories
+        for url, version_queries in (("/api/products/", 2), ("/api/categories/", 1)):
+            with self.subTest(url):
+                first = self.client.get(url)
+                self.assertEqual(first.status_code, 200)
+                self.assertNotIn("Last-Modified", first)
+                response, queries = self.revalidate(url, first["ETag"])
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(queries, version_queries)
+
+    def test_writes_and_deletes_change_the_version(self):
+        etag = self.client.get("/api/products/")["ETag"]
+        product = Product.objects.filter(organization=self.organization).first()
+        product.sell_price = 1
+        product.save()
+        response, _ = self.revalidate("/api/products/", etag)
+        self.assertEqual(response.status_code, 200)
+
+        extra = Product.objects.create(organization=self.organization, name="Extra", sku="EXTRA", product_id="EXTRA")
+        etag = self.client.get("/api/products/")["ETag"]
+        extra.delete()
+        response, _ = self.revalidate("/api/products/", etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since_alone_is_not_trusted(self):
+        extra = Product.objects.create(organization=self.organization, name="Extra", sku="EXTRA", product_id="EXTRA")
+        Product.objects.filter(pk=extra.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        self.client.get("/api/products/")
+        extra.delete()
+        # The latest updated_at is unchanged by the delete; only the ETag sees it
+        response = self.client.get("/api/products/", HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("EXTRA", response.content.decode())
+
+    def test_category_deletes_change_the_product_version(self):
+        category = Category.objects.filter(organization=self.organization, products__isnull=False).first()
+        etag = self.client.get("/api/products/")["ETag"]
+        # SET_NULL is a bare UPDATE: the products' updated_at does not move
+        category.delete()
+        response, _ = self.revalidate("/api/products/", etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_category_renames_change_the_expanded_product_version(self):
+        category = Category.objects.filter(organization=self.organization, products__isnull=False).first()
+        url = "/api/products/?expand=category"
+        etag = self.client.get(url)["ETag"]
+        category.name = "Renamed Category"
+        category.save()
+        response, _ = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Renamed Category", response.content.decode())
+
+    def test_variants_have_their_own_etag(self):
+        full = self.client.get("/api/products/")["ETag"]
+        sparse = self.client.get("/api/products/?fields=id,name")["ETag"]
+        self.assertNotEqual(full, sparse)
+
+
+# =====================================================
+# Catalog delta sync
+# =====================================================
+@override_settings(CATALOG_SYNC_SETTLE_SECONDS=0)
+class CatalogSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, cursor=None, **params):
+        if cursor:
+            params["cursor"] = cursor
+        response = self.client.get(reverse("catalog-sync"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_first_sync_resets_at_the_head_of_the_log(self):
+        body = self.sync()
+        self.assertTrue(body["reset"])
+        self.assertEqual(self.sync(body["cursor"])["changes"]["products"], {"upserted": [], "deleted": []})
+
+    def test_upserts_and_deletes(self):
+        cursor = self.sync()["cursor"]
+        product = Product.objects.filter(organization=self.organization).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            product.sell_price = 7
+            product.save()
+            extra = Customer.objects.create(organization=self.organization, name="Extra")
+            extra_id = str(extra.pk)
+            extra.delete()
+
+        body = self.sync(cursor)
+        self.assertFalse(body["reset"])
+        self.assertEqual([row["id"] for row in body["changes"]["products"]["upserted"]], [str(product.pk)])
+        self.assertEqual(body["changes"]["products"]["upserted"][0]["sell_price"], "7.00")
+        self.assertEqual(body["changes"]["customers"], {"upserted": [], "deleted": [extra_id]})
+        self.assertEqual(self.sync(body["cursor"])["changes"]["products"]["upserted"], [])
+
+    def test_pages_until_caught_up(self):
+        cursor = self.sync()["cursor"]
+        with self.captureOnCommitCallbacks(execute=True):
+            for product in Product.objects.filter(organization=self.organization)[:3]:
+                product.save()
+        seen = []
+        while True:
+            body = self.sync(cursor, limit=2)
+            seen += [row["id"] for row in body["changes"]["products"]["upserted"]]
+            cursor = body["cursor"]
+            if not body["has_more"]:
+                break
+        self.assertEqual(len(seen), 3)
+
+    def test_stale_or_foreign_cursor_resets(self):
+        stale = catalog_sync.encode_cursor("default", 0)
+        with mock.patch("core.utils.catalog_sync.timezone.now", return_value=timezone.now() + timedelta(days=31)):
+            self.assertTrue(self.sync(stale)["reset"])
+        self.assertTrue(self.sync(catalog_sync.encode_cursor("other", 0))["reset"])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(reverse("catalog-sync"), {"cursor": "nope"}).status_code, 404)
+
+    def test_unsettled_changes_wait(self):
+        cursor = self.sync()["cursor"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(organization=self.organization, name="Fresh")
+        with override_settings(CATALOG_SYNC_SETTLE_SECONDS=60):
+            self.assertEqual(self.sync(cursor)["changes"]["categories"]["upserted"], [])
+        self.assertEqual(len(self.sync(cursor)["changes"]["categories"]["upserted"]), 1)
+
+    def test_changes_are_numbered_at_commit(self):
+        cursor = self.sync()["cursor"]
+        early, late = Product.objects.filter(organization=self.organization)[:2]
+        # `early` is written first but its transaction commits after `late`'s was synced
+        with self.captureOnCommitCallbacks() as early_commit:
+            early.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            late.save()
+        body = self.sync(cursor)
+        self.assertEqual([row["id"] for row in body["changes"]["products"]["upserted"]], [str(late.pk)])
+        for callback in early_commit:
+            callback()
+        body = self.sync(body["cursor"])
+        self.assertEqual([row["id"] for row in body["changes"]["products"]["upserted"]], [str(early.pk)])
+
+    def test_rolled_back_writes_are_not_logged(self):
+        cursor = self.sync()["cursor"]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                Category.objects.create(organization=self.organization, name="Gone")
+                transaction.set_rollback(True)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.sync(cursor)["changes"]["categories"]["upserted"], [])
+
+    def test_category_deletes_upsert_their_products(self):
+        category = Category.objects.filter(organization=self.organization, products__isnull=False).first()
+        category_id = str(category.pk)
+        product_ids = {str(pk) for pk in category.products.values_list("pk", flat=True)}
+        cursor = self.sync()["cursor"]
+        with self.captureOnCommitCallbacks(execute=True):
+            category.delete()
+        changes = self.sync(cursor)["changes"]
+        self.assertEqual(changes["categories"]["deleted"], [category_id])
+        upserted = changes["products"]["upserted"]
+        self.assertEqual({row["id"] for row in upserted}, product_ids)
+        self.assertTrue(all(row["category"] is None for row in upserted))
+
+
+# =====================================================
+# POS bootstrap
+# =====================================================
+class PosBootstrapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def bootstrap(self, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("pos-bootstrap"), **headers)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_matches_the_list_endpoints(self):
+        body = self.bootstrap()[0].json()
+        products = Product.objects.filter(organization=self.organization).order_by("-created_at", "-id")
+        self.assertEqual(body["catalog"]["products"], json.loads(JSONRenderer().render(
+            ProductSerializer(products, many=True).data
+        )))
+        self.assertEqual(len(body["catalog"]["categories"]), Category.objects.filter(organization=self.organization).count())
+        self.assertEqual(len(body["catalog"]["customers"]), Customer.objects.filter(organization=self.organization).count())
+        self.assertEqual(body["user"]["email"], self.user.email)
+        self.assertFalse(self.client.get(reverse("catalog-sync"), {"cursor": body["catalog"]["sync_cursor"]}).json()["reset"])
+
+    def test_cached_per_catalog_version(self):
+        _, cold = self.bootstrap()
+        _, warm = self.bootstrap()
+        self.assertLess(warm, cold)
+        Category.objects.create(organization=self.organization, name="Fresh")
+        names = [row["name"] for row in self.bootstrap()[0].json()["catalog"]["categories"]]
+        self.assertIn("Fresh", names)
+
+    def test_gzip(self):
+        response, _ = self.bootstrap(HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("catalog", json.loads(gzip.decompress(response.content)))
+
+
+# =====================================================
+# Offline catalog snapshots
+# =====================================================
+class CatalogSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(CATALOG_SNAPSHOT_DIR=directory.name, CATALOG_SNAPSHOT_MIN_INTERVAL=0))
+        self.addCleanup(snapshots._pending.clear)
+        # Build on this thread: a background one cannot see the test transaction
+        self.enterContext(mock.patch.object(snapshots._snapshot_executor, "submit", side_effect=lambda job, *args: job(*args)))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, **headers):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.get(reverse("pos-snapshot"), **headers)
+
+    def read(self, content, query):
+        with tempfile.NamedTemporaryFile(suffix=".sqlite") as file:
+            file.write(content)
+            file.flush()
+            database = sqlite3.connect(file.name)
+            try:
+                # What a terminal does after downloading
+                database.executescript(database.execute("SELECT value FROM meta WHERE key = 'indexes'").fetchone()[0])
+                return database.execute(query).fetchall()
+            finally:
+                database.close()
+
+    def test_snapshot_matches_the_api(self):
+        self.assertEqual(self.download().status_code, 202)
+        response = self.download(HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        content = gzip.decompress(b"".join(response.streaming_content))
+
+        product = Product.objects.filter(organization=self.organization).order_by("id").first()
+        expected = FastProductSerializer().serialize(FastProductSerializer().values(Product.objects.filter(pk=product.pk)))[0]
+        row = self.read(content, f"SELECT name, sell_price, current_stock FROM products WHERE sku = '{product.sku}'")
+        self.assertEqual(row, [(expected["name"], expected["sell_price"], expected["current_stock"])])
+        self.assertEqual(
+            self.read(content, "SELECT count(*) FROM products")[0][0],
+            Product.objects.filter(organization=self.organization).count(),
+        )
+        cursor = self.read(content, "SELECT value FROM meta WHERE key = 'sync_cursor'")[0][0]
+        self.assertFalse(self.client.get(reverse("catalog-sync"), {"cursor": cursor}).json()["reset"])
+
+        not_modified = self.download(HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_catalog_writes_rebuild_the_snapshot(self):
+        self.download()
+        response = self.download()
+        response.close()  # not read; closing ends the view's database context
+        first = response["X-Catalog-Version"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(organization=self.organization, name="Fresh")
+        current = bootstrap.catalog_digest(self.organization, "default")
+        self.assertNotEqual(current, first)
+        directory = snapshots.snapshot_dir(self.organization.pk)
+        # The replaced snapshot stays for terminals that were just handed its version
+        self.assertEqual(
+            sorted(path.name for path in directory.iterdir()),
+            sorted([f"{current}.sqlite", f"{current}.sqlite.gz", f"{first}.sqlite", f"{first}.sqlite.gz"]),
+        )
+        with mock.patch("core.utils.snapshots.time.time", return_value=time.time() + 601):
+            snapshots.remove_old_snapshots(directory)
+        self.assertEqual(sorted(path.name for path in directory.iterdir()), [f"{current}.sqlite", f"{current}.sqlite.gz"])
+
+    @override_settings(CATALOG_SNAPSHOT_MIN_INTERVAL=300)
+    def test_builds_are_spaced_per_organization(self):
+        self.download()
+        directory = snapshots.snapshot_dir(self.organization.pk)
+        with mock.patch.object(snapshots.threading, "Timer") as timer:
+            # A burst of checkouts and edits right after a build
+            for name in ("Fresh", "Fresher", "Freshest"):
+                with self.captureOnCommitCallbacks(execute=True):
+                    Category.objects.create(organization=self.organization, name=name)
+        self.assertEqual(timer.call_count, 1)
+        delay, submit, args = timer.call_args.args
+        self.assertAlmostEqual(delay, 300, delta=5)
+        self.assertEqual(len(list(directory.glob("*.sqlite"))), 1)
+
+        submit(*args)  # the interval has passed
+        # One build for the whole burst
+        self.assertEqual(len(list(directory.glob("*.sqlite"))), 2)
+        current = bootstrap.catalog_digest(self.organization, "default")
+        self.assertEqual(snapshots.latest_snapshot(self.organization).stem, current)
+        self.assertEqual(snapshots._pending, {})
+
+    @override_settings(CATALOG_SNAPSHOT_KEEP_REPLACED=2)
+    def test_replaced_snapshots_are_capped(self):
+        self.download()
+        for name in ("One", "Two", "Three", "Four"):
+            with self.captureOnCommitCallbacks(execute=True):
+                Category.objects.create(organization=self.organization, name=name)
+        # The current one and the two it replaced last, each with its .gz copy
+        directory = snapshots.snapshot_dir(self.organization.pk)
+        self.assertEqual(len(list(directory.glob("*.sqlite"))), 3)
+        self.assertEqual(len(list(directory.glob("*.sqlite.gz"))), 3)
+        self.assertEqual(snapshots.latest_snapshot(self.organization).stem, bootstrap.catalog_digest(self.organization, "default"))
+
+    def test_builds_use_their_own_temporary_files(self):
+        self.download()
+        directory = snapshots.snapshot_dir(self.organization.pk)
+        digest = bootstrap.catalog_digest(self.organization, "default")
+        # Another worker's build of the same version, in progress
+        other = directory / f"{digest}.other.tmp"
+        other.write_bytes(b"partial")
+        snapshots.write_snapshot(self.organization, "default", digest)
+        self.assertEqual(other.read_bytes(), b"partial")
+        self.assertEqual(sorted(path.suffix for path in directory.iterdir()), [".gz", ".sqlite", ".tmp"])
+        # Until it is old enough to have been left by a build that died
+        with mock.patch("core.utils.snapshots.time.time", return_value=time.time() + 601):
+            snapshots.remove_old_snapshots(directory)
+        self.assertFalse(other.exists())
+
+    def test_removed_snapshot_answers_generating(self):
+        self.download()
+        Category.objects.create(organization=self.organization, name="Fresh")  # not rebuilt yet
+        missing = snapshots.snapshot_dir(self.organization.pk) / "removed.sqlite"
+        with mock.patch.object(snapshots, "latest_snapshot", return_value=missing):
+            response = self.client.get(reverse("pos-snapshot"))
+        self.assertEqual(response.status_code, 202)
+
+    def test_gzip_follows_accept_encoding(self):
+        self.download()
+        for accept, encoding in [("br, gzip", "gzip"), ("gzip;q=0, identity", None)]:
+            response = self.download(HTTP_ACCEPT_ENCODING=accept)
+            response.close()  # not read; closing ends the view's database context
+            self.assertEqual(response.get("Content-Encoding"), encoding)
+
+
+# =====================================================
+# Response compression
+# =====================================================
+class CompressionMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization, cls.user = seed_organization()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def respond(self, response, accept="br, gzip"):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_negotiates_brotli_then_gzip(self):
+        plain = self.client.get("/api/products/").content
+        response = self.client.get("/api/products/", HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(response.content), plain)
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertTrue(response["ETag"].startswith("W/"))
+
+        response = self.client.get("/api/products/", HTTP_ACCEPT_ENCODING="gzip, br;q=0")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain)
+
+        self.assertFalse(self.client.get("/api/products/").has_header("Content-Encoding"))
+        self.assertFalse(self.client.get("/api/products/", HTTP_ACCEPT_ENCODING="identity").has_header("Content-Encoding"))
+
+    def test_streaming_exports_compress_incrementally(self):
+        plain = b"".join(self.client.get("/api/products/?format=csv").streaming_content)
+        response = self.client.get("/api/products/?format=csv", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), plain)
+
+        # Output is flushed as input arrives, before the stream ends
+        with override_settings(COMPRESSION_STREAM_FLUSH_BYTES=100):
+            response = self.respond(StreamingHttpResponse(b"%d,row\n" % i for i in range(1000)), accept="gzip")
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        chunks, received = iter(response.streaming_content), b""
+        while not received:
+            received = decompressor.decompress(next(chunks))
+        self.assertTrue(received.startswith(b"0,row\n"))
+        self.assertLess(len(received), 1000)
+
+    def test_skips(self):
+        body = b"x" * 5000
+        self.assertFalse(self.respond(HttpResponse(body, content_type="application/pdf")).has_header("Content-Encoding"))
+        self.assertFalse(self.respond(HttpResponse(b"{}", content_type="application/json")).has_header("Content-Encoding"))
+        encoded = HttpResponse(body, content_type="application/json", headers={"Content-Encoding": "gzip"})
+        self.assertEqual(self.respond(encoded).content, body)
+        self.assertEqual(self.respond(HttpResponse(body, content_type="application/json"))["Content-Encoding"], "br")
+
+    @override_settings(COMPRESSION_LEVELS={"application/json": {"gzip": 1}, "*": {"gzip": 9}})
+    def test_levels_per_content_type(self):
+        body = json.dumps([{"name": f"Product {i}", "price": i * 3} for i in range(2000)]).encode()
+        fast = self.respond(HttpResponse(body, content_type="application/json"), accept="gzip").content
+        best = self.respond(HttpResponse(body, content_type="text/plain"), accept="gzip").content
+        self.assertLess(len(best), len(fast))
+
+
+# =====================================================
+# Read replica routing
+# =====================================================
+@override_settings(REPLICA_DATABASE_ALIAS="replica", REPLICA_HEALTH_CHECK_INTERVAL=0)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    `default` and `replica` are separate SQLite databases here, so where a
+    read was served is visible from the data: the replica holds fewer suppliers.
+    """
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        replica.clear_health_cache()
+        cache.clear()
+        self.organization, self.user = seed_organization()
+        Organization.objects.using("replica").bulk_create([self.organization])
+        Supplier.objects.using("replica").bulk_create([
+            Supplier(organization=self.organization, name=f"Replica Supplier {i}") for i in range(3)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def dashboard_suppliers(self):
+        response = self.client.get(reverse("inventory-dashboard"))
+        self.assertEqual(response.status_code, 200)
+        return response.json()["summary"]["total_suppliers"]
+
+    def test_reports_read_from_replica(self):
+        self.assertEqual(self.dashboard_suppliers(), 3)
+
+    def test_writer_reads_own_writes_from_default(self):
+        response = self.client.post("/api/categories/", {"name": "Fresh"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.dashboard_suppliers(), 10)
+
+    def test_stickiness_is_seen_by_every_worker(self):
+        self.client.post("/api/categories/", {"name": "Fresh"}, format="json")
+        cache.clear()  # the next request lands on a worker with its own cache
+        self.assertEqual(self.dashboard_suppliers(), 10)
+
+    def test_stickiness_expires(self):
+        self.client.post("/api/categories/", {"name": "Fresh"}, format="json")
+        with mock.patch("django.core.signing.time.time", return_value=time.time() + 11):
+            self.assertEqual(self.dashboard_suppliers(), 3)
+
+    def test_forged_pins_are_ignored(self):
+        self.client.cookies[replica.REPLICA_PIN_COOKIE] = str(self.user.pk)
+        self.assertEqual(self.dashboard_suppliers(), 3)
+
+    def test_lagging_replica_falls_back_to_default(self):
+        with mock.patch("core.utils.replica.replica_lag", return_value=60):
+            self.assertEqual(self.dashboard_suppliers(), 10)
+
+    def test_unreachable_replica_falls_back_to_default(self):
+        with mock.patch("core.utils.replica.replica_lag", side_effect=OperationalError):
+            self.assertEqual(self.dashboard_suppliers(), 10)
+
+    def test_unreachable_replica_database_falls_back_to_default(self):
+        replica_connection = connections["replica"]
+        unreachable = type(replica_connection)(
+            {**replica_connection.settings_dict, "NAME": "/nonexistent/replica/db.sqlite3"}, "replica",
+        )
+        with mock.patch.object(connections._connections, "replica", unreachable):
+            self.assertEqual(self.dashboard_suppliers(), 10)
+
+    def test_streaming_bodies_read_from_replica_until_closed(self):
+        class LazySupplierNames(replica.ReplicaReadMixin, APIView):
+            def get(self, request):
+                def names():
+                    # Runs while the body is sent, after the view has returned
+                    for name in Supplier.objects.filter(organization=request.user.organization).values_list(
+                        "name", flat=True,
+                    ):
+                        yield f"{name}\n"
+                return StreamingHttpResponse(names())
+
+        request = RequestFactory().get("/lazy/")
+        force_authenticate(request, self.user)
+        response = LazySupplierNames.as_view()(request)
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 3)
+        response.close()
+        self.assertIsNone(replica.db_for_read())
+
+    def test_failing_views_stop_reading_from_replica(self):
+        class Failing(replica.ReplicaReadMixin, APIView):
+            def get(self, request):
+                raise RuntimeError("unhandled")
+
+        request = RequestFactory().get("/failing/")
+        force_authenticate(request, self.user)
+        with self.assertRaises(RuntimeError):
+            Failing.as_view()(request)
+        # Later requests on this thread (checkout included) must read from default
+        self.assertIsNone(replica.db_for_read())
+
+    @override_settings(REPLICA_DATABASE_ALIAS="missing")
+    def test_missing_replica_alias_falls_back_to_default(self):
+        self.assertEqual(self.dashboard_suppliers(), 10)
+
+    def test_writes_and_transactions_stay_on_default(self):
+        with replica.read_from_replica():
+            Supplier.objects.create(organization=self.organization, name="Written")
+            with transaction.atomic():
+                self.assertEqual(Supplier.objects.filter(organization=self.organization).count(), 11)
+            self.assertEqual(Supplier.objects.filter(organization=self.organization).count(), 3)
+        self.assertFalse(Supplier.objects.using("replica").filter(name="Written").exists())
+
+
+@override_settings(REPLICA_DATABASE_ALIAS="replica", REPLICA_HEALTH_CHECK_INTERVAL=0)
+class ReplicaQueryBudgetTests(QueryBudgetMixin, TransactionTestCase):
+    """Queries routed away from `default` count against a route's budget."""
+
+    def setUp(self):
+        replica.clear_health_cache()
+        cache.clear()
+        self.organization, self.user = seed_organization()
+        Organization.objects.using("replica").bulk_create([self.organization])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_replica_queries_are_counted(self):
+        with CaptureQueriesContext(connections["replica"]) as replica_queries:
+            query_count, _ = self.measure(reverse("inventory-dashboard"))
+        self.assertGreater(len(replica_queries), 0)
+        self.assertGreaterEqual(query_count, len(replica_queries))
+
+
+# =====================================================
+# Tenant shards
+# =====================================================
+class TenantShardTests(TransactionTestCase):
+    """Each organization's data lives on its shard; default, shard_1 and shard_2 are separate SQLite databases."""
+    databases = {"default", "shard_1", "shard_2"}
+
+    def setUp(self):
+        self.organization, self.user = seed_organization("Sharded Org", size=3)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def move(self, target, *args):
+        call_command("move_organization", str(self.organization.pk), target, *args, stdout=io.StringIO())
+        self.organization.refresh_from_db()
+        self.user.refresh_from_db()
+        self.client.force_authenticate(self.user)
+
+    def organization_rows(self, alias):
+        return {
+            model.__name__: queryset.count()
+            for model, queryset in sharding.organization_querysets(self.organization, alias)
+        }
+
+    def test_move_organization_between_shards(self):
+        before = self.organization_rows("default")
+        self.move("shard_1")
+        self.assertEqual(self.organization.db_alias, "shard_1")
+        self.assertEqual(self.organization_rows("shard_1"), before)
+        self.assertFalse(any(self.organization_rows("default").values()))
+        self.assertTrue(CustomUser.objects.using("shard_1").filter(pk=self.user.pk).exists())
+
+        self.move("shard_2")
+        self.assertEqual(self.organization_rows("shard_2"), before)
+        self.assertFalse(any(self.organization_rows("shard_1").values()))
+        self.assertFalse(Organization.objects.using("shard_1").filter(pk=self.organization.pk).exists())
+
+    def test_api_reads_and_writes_use_the_organization_shard(self):
+        other_organization, _ = seed_organization("Unsharded Org", size=2)
+        self.move("shard_1")
+
+        response = self.client.get("/api/products/")
+        self.assertEqual(response.status_code, 200)
+        product = response.json()[0] if isinstance(response.json(), list) else response.json()["results"][0]
+
+        response = self.client.post("/api/sales/", {
+            "invoice_number": "SHARD-1",
+            "items": [{"product": product["id"], "quantity": 2, "unit_price": "100"}],
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(Sale.objects.using("shard_1").filter(invoice_number="SHARD-1").exists())
+        self.assertFalse(Sale.objects.filter(invoice_number="SHARD-1").exists())
+        self.assertEqual(
+            Product.objects.using("shard_1").get(pk=product["id"]).current_stock, product["current_stock"] - 2,
+        )
+
+        dashboard = self.client.get(reverse("inventory-dashboard")).json()
+        self.assertEqual(dashboard["summary"]["total_products"], 3)
+        self.assertEqual(Product.objects.filter(organization=other_organization).count(), 2)
+
+    def test_new_users_are_copied_to_the_shard(self):
+        self.move("shard_1")
+        operator = CustomUser.objects.create_user(
+            username="late-operator", email="late@sharded.com", organization=self.organization,
+        )
+        self.assertTrue(CustomUser.objects.using("shard_1").filter(pk=operator.pk).exists())
+
+    def test_user_saves_copy_only_shard_fields_without_loading_the_organization(self):
+        self.move("shard_1")
+        user = CustomUser.objects.get(pk=self.user.pk)
+        with CaptureQueriesContext(connections["shard_1"]) as shard_queries:
+            user.last_login = timezone.now()
+            user.save(update_fields=["last_login"])
+        self.assertEqual(len(shard_queries), 0)
+
+        user.first_name = "Renamed"
+        user.save()  # warms the alias cache
+        user.first_name = "Renamed Again"
+        with CaptureQueriesContext(connection) as default_queries:
+            user.save()
+        self.assertFalse([query for query in default_queries if "accounts_organization" in query["sql"]])
+        self.assertEqual(CustomUser.objects.using("shard_1").get(pk=user.pk).first_name, "Renamed Again")
+
+    def test_streaming_bodies_query_the_shard_until_closed(self):
+        class LazyProductNames(sharding.OrganizationDatabaseMixin, APIView):
+            def get(self, request):
+                def names():
+                    # Runs while the body is sent, after the view has returned
+                    for name in Product.objects.filter(organization=request.user.organization).values_list(
+                        "name", flat=True,
+                    ):
+                        yield f"{name}\n"
+                return StreamingHttpResponse(names())
+
+        self.move("shard_1")
+        request = RequestFactory().get("/lazy/")
+        force_authenticate(request, self.user)
+        response = LazyProductNames.as_view()(request)
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 3)
+        self.assertEqual(sharding.active_db(), "shard_1")
+        response.close()
+        self.assertIsNone(sharding.active_db())
+
+    def test_failing_views_leave_no_shard_active(self):
+        class Failing(sharding.OrganizationDatabaseMixin, APIView):
+            def get(self, request):
+                raise RuntimeError("unhandled")
+
+        self.move("shard_1")
+        request = RequestFactory().get("/failing/")
+        force_authenticate(request, self.user)
+        with self.assertRaises(RuntimeError):
+            Failing.as_view()(request)
+        # Later requests on this thread must not inherit the shard
+        self.assertIsNone(sharding.active_db())
+
+
+# =====================================================
+# Async report views
+# =====================================================
+class AsyncReportViewTests(TransactionTestCase):
+    """The async views run their queries on worker threads and must answer exactly like the sync ones."""
+
+    def setUp(self):
+        self.organization, self.user = seed_organization()
+        seed_organization("Other Async Org")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_async_views_match_sync_views(self):
+        for sync_name, async_name in [
+            ("inventory-dashboard", "async-inventory-dashboard"),
+            ("sales-report", "async-sales-report"),
+            ("stock-report", "async-stock-report"),
+        ]:
+            with self.subTest(async_name):
+                expected = self.client.get(reverse(sync_name))
+                response = self.client.get(reverse(async_name))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), expected.json())
+
+    def test_async_views_require_authentication(self):
+        response = APIClient().get(reverse("async-inventory-dashboard"))
+        self.assertEqual(response.status_code, 401)
+
+
+# =====================================================
+# Synthetic dataset generation
+# =====================================================
+class GenerateDatasetTests(TestCase):
+    options = [
+        "--organizations", "2", "--products", "20", "--sales", "30", "--customers", "5",
+        "--users", "2", "--seed", "7",
+    ]
+
+    def generate(self, *args):
+        call_command("generate_dataset", *self.options, *args, stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_generates_consistent_data(self):
+        self.generate()
+        self.assertEqual(Organization.objects.count(), 2)
+        self.assertEqual(Product.objects.count(), 40)
+        self.assertEqual(Sale.objects.count(), 60)
+        # Opening stock covers every sale: stock never goes negative and movements add up
+        self.assertFalse(Product.objects.filter(current_stock__lt=0).exists())
+        for product in Product.objects.all()[:10]:
+            movements = StockMovement.objects.filter(product=product)
+            received = movements.filter(movement_type="in").aggregate(total=Sum("quantity"))["total"] or 0
+            sold = movements.filter(movement_type="out").aggregate(total=Sum("quantity"))["total"] or 0
+            self.assertEqual(received - sold, product.current_stock)
+
+    def test_same_seed_is_reproducible(self):
+        self.generate()
+        first = sorted(Product.objects.values_list("id", "current_stock"))
+        self.generate("--flush")
+        self.assertEqual(sorted(Product.objects.values_list("id", "current_stock")), first)
+        self.assertEqual(Organization.objects.count(), 2)
+
+    def test_rerun_with_same_seed_needs_flush(self):
+        self.generate()
+        with self.assertRaisesMessage(CommandError, "--flush"):
+            self.generate()
+        self.assertEqual(Product.objects.count(), 40)
+
+
+# =====================================================
+# Load test command
+# =====================================================
+class LoadTestCommandTests(SimpleTestCase):
+    def test_parse_mix(self):
+        self.assertEqual(loadtest.parse_mix("login=1, catalog=2.5,dashboard"), {
+            "login": 1.0, "catalog": 2.5, "dashboard": 1.0,
+        })
+        with self.assertRaisesMessage(CommandError, "Unknown scenario 'refund'"):
+            loadtest.parse_mix("refund=1")
+        with self.assertRaisesMessage(CommandError, "Invalid weight for 'catalog'"):
+            loadtest.parse_mix("catalog=many")
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(values, 50), 50)
+        self.assertEqual(loadtest.percentile(values, 95), 95)
+        self.assertEqual(loadtest.percentile(values, 100), 100)
+        self.assertEqual(loadtest.percentile([7], 99), 7)
+        self.assertIsNone(loadtest.percentile([], 50))
+
+    def test_report(self):
+        stats = loadtest.LoadStats()
+        for elapsed in (10, 20, 30, 40):
+            stats.record("products", elapsed, 200)
+        stats.record("checkout", 100, 500)
+        report = stats.report(elapsed_s=2, concurrency=3)
+        self.assertEqual(report["requests"], 5)
+        self.assertEqual(report["errors"], 1)
+        self.assertEqual(report["throughput_rps"], 2.5)
+        self.assertEqual(report["endpoints"]["products"], {
+            "requests": 4, "errors": 0, "statuses": {200: 4}, "throughput_rps": 2.0,
+            "mean_ms": 25.0, "p50_ms": 20, "p95_ms": 40, "p99_ms": 40, "max_ms": 40,
+        })
+        self.assertEqual(report["endpoints"]["checkout"]["statuses"], {500: 1})
+
+    def test_failed_login_is_recorded_not_raised(self):
+        attempts = []
+
+        def handler(request):
+            if request.url.path == "/api/user-login/":
+                attempts.append(request)
+                if len(attempts) == 1:
+                    return httpx.Response(401, json={"detail": "Invalid credentials"})
+                return httpx.Response(200, json={"access_token": "token"})
+            self.assertEqual(request.headers["Authorization"], "Bearer token")
+            return httpx.Response(200, json={})
+
+        async def run():
+            stats = loadtest.LoadStats()
+            till = loadtest.PosWorkflow("http://till.test", "till@example.com", "pass", stats, random.Random(1))
+            till.client = httpx.AsyncClient(base_url="http://till.test", transport=httpx.MockTransport(handler))
+            self.assertFalse(await till.login())
+            # The next scenario logs in again before it runs
+            await till.run("dashboard")
+            await till.client.aclose()
+            return stats
+
+        stats = asyncio.run(run())
+        self.assertEqual(dict(stats.statuses["login"]), {401: 1, 200: 1})
+        self.assertEqual(stats.errors["login"], 1)
+        self.assertEqual(dict(stats.statuses["dashboard"]), {200: 1})
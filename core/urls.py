@@ -1,7 +1,7 @@
 # core/urls.py
 from rest_framework import routers
 from django.urls import path, include
-from .views import all_view
+from .views import all_view, async_views
 
 
 
@@ -30,6 +30,15 @@ urlpatterns = [
 
     path("v1/dashboard/inventory/", all_view.InventoryDashboardAPIView.as_view(), name="inventory-dashboard"),
 
+    path("v1/sync/catalog/", all_view.CatalogSyncAPIView.as_view(), name="catalog-sync"),
+    path("v1/pos/bootstrap/", all_view.PosBootstrapAPIView.as_view(), name="pos-bootstrap"),
+    path("v1/pos/snapshot/", all_view.PosSnapshotAPIView.as_view(), name="pos-snapshot"),
+
+    # Async variants: independent aggregates run concurrently (serve with ASGI)
+    path("v1/async/reports/sales/", async_views.AsyncSalesReportView.as_view(), name="async-sales-report"),
+    path("v1/async/reports/stock/", async_views.AsyncStockReportView.as_view(), name="async-stock-report"),
+    path("v1/async/dashboard/inventory/", async_views.AsyncInventoryDashboardView.as_view(), name="async-inventory-dashboard"),
+
 
 
 
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum, Count
+
+from core.utils.replica import read_from_replica
+
+
+# Recomputed stats are read from the replica when one is configured.
+# Short TTL: sale/purchase writes invalidate explicitly, the TTL only bounds
+# staleness for writes that bypass signals (queryset.update, bulk_create).
+ADMIN_STATS_CACHE_TIMEOUT = getattr(settings, "ADMIN_STATS_CACHE_TIMEOUT", 60)
+
+
+def stats_cache_key(kind, pk):
+    return f"admin-stats:{kind}:{pk}"
+
+
+def product_stats(product):
+    def compute():
+        sales = product.sale_items.aggregate(
+            total_sold=Sum('quantity'),
+            total_revenue=Sum('subtotal')
+        )
+        purchases = product.purchase_items.aggregate(
+            total_purchased=Sum('quantity'),
+            total_cost=Sum('subtotal')
+        )
+        return {**sales, **purchases}
+
+    with read_from_replica():
+        return cache.get_or_set(stats_cache_key("product", product.pk), compute, ADMIN_STATS_CACHE_TIMEOUT)
+
+
+def supplier_stats(supplier):
+    def compute():
+        return supplier.purchases.aggregate(
+            total_purchases=Count('id'),
+            total_amount=Sum('total_amount')
+        )
+
+    with read_from_replica():
+        return cache.get_or_set(stats_cache_key("supplier", supplier.pk), compute, ADMIN_STATS_CACHE_TIMEOUT)
+
+
+def customer_stats(customer):
+    def compute():
+        return customer.sales.aggregate(
+            total_sales=Count('id'),
+            total_amount=Sum('net_total'),
+            total_paid=Sum('paid_amount')
+        )
+
+    with read_from_replica():
+        return cache.get_or_set(stats_cache_key("customer", customer.pk), compute, ADMIN_STATS_CACHE_TIMEOUT)
+
+
+def invalidate_stats(kind, *pks):
+    keys = [stats_cache_key(kind, pk) for pk in pks if pk is not None]
+    if keys:
+        cache.delete_many(keys)
@@ -0,0 +1,29 @@
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+
+from core.utils.metrics import CACHE_REQUESTS
+
+
+class MeteredCacheMixin:
+    """Counts cache hits and misses for /metrics. Mix into any cache backend class."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, default, version)
+        CACHE_REQUESTS.inc(result="miss" if value is default else "hit")
+        return value
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        # Same as BaseCache.get_or_set, but counted once: its re-read after add() is not a hit
+        value = super().get(key, self._missing_key, version)
+        if value is not self._missing_key:
+            CACHE_REQUESTS.inc(result="hit")
+            return value
+        CACHE_REQUESTS.inc(result="miss")
+        if callable(default):
+            default = default()
+        self.add(key, default, timeout=timeout, version=version)
+        return super().get(key, default, version)
+
+
+class MeteredLocMemCache(MeteredCacheMixin, LocMemCache):
+    pass
@@ -0,0 +1,161 @@
+"""
+Delta sync of an organization's catalog (products, categories, customers).
+
+Every save and delete of a catalog row appends a CatalogChange on the same
+database once its transaction commits, so change ids follow commit order: a
+transaction that started early but commits late gets a higher id than the
+changes a terminal already read, instead of a lower one it would skip. A
+terminal keeps an opaque cursor (the last change id it applied) and asks for
+what changed since; it gets current rows for upserts and ids for deletions. A cursor from another shard, or one older than
+the change log's retention, answers `reset` and the terminal downloads the
+catalog again.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core.models import CatalogChange, Category, Customer, Product
+from core.serializers.fast_serializers import FastCategorySerializer, FastCustomerSerializer, FastProductSerializer
+
+
+# Log name -> (model, response key, serializer for upserted rows)
+CATALOG_MODELS = {
+    "product": (Product, "products", FastProductSerializer),
+    "category": (Category, "categories", FastCategorySerializer),
+    "customer": (Customer, "customers", FastCustomerSerializer),
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def model_name(model):
+    for name, (catalog_model, _, _) in CATALOG_MODELS.items():
+        if catalog_model is model:
+            return name
+    return None
+
+
+def record_changes(model, organization_id, object_ids, action, using):
+    """Log `action` for `object_ids` after the current transaction commits (at once outside one)."""
+    name = model_name(model)
+    object_ids = list(object_ids)
+
+    def insert():
+        # Built here so `changed_at` is the commit time too
+        try:
+            CatalogChange.objects.using(using).bulk_create(
+                CatalogChange(organization_id=organization_id, model=name, object_id=object_id, action=action)
+                for object_id in object_ids
+            )
+        except IntegrityError:
+            pass  # the organization left this database in the same transaction (move_organization)
+
+    if object_ids:
+        transaction.on_commit(insert, using=using)
+
+
+def record_change(instance, action, using):
+    record_changes(type(instance), instance.organization_id, [instance.pk], action, using)
+
+
+# -----------------------
+# Cursors
+# -----------------------
+def encode_cursor(alias, change_id):
+    payload = {"db": alias, "id": change_id, "ts": int(timezone.now().timestamp())}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(token):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return payload["db"], int(payload["id"]), int(payload["ts"])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor(token)
+
+
+def retention():
+    return timedelta(days=getattr(settings, "CATALOG_CHANGE_RETENTION_DAYS", 30))
+
+
+def cursor_is_current(alias, cursor_alias, issued_at):
+    issued = datetime.fromtimestamp(issued_at, tz=dt_timezone.utc)
+    return cursor_alias == alias and timezone.now() - issued < retention()
+
+
+# -----------------------
+# Change feed
+# -----------------------
+def settled_changes(organization, alias):
+    """
+    Only changes older than CATALOG_SYNC_SETTLE_SECONDS are handed out. Log
+    rows are inserted in their own autocommit statement after the catalog
+    write commits, so ids can only come out of order between two concurrent
+    inserts; the window covers that.
+    """
+    settled = timezone.now() - timedelta(seconds=getattr(settings, "CATALOG_SYNC_SETTLE_SECONDS", 2))
+    return CatalogChange.objects.using(alias).filter(organization=organization, changed_at__lte=settled)
+
+
+def head_cursor(organization, alias):
+    """Cursor for a terminal whose catalog was read after this call."""
+    latest = settled_changes(organization, alias).order_by("-id").values_list("id", flat=True).first()
+    return encode_cursor(alias, latest or 0)
+
+
+def changes_since(organization, alias, after, limit):
+    """Changes with id > `after`, oldest first: (last id, has_more, {name: {object_id: action}})."""
+    rows = list(
+        settled_changes(organization, alias).filter(id__gt=after)
+        .order_by("id").values_list("id", "model", "object_id", "action")[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    latest = {name: {} for name in CATALOG_MODELS}
+    for _, name, object_id, action in rows:
+        if name in latest:
+            latest[name][object_id] = action  # the last change to an object wins
+    return (rows[-1][0] if rows else after), has_more, latest
+
+
+def sync_payload(organization, alias, token, limit):
+    """Response body for one sync request; raises InvalidCursor for a malformed token."""
+    if token:
+        cursor_alias, after, issued_at = decode_cursor(token)
+        reset = not cursor_is_current(alias, cursor_alias, issued_at)
+    else:
+        reset = True
+    if reset:
+        # Start from here; the terminal downloads the whole catalog (bootstrap or list endpoints)
+        return {"reset": True, "cursor": head_cursor(organization, alias), "has_more": False, "changes": {}}
+
+    last_id, has_more, latest = changes_since(organization, alias, after, limit)
+    changes = {}
+    for name, actions in latest.items():
+        model, key, serializer_class = CATALOG_MODELS[name]
+        upserted = [object_id for object_id, action in actions.items() if action == "upsert"]
+        rows = []
+        if upserted:
+            serializer = serializer_class()
+            rows = serializer.serialize(serializer.values(
+                model.objects.using(alias).filter(organization=organization, pk__in=upserted)
+            ))
+        found = {row["id"] for row in rows}
+        # Rows gone since their upsert are reported deleted; their delete follows in a later page
+        deleted = [str(object_id) for object_id in actions if str(object_id) not in found]
+        changes[key] = {"upserted": rows, "deleted": deleted}
+    return {"reset": False, "cursor": encode_cursor(alias, last_id), "has_more": has_more, "changes": changes}
+
+
+def prune_changes(alias, older_than=None):
+    """Delete log rows past retention; their cursors answer `reset`."""
+    cutoff = timezone.now() - (older_than or retention())
+    deleted, _ = CatalogChange.objects.using(alias).filter(changed_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,145 @@
+"""
+Content-encoding negotiation and incremental compressors for
+core.middleware.compression.
+"""
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+
+DEFAULT_LEVELS = {"*": {"br": 4, "gzip": 6}}
+
+
+def supported_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def accepted_encoding(accept_encoding, encodings=None):
+    """
+    The encoding to use for an Accept-Encoding header, or None. Picks from
+    `encodings` (default: all supported), earlier ones preferred.
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding.strip().lower()] = quality
+    candidates = [
+        (weights.get(encoding, weights.get("*", 0.0)), -rank, encoding)
+        for rank, encoding in enumerate(encodings or supported_encodings())
+    ]
+    quality, _, encoding = max(candidates)
+    return encoding if quality > 0 else None
+
+
+def compression_level(content_type, encoding):
+    """Level from COMPRESSION_LEVELS for the media type, its major type (`text/*`) or `*`."""
+    levels = getattr(settings, "COMPRESSION_LEVELS", DEFAULT_LEVELS)
+    media_type = content_type.split(";")[0].strip().lower()
+    for key in (media_type, f"{media_type.split('/')[0]}/*", "*"):
+        if encoding in levels.get(key, {}):
+            return levels[key][encoding]
+    return DEFAULT_LEVELS["*"][encoding]
+
+
+def is_compressible(content_type):
+    media_type = content_type.split(";")[0].strip().lower()
+    skipped = getattr(settings, "COMPRESSION_SKIP_TYPES", ())
+    return not any(media_type == skip or (skip.endswith("/") and media_type.startswith(skip)) for skip in skipped)
+
+
+class CredentialResponseMixin:
+    """
+    For views whose responses carry credentials (JWTs): `Cache-Control:
+    no-store, no-transform`. Compressed, a secret next to attacker-influenced
+    content leaks through the response size (BREACH); CompressionMiddleware
+    leaves no-transform responses uncompressed, and nothing caches the tokens.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        patch_cache_control(response, no_store=True, no_transform=True)
+        return response
+
+
+# -----------------------
+# Compressors
+# -----------------------
+class Compressor:
+    """`compress(data)` and `flush()` return what is ready so far; `finish()` ends the stream."""
+
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=level)
+        else:
+            self.compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+
+    def compress(self, data):
+        if self.encoding == "br":
+            return self.compressor.process(data)
+        return self.compressor.compress(data)
+
+    def flush(self):
+        if self.encoding == "br":
+            return self.compressor.flush()
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+def compress_bytes(data, encoding, level):
+    compressor = Compressor(encoding, level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def _feed(compressor, chunk, buffered, flush_bytes):
+    """Compress one chunk; flush once `flush_bytes` went in since the last flush. Returns (output, buffered)."""
+    if isinstance(chunk, str):
+        chunk = chunk.encode()
+    output = compressor.compress(chunk)
+    buffered += len(chunk)
+    if buffered >= flush_bytes:
+        output += compressor.flush()
+        buffered = 0
+    return output, buffered
+
+
+def compress_stream(chunks, encoding, level, flush_bytes):
+    """
+    Compress an iterable of chunks incrementally. Output is flushed every
+    `flush_bytes` of input, so clients receive rows as an export runs without
+    row-sized chunks wrecking the compression ratio.
+    """
+    compressor = Compressor(encoding, level)
+    buffered = 0
+    for chunk in chunks:
+        output, buffered = _feed(compressor, chunk, buffered, flush_bytes)
+        if output:
+            yield output
+    yield compressor.finish()
+
+
+async def compress_stream_async(chunks, encoding, level, flush_bytes):
+    compressor = Compressor(encoding, level)
+    buffered = 0
+    async for chunk in chunks:
+        output, buffered = _feed(compressor, chunk, buffered, flush_bytes)
+        if output:
+            yield output
+    yield compressor.finish()
@@ -0,0 +1,65 @@
+"""
+Conditional GETs for catalog lists that clients poll.
+
+An organization's catalog version is its row count plus its latest
+`updated_at`, read with one index-only aggregate: an insert or edit moves the
+timestamp and a delete changes the count. Lists that render rows of another
+model (product categories) add that model's version too, since deleting a
+category nulls its products' foreign key with a bare UPDATE that leaves their
+`updated_at` alone. When the client's ETag still matches, the view answers
+304 without running the list query or serializing anything.
+
+There is no Last-Modified: a delete leaves the latest `updated_at` where it
+was and HTTP dates only have whole seconds, so If-Modified-Since alone would
+answer 304 for lists that changed.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+
+
+def catalog_version(queryset):
+    """(row count, latest updated_at) of `queryset`."""
+    state = queryset.order_by().aggregate(rows=Count("pk"), last_modified=Max("updated_at"))
+    return state["rows"], state["last_modified"]
+
+
+class ConditionalListMixin:
+    """
+    For org-scoped viewsets over models with `updated_at`: an ETag on `list`. `version_dependencies` lists other org-scoped models whose
+    changes show up in the rendered rows.
+    """
+    version_dependencies = ()
+
+    def list_versions(self, queryset):
+        versions = [catalog_version(queryset)]
+        for model in self.version_dependencies:
+            versions.append(catalog_version(
+                model.objects.using(queryset.db).filter(organization=self.request.user.organization)
+            ))
+        return versions
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).select_related(None).prefetch_related(None)
+        versions = self.list_versions(queryset)
+        # The same catalog renders differently per format, field selection and page
+        state = ":".join(
+            f"{rows}:{last_modified.isoformat() if last_modified else ''}" for rows, last_modified in versions
+        )
+        variant = f"{state}:{request.get_full_path()}:{request.accepted_media_type}"
+        etag = quote_etag(hashlib.md5(variant.encode()).hexdigest())
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            response = not_modified
+        else:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response["ETag"] = etag
+        # Clients keep their copy but must revalidate; responses differ per user
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ["Authorization"])
+        return response
@@ -0,0 +1,153 @@
+"""
+Streaming exports: `?format=ndjson` or `?format=csv` (or the matching Accept
+header) on org-scoped lists and the report views.
+
+The response is a StreamingHttpResponse over `queryset.iterator(chunk_size=...)`,
+so an export of any size is never held in memory at once and is not paginated.
+`?currency=bdt` formats money columns with `format_bangladeshi_currency`.
+"""
+import csv
+import json
+from itertools import chain, islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework import serializers
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from accounts.utils.value_formate import format_bangladeshi_currency
+
+
+def chunk_size():
+    return getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+
+
+def format_money(row, money_fields):
+    for name in money_fields:
+        value = row.get(name)
+        if value not in (None, ""):
+            row[name] = format_bangladeshi_currency(float(value))
+    return row
+
+
+# -----------------------
+# Renderers
+# -----------------------
+class StreamingRenderer(BaseRenderer):
+    charset = "utf-8"
+
+    def lines(self, rows, columns=None):
+        raise NotImplementedError
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Responses that are not streamed (detail views, errors) in the same format."""
+        if isinstance(data, dict) and isinstance(data.get("results"), list):
+            rows = data["results"]
+        elif isinstance(data, list):
+            rows = data
+        else:
+            rows = [data]
+        return "".join(self.lines(rows)).encode(self.charset)
+
+
+class NDJSONRenderer(StreamingRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def lines(self, rows, columns=None):
+        for row in rows:
+            yield json.dumps(row, cls=JSONEncoder, ensure_ascii=False) + "\n"
+
+
+class _Line:
+    """File-like object handing back what csv.writer writes, one line at a time."""
+
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(StreamingRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+    @staticmethod
+    def cell(value):
+        if value is None:
+            return ""
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, cls=JSONEncoder, ensure_ascii=False)
+        return value
+
+    def lines(self, rows, columns=None):
+        writer = csv.writer(_Line())
+        rows = iter(rows)
+        first = next(rows, None)
+        if columns is None:
+            columns = list(first) if first is not None else []
+        if columns:
+            yield writer.writerow(columns)
+        if first is None:
+            return
+        for row in chain([first], rows):
+            yield writer.writerow([self.cell(row.get(name)) for name in columns])
+
+
+EXPORT_RENDERER_CLASSES = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer, CSVRenderer]
+
+
+def is_export(request):
+    return isinstance(getattr(request, "accepted_renderer", None), StreamingRenderer)
+
+
+# -----------------------
+# Responses
+# -----------------------
+def export_response(request, rows, filename, columns=None, money_fields=()):
+    renderer = request.accepted_renderer
+    if money_fields and request.query_params.get("currency") == "bdt":
+        rows = (format_money(row, money_fields) for row in rows)
+    response = StreamingHttpResponse(
+        renderer.lines(rows, columns), content_type=f"{renderer.media_type}; charset={renderer.charset}",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{renderer.format}"'
+    return response
+
+
+def export_values(request, serializer, queryset, filename):
+    """Stream `queryset` through a ValuesSerializer."""
+    # Pin the database now: shard and replica routing only apply while the view runs
+    rows = serializer.values(queryset.using(queryset.db)).iterator(chunk_size=chunk_size())
+    return export_response(
+        request, serializer.iter_serialize(rows), filename,
+        columns=serializer.outputs(), money_fields=serializer.money_fields(),
+    )
+
+
+class StreamingExportMixin:
+    """For viewsets: `list` streams the whole filtered queryset when an export format is requested."""
+
+    def list(self, request, *args, **kwargs):
+        if not is_export(request):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        # Same order as the paginated list
+        ordering = self.pagination_ordering() if hasattr(self, "pagination_ordering") else ()
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return self.export(queryset.using(queryset.db))
+
+    def export(self, queryset):
+        fields = self.get_serializer().fields
+        money_fields = {name for name, field in fields.items() if isinstance(field, serializers.DecimalField)}
+        return export_response(
+            self.request, self.export_rows(queryset), self.basename,
+            columns=list(fields), money_fields=money_fields,
+        )
+
+    def export_rows(self, queryset):
+        # Serialized a chunk at a time, so prefetches run per chunk too
+        instances = queryset.iterator(chunk_size=chunk_size())
+        while chunk := list(islice(instances, chunk_size())):
+            yield from self.get_serializer(chunk, many=True).data
@@ -0,0 +1,100 @@
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from rest_framework import serializers
+
+
+_current_metrics = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """Query and timing figures collected while one request is processed."""
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.timings = defaultdict(float)  # name -> milliseconds
+        self.queries = []  # (sql, milliseconds)
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def db_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    @property
+    def total_time(self):
+        return (perf_counter() - self.started) * 1000
+
+    def query_wrapper(self, execute, sql, params, many, context):
+        """`connection.execute_wrapper` hook recording every query's duration."""
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, (perf_counter() - start) * 1000))
+
+    def slowest_queries(self, limit):
+        return sorted(self.queries, key=lambda query: query[1], reverse=True)[:limit]
+
+    def repeated_queries(self, minimum=2):
+        """Identical SQL text run several times per request usually means an N+1."""
+        counts = Counter(sql for sql, _ in self.queries)
+        return {sql: count for sql, count in counts.most_common() if count >= minimum}
+
+
+def current_metrics():
+    return _current_metrics.get()
+
+
+@contextmanager
+def collect_metrics():
+    metrics = RequestMetrics()
+    token = _current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_metrics.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """Add the duration of the block to the current request's `name` timing."""
+    metrics = _current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += (perf_counter() - start) * 1000
+
+
+# -----------------------
+# Serializer timing
+# -----------------------
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with timed("serializer"):
+            return super().data
+
+
+class TimedSerializerMixin:
+    """Counts time spent producing `.data` towards the request's serializer timing."""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        serializer = super().many_init(*args, **kwargs)
+        if type(serializer) is serializers.ListSerializer:
+            serializer.__class__ = TimedListSerializer
+        return serializer
+
+    @property
+    def data(self):
+        with timed("serializer"):
+            return super().data
@@ -0,0 +1,322 @@
+"""
+Process-wide metrics exposed at /metrics in the Prometheus text format.
+
+Every worker process keeps its own counters, gauges and histograms in memory
+and periodically writes them to `<METRICS_DIR>/<pid>-<token>.json`, holding a
+lock on the matching `.lock` file for as long as it lives. The /metrics view
+merges all files in the directory, so whichever worker answers the scrape
+reports totals for the whole host. A worker whose lock is free has exited:
+its counters and histograms are folded into `archived.json` (they are
+cumulative), its gauges dropped and its files removed. The random token keeps
+a new process that reuses a pid from overwriting the old one's file.
+"""
+import json
+import math
+import os
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from time import monotonic, perf_counter
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: liveness falls back to the pid
+    fcntl = None
+
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ARCHIVE_NAME = "archived"  # merged counters and histograms of exited workers
+
+
+class Metric:
+    type = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}  # label values tuple -> value
+        registry.register(self)
+
+    def key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        return [[list(key), value] for key, value in self.values.items()]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self.registry.lock:
+            self.values[self.key(labels)] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets) + (math.inf,)
+        super().__init__(registry, name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self.registry.lock:
+            counts, total = self.values.get(key, ([0] * len(self.buckets), 0.0))
+            counts[index] += 1
+            self.values[key] = (counts, total + value)
+
+    def snapshot(self):
+        return [[list(key), [list(counts), total]] for key, (counts, total) in self.values.items()]
+
+    @contextmanager
+    def time(self, **labels):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start, **labels)
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.last_flush = 0.0
+        self.pid = None
+        self.worker = None
+        self.worker_lock = None
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    @property
+    def directory(self):
+        return getattr(settings, "METRICS_DIR", os.path.join(tempfile.gettempdir(), "inventory-metrics"))
+
+    def worker_name(self):
+        """`<pid>-<token>` of this process; a forked child gets its own name and starts from zero."""
+        if self.pid != os.getpid():
+            if self.pid is not None:
+                # Inherited values are already counted in the parent's file
+                with self.lock:
+                    for metric in self.metrics.values():
+                        metric.values.clear()
+            self.pid = os.getpid()
+            self.worker = f"{self.pid}-{uuid.uuid4().hex[:12]}"
+            if fcntl is not None:
+                os.makedirs(self.directory, exist_ok=True)
+                self.worker_lock = open(os.path.join(self.directory, f"{self.worker}.lock"), "w")
+                fcntl.flock(self.worker_lock, fcntl.LOCK_EX)
+        return self.worker
+
+    def snapshot(self):
+        with self.lock:
+            return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, f"{name}.json")
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as metrics_file:
+            json.dump(data, metrics_file)
+        os.replace(temp_path, path)  # readers never see a half-written file
+
+    def read(self, name):
+        try:
+            with open(os.path.join(self.directory, f"{name}.json")) as metrics_file:
+                return json.load(metrics_file)
+        except (OSError, ValueError):
+            return None
+
+    def flush(self):
+        """Write this process's values to its file in the shared directory."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.write(self.worker_name(), self.snapshot())
+        self.last_flush = monotonic()
+
+    def maybe_flush(self):
+        if monotonic() - self.last_flush >= getattr(settings, "METRICS_FLUSH_INTERVAL", 1):
+            self.flush()
+
+    def worker_names(self):
+        return [
+            filename[:-len(".json")] for filename in os.listdir(self.directory)
+            if filename.endswith(".json") and filename != f"{ARCHIVE_NAME}.json"
+        ]
+
+    def worker_alive(self, name):
+        if fcntl is None:
+            return process_alive(int(name.split("-")[0]))
+        try:
+            lock_file = open(os.path.join(self.directory, f"{name}.lock"))
+        except FileNotFoundError:
+            return False
+        with lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            return False
+
+    @contextmanager
+    def reap_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, "reap.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def reap(self):
+        """Fold the counters and histograms of exited workers into the archive and delete their files."""
+        with self.reap_lock():
+            dead = [name for name in self.worker_names() if not self.worker_alive(name)]
+            if not dead:
+                return
+            archive = {name: {} for name in self.metrics}
+            self.merge(archive, self.read(ARCHIVE_NAME) or {}, alive=False)
+            for name in dead:
+                self.merge(archive, self.read(name) or {}, alive=False)
+            self.write(ARCHIVE_NAME, {
+                name: [[list(key), list(value) if isinstance(value, tuple) else value] for key, value in samples.items()]
+                for name, samples in archive.items() if samples
+            })
+            for name in dead:
+                for suffix in (".json", ".lock"):
+                    try:
+                        os.remove(os.path.join(self.directory, name + suffix))
+                    except FileNotFoundError:
+                        pass
+
+    def merge(self, merged, data, alive):
+        """Add one file's samples into {name: {label key: value}}; gauges only count for live workers."""
+        for name, samples in data.items():
+            metric = self.metrics.get(name)
+            if metric is None or (metric.type == "gauge" and not alive):
+                continue
+            for key, value in samples:
+                key = tuple(key)
+                if metric.type == "histogram":
+                    counts, total = merged[name].get(key, ([0] * len(metric.buckets), 0.0))
+                    merged[name][key] = ([a + b for a, b in zip(counts, value[0])], total + value[1])
+                else:
+                    merged[name][key] = merged[name].get(key, 0) + value
+
+    def collect(self):
+        """Merge the archive and the files of every live process into {name: {label key: value}}."""
+        self.flush()
+        self.reap()
+        merged = {name: {} for name in self.metrics}
+        self.merge(merged, self.read(ARCHIVE_NAME) or {}, alive=False)
+        for name in self.worker_names():
+            data = self.read(name)
+            if data is not None:
+                self.merge(merged, data, alive=True)
+        return merged
+
+    def render(self):
+        merged = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for key, value in sorted(merged[name].items()):
+                labels = list(zip(metric.labelnames, key))
+                if metric.type != "histogram":
+                    lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+                    continue
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(metric.buckets, counts):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else format_value(bound)
+                    lines.append(f"{name}_bucket{format_labels(labels + [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {format_value(total)}")
+                lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+        lines += self.derived(merged)
+        return "\n".join(lines) + "\n"
+
+    def derived(self, merged):
+        """Ratios that are awkward to compute from the raw series."""
+        requests = merged.get(CACHE_REQUESTS.name, {})
+        hits = sum(value for (result,), value in requests.items() if result == "hit")
+        total = sum(requests.values())
+        return [
+            "# HELP cache_hit_ratio Share of cache reads that were hits since the metrics directory was created.",
+            "# TYPE cache_hit_ratio gauge",
+            f"cache_hit_ratio {format_value(hits / total if total else 0)}",
+        ]
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        name + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+# -----------------------
+# Metrics
+# -----------------------
+REQUEST_LATENCY = Histogram(
+    REGISTRY, "http_request_duration_seconds", "Request latency by route.", ["method", "route", "status"],
+)
+DB_QUERIES = Counter(REGISTRY, "db_queries_total", "Database queries run while serving requests.", ["route"])
+DB_QUERIES_PER_REQUEST = Histogram(
+    REGISTRY, "db_queries_per_request", "Database queries per request.", ["route"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200),
+)
+DB_TIME = Counter(REGISTRY, "db_query_seconds_total", "Time spent in database queries.", ["route"])
+CACHE_REQUESTS = Counter(REGISTRY, "cache_requests_total", "Cache reads by result.", ["result"])
+PDF_RENDER = Histogram(
+    REGISTRY, "pdf_render_duration_seconds", "Invoice PDF render time.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
+)
+MAIL_QUEUE_DEPTH = Gauge(REGISTRY, "mail_queue_depth", "Emails waiting for or being sent by the background sender.")
+CHECKOUTS = Counter(REGISTRY, "pos_checkouts_total", "Completed sales.")
+CHECKOUT_ITEMS = Counter(REGISTRY, "pos_checkout_items_total", "Sale lines in completed sales.")
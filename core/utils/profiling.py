@@ -0,0 +1,111 @@
+import cProfile
+import os
+import sys
+import threading
+import uuid
+from collections import Counter
+from time import sleep
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.text import slugify
+
+
+PROFILED_USERS_CACHE_KEY = "profiling:user-ids"
+
+
+# -----------------------
+# Per-user toggle
+# -----------------------
+def profiled_users_timeout():
+    return getattr(settings, "PROFILING_USERS_CACHE_TIMEOUT", 30)
+
+
+def profiled_user_ids():
+    """
+    Ids (as strings) of users whose requests are profiled. Toggles invalidate
+    the cache of the worker that saved them; the timeout bounds how long the
+    other workers (each with its own cache) keep the old set.
+    """
+    from accounts.models import CustomUser
+
+    return cache.get_or_set(
+        PROFILED_USERS_CACHE_KEY,
+        lambda: {str(pk) for pk in CustomUser.objects.filter(profile_requests=True).values_list("pk", flat=True)},
+        profiled_users_timeout(),
+    )
+
+
+def invalidate_profiled_users():
+    cache.delete(PROFILED_USERS_CACHE_KEY)
+
+
+# -----------------------
+# Profilers
+# -----------------------
+class StackSampler(threading.Thread):
+    """
+    Samples one thread's Python stack every `interval` seconds and counts
+    identical stacks, which is exactly the collapsed format flame graph tools
+    (flamegraph.pl, speedscope, inferno) read.
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True, name="stack-sampler")
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self.collapse(frame)] += 1
+            sleep(self.interval)
+
+    @staticmethod
+    def collapse(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def write(self, path):
+        with open(path, "w") as collapsed_file:
+            for stack, count in self.stacks.most_common():
+                collapsed_file.write(f"{stack} {count}\n")
+
+
+class RequestProfiler:
+    """
+    Runs a block under cProfile and a stack sampler, then writes
+    `<name>.prof` (pstats / snakeviz) and `<name>.collapsed` to `directory`.
+    """
+
+    def __init__(self, directory, label, sample_interval):
+        self.directory = directory
+        self.name = "{}-{}-{}".format(
+            timezone.now().strftime("%Y%m%d-%H%M%S"), slugify(label)[:60] or "request", uuid.uuid4().hex[:8],
+        )
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident(), sample_interval)
+
+    def __enter__(self):
+        self.sampler.start()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+        self.sampler.stop()
+        os.makedirs(self.directory, exist_ok=True)
+        self.profile.dump_stats(os.path.join(self.directory, f"{self.name}.prof"))
+        self.sampler.write(os.path.join(self.directory, f"{self.name}.collapsed"))
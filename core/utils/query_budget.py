@@ -0,0 +1,190 @@
+"""
+Query and wall-time budgets for API routes.
+
+Test cases mix in `QueryBudgetMixin`, seed an organization and call
+`assert_route_budgets()` with the routes to check. Measurements are compared
+to the checked-in `query_budgets.json`; run the tests with
+`UPDATE_QUERY_BUDGETS=1` to rewrite it after an intended change and review the
+diff like any other code change.
+"""
+import json
+import math
+import os
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver
+
+from accounts.models import Organization, CustomUser
+from core.models import (
+    Category, Product, Supplier, Customer,
+    Sale, SaleItem, Purchase, PurchaseItem, StockMovement, ContactMessage
+)
+
+
+BUDGET_FILE = settings.BASE_DIR / "query_budgets.json"
+
+# Wall time is noisy; budgets leave this much headroom over the measured time.
+TIME_HEADROOM = 4
+MIN_TIME_BUDGET_MS = 500
+
+
+def seed_organization(name="Budget Org", size=10):
+    """Create one organization with `size` rows of every org-scoped model."""
+    organization = Organization.objects.create(name=name)
+    user = CustomUser.objects.create_user(
+        username=f"{name}-owner".replace(" ", "").lower(), email=f"owner@{name.replace(' ', '').lower()}.com",
+        organization=organization, role="admin", is_owner=True, is_verified=True,
+    )
+    slug = name.replace(" ", "").upper()
+    categories = Category.objects.bulk_create([
+        Category(organization=organization, name=f"Category {i}") for i in range(size)
+    ])
+    products = Product.objects.bulk_create([
+        Product(
+            organization=organization, category=categories[i], product_id=f"{slug}-P{i}",
+            name=f"Product {i}", sku=f"{slug}-SKU{i}", purchase_price=80, sell_price=100,
+            current_stock=50, reorder_level=10,
+        )
+        for i in range(size)
+    ])
+    suppliers = Supplier.objects.bulk_create([
+        Supplier(organization=organization, name=f"Supplier {i}") for i in range(size)
+    ])
+    customers = Customer.objects.bulk_create([
+        Customer(organization=organization, name=f"Customer {i}") for i in range(size)
+    ])
+    sales = Sale.objects.bulk_create([
+        Sale(
+            organization=organization, invoice_number=f"{slug}-INV{i}", customer=customers[i],
+            total_amount=200, net_total=200, paid_amount=200, created_by=user,
+        )
+        for i in range(size)
+    ])
+    SaleItem.objects.bulk_create([
+        SaleItem(sale=sale, product=product, quantity=2, unit_price=100, subtotal=200)
+        for sale in sales for product in products[:2]
+    ])
+    purchases = Purchase.objects.bulk_create([
+        Purchase(
+            organization=organization, purchase_number=f"{slug}-PUR{i}", supplier=suppliers[i],
+            total_amount=800, created_by=user,
+        )
+        for i in range(size)
+    ])
+    PurchaseItem.objects.bulk_create([
+        PurchaseItem(purchase=purchase, product=product, quantity=10, unit_price=80, subtotal=800)
+        for purchase in purchases for product in products[:2]
+    ])
+    StockMovement.objects.bulk_create([
+        StockMovement(
+            organization=organization, product=products[i], movement_type="in",
+            quantity=10, created_by=user,
+        )
+        for i in range(size)
+    ])
+    CustomUser.objects.bulk_create([
+        CustomUser(
+            username=f"{slug.lower()}-operator{i}", email=f"operator{i}@{slug.lower()}.com",
+            organization=organization, role="operator",
+        )
+        for i in range(size)
+    ])
+    ContactMessage.objects.bulk_create([
+        ContactMessage(name=f"Visitor {i}", email=f"visitor{i}@example.com", subject="Hi", message="Hello")
+        for i in range(size)
+    ])
+    return organization, user
+
+
+def get_routes(urlpatterns, prefix="/"):
+    """
+    Yield (route, view) for every GET-able URL pattern in `urlpatterns`,
+    skipping router includes (those are covered through the router registry).
+    """
+    for pattern in urlpatterns:
+        if isinstance(pattern, URLResolver):
+            continue
+        if not isinstance(pattern, URLPattern):
+            continue
+        view_class = getattr(pattern.callback, "view_class", None)
+        if view_class is None or not hasattr(view_class, "get"):
+            continue
+        yield prefix + str(pattern.pattern), pattern
+
+
+def router_routes(router, prefix="/"):
+    """Yield (list_url, detail_url_template, queryset model) for each registered viewset."""
+    for url_prefix, viewset, basename in router.registry:
+        yield (
+            f"{prefix}{url_prefix}/",
+            f"{prefix}{url_prefix}/{{pk}}/",
+            viewset.queryset.model,
+        )
+
+
+def load_budgets():
+    if not BUDGET_FILE.exists():
+        return {}
+    with open(BUDGET_FILE) as budget_file:
+        return json.load(budget_file)
+
+
+def save_budgets(budgets):
+    with open(BUDGET_FILE, "w") as budget_file:
+        json.dump(dict(sorted(budgets.items())), budget_file, indent=2)
+        budget_file.write("\n")
+
+
+class QueryBudgetMixin:
+    """
+    Expects `self.client` to be an authenticated APIClient.
+    """
+    databases = "__all__"
+    update_budgets = os.environ.get("UPDATE_QUERY_BUDGETS") == "1"
+
+    def measure(self, url):
+        # Every alias: reads routed to the replica or a shard count as well
+        with ExitStack() as stack:
+            captures = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+            start = perf_counter()
+            response = self.client.get(url)
+            if getattr(response, "streaming", False):
+                b"".join(response.streaming_content)
+            elapsed = (perf_counter() - start) * 1000
+        self.assertLess(response.status_code, 400, f"GET {url} returned {response.status_code}")
+        return sum(len(queries) for queries in captures), elapsed
+
+    def assert_route_budgets(self, routes):
+        """
+        `routes` maps a budget key such as "GET /api/products/{pk}/" to the URL
+        to request.
+        """
+        budgets = load_budgets()
+        for key, url in routes.items():
+            query_count, elapsed = self.measure(url)
+            if self.update_budgets:
+                budgets[key] = {
+                    "queries": query_count,
+                    "ms": max(MIN_TIME_BUDGET_MS, math.ceil(elapsed * TIME_HEADROOM / 50) * 50),
+                }
+                continue
+            with self.subTest(route=key):
+                self.assertIn(
+                    key, budgets,
+                    f"No budget for {key}; run the tests with UPDATE_QUERY_BUDGETS=1 and commit query_budgets.json",
+                )
+                budget = budgets[key]
+                self.assertLessEqual(
+                    query_count, budget["queries"],
+                    f"{key} ran {query_count} queries, budget is {budget['queries']}",
+                )
+                self.assertLessEqual(
+                    elapsed, budget["ms"],
+                    f"{key} took {elapsed:.0f}ms, budget is {budget['ms']}ms",
+                )
+        if self.update_budgets:
+            save_budgets(budgets)
@@ -0,0 +1,174 @@
+"""
+Read-replica routing for analytic reads.
+
+Reads are sent to the REPLICA_DATABASE_ALIAS database only inside
+`read_from_replica()` (or views using `ReplicaReadMixin`); everything else,
+including every write, stays on `default`. Reads fall back to `default` when:
+
+* the replica alias is unset or not in DATABASES,
+* the replica cannot be reached or lags more than REPLICA_MAX_LAG_SECONDS
+  (checked at most every REPLICA_HEALTH_CHECK_INTERVAL seconds per process),
+* the user wrote something in the last REPLICA_STICKY_SECONDS, so they read
+  their own writes (a signed cookie, see ReplicaStickinessMiddleware),
+* the block runs inside a transaction on `default`.
+"""
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from time import monotonic
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+REPLICA_PIN_COOKIE = "replica_pin"
+
+_replica_reads = ContextVar("replica_reads", default=False)
+_sticky = ContextVar("replica_sticky", default=False)
+_pinned_user = ContextVar("replica_pinned_user", default=None)
+
+_health = {}  # alias -> (checked at, healthy)
+
+
+# -----------------------
+# Replica health
+# -----------------------
+def replica_lag(alias):
+    """Seconds the replica is behind its primary; 0 where the backend cannot tell."""
+    connection = connections[alias]
+    if connection.vendor == "postgresql":
+        sql = (
+            "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+        )
+    elif connection.vendor == "mysql":
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW REPLICA STATUS")
+            row = cursor.fetchone()
+            if row is None:
+                return 0
+            columns = [column[0] for column in cursor.description]
+            return dict(zip(columns, row)).get("Seconds_Behind_Source") or 0
+    else:
+        connection.ensure_connection()  # no lag to measure, but an unreachable replica is still unhealthy
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        return float(cursor.fetchone()[0] or 0)
+
+
+def replica_healthy(alias):
+    checked_at, healthy = _health.get(alias, (None, False))
+    if checked_at is not None and monotonic() - checked_at < getattr(settings, "REPLICA_HEALTH_CHECK_INTERVAL", 5):
+        return healthy
+    try:
+        healthy = replica_lag(alias) <= getattr(settings, "REPLICA_MAX_LAG_SECONDS", 5)
+    except DatabaseError:
+        healthy = False
+    _health[alias] = (monotonic(), healthy)
+    return healthy
+
+
+def clear_health_cache():
+    _health.clear()
+
+
+def replica_alias():
+    """The alias reads should use right now, or None for `default`."""
+    alias = getattr(settings, "REPLICA_DATABASE_ALIAS", None)
+    if not alias or alias not in settings.DATABASES or alias == DEFAULT_DB_ALIAS:
+        return None
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return None
+    if not replica_healthy(alias):
+        return None
+    return alias
+
+
+# -----------------------
+# Read-your-writes stickiness
+# -----------------------
+# The pin travels with the client, not in the per-process cache: the next
+# request may be served by another worker.
+def pin_to_primary(response, user_id, secure=False):
+    response.set_signed_cookie(
+        REPLICA_PIN_COOKIE, str(user_id), salt=REPLICA_PIN_COOKIE,
+        max_age=getattr(settings, "REPLICA_STICKY_SECONDS", 10), secure=secure, httponly=True, samesite="Lax",
+    )
+
+
+def pinned_user_id(request):
+    """User id from the request's pin cookie, or None when missing, tampered with or expired."""
+    return request.get_signed_cookie(
+        REPLICA_PIN_COOKIE, default=None, salt=REPLICA_PIN_COOKIE,
+        max_age=getattr(settings, "REPLICA_STICKY_SECONDS", 10),
+    )
+
+
+def set_pinned_user(user_id):
+    """Record the current request's pinned user id; returns a reset token."""
+    return _pinned_user.set(user_id)
+
+
+def reset_pinned_user(token):
+    _pinned_user.reset(token)
+
+
+def set_sticky(user):
+    """Mark the current request as belonging to a user who just wrote; returns a reset token."""
+    pinned = _pinned_user.get()
+    return _sticky.set(bool(
+        pinned is not None and user is not None and user.is_authenticated and str(user.pk) == pinned
+    ))
+
+
+def reset_sticky(token):
+    _sticky.reset(token)
+
+
+# -----------------------
+# Routing
+# -----------------------
+@contextmanager
+def read_from_replica(user=None):
+    """Send reads in the block to the replica, unless `user` (or the current request) wrote recently."""
+    with ExitStack() as stack:
+        # Restored by value, not with a token: a streaming response may close
+        # the block from another context (ASGI runs the close in a copy)
+        if user is not None:
+            stack.callback(_sticky.set, _sticky.get())
+            set_sticky(user)
+        stack.callback(_replica_reads.set, _replica_reads.get())
+        _replica_reads.set(not _sticky.get())
+        yield
+
+
+def db_for_read():
+    return replica_alias() if _replica_reads.get() else None
+
+
+class ReplicaReadMixin:
+    """
+    For read-only DRF views: safe requests read from the replica. Runs after
+    authentication, so JWT users get read-your-writes stickiness too.
+    Streaming responses (exports) keep reading from the replica until the
+    server closes them, since their rows are fetched while the body is sent.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        # Closed here, not in finalize_response: DRF skips that when the view raises
+        self._replica_reads = ExitStack()
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+        except BaseException:
+            self._replica_reads.close()
+            raise
+        if response.streaming:
+            response._resource_closers.append(self._replica_reads.close)
+        else:
+            self._replica_reads.close()
+        return response
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in ("GET", "HEAD", "OPTIONS"):
+            self._replica_reads.enter_context(read_from_replica(request.user))
@@ -0,0 +1,246 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.db.models import Sum, F, Q, Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from core.models import Product, Supplier, Sale, SaleItem
+
+
+# ----------------------------
+# Helpers
+# ----------------------------
+def day_start(day):
+    """Aware local midnight for `day`, so date filters stay index-friendly ranges."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+# ----------------------------
+# Sales report
+# ----------------------------
+def sales_report_queryset(organization, start_date=None, end_date=None, search=None):
+    sales = Sale.objects.filter(organization=organization).select_related("customer").prefetch_related("items")
+
+    if start_date:
+        sales = sales.filter(created_at__gte=day_start(start_date))
+    if end_date:
+        sales = sales.filter(created_at__lt=day_start(end_date + timedelta(days=1)))
+
+    if search:
+        sales = sales.filter(
+            Q(invoice_number__icontains=search)
+            | Q(customer__name__icontains=search)
+        )
+    return sales
+
+
+def sales_report_summary(sales):
+    totals = sales.aggregate(
+        invoices=Count("id"),
+        revenue=Sum("net_total"),
+        discounts=Sum("discount"),
+    )
+    total_items_sold = (
+        SaleItem.objects.filter(sale__in=sales.values("id")).aggregate(total=Sum("quantity"))["total"]
+        or 0
+    )
+    return {
+        "invoices": totals["invoices"],
+        "items_sold": total_items_sold,
+        "revenue": float(totals["revenue"] or 0),
+        "discounts": float(totals["discounts"] or 0),
+    }
+
+
+# ----------------------------
+# Stock report
+# ----------------------------
+def stock_report_queryset(organization, search=None):
+    products = Product.objects.filter(organization=organization).select_related("category")
+
+    if search:
+        products = products.filter(
+            Q(name__icontains=search)
+            | Q(sku__icontains=search)
+            | Q(product_id__icontains=search)
+        )
+    return products
+
+
+def stock_report_summary(products):
+    totals = products.aggregate(
+        stock_value_cost=Sum(F("purchase_price") * F("current_stock")),
+        stock_value_retail=Sum(F("sell_price") * F("current_stock")),
+        low_stock_items=Count("id", filter=Q(current_stock__lte=F("reorder_level"))),
+        out_of_stock_items=Count("id", filter=Q(current_stock__lte=0)),
+    )
+    return {
+        "stock_value_cost": float(totals["stock_value_cost"] or 0),
+        "stock_value_retail": float(totals["stock_value_retail"] or 0),
+        "low_stock_items": totals["low_stock_items"],
+        "out_of_stock_items": totals["out_of_stock_items"],
+    }
+
+
+# ----------------------------
+# Inventory dashboard
+# ----------------------------
+# Each section is independent so callers can run them in any order.
+def dashboard_product_stats(organization):
+    products = Product.objects.filter(organization=organization)
+    totals = products.aggregate(
+        total_products=Count("id"),
+        low_stock_items=Count("id", filter=Q(current_stock__lte=F("reorder_level"))),
+        total_stock_value_cost=Sum(F("purchase_price") * F("current_stock")),
+        total_stock_value_retail=Sum(F("sell_price") * F("current_stock")),
+    )
+    return {
+        "total_products": totals["total_products"],
+        "low_stock_items": totals["low_stock_items"],
+        "total_stock_value_cost": float(totals["total_stock_value_cost"] or 0),
+        "total_stock_value_retail": float(totals["total_stock_value_retail"] or 0),
+    }
+
+
+def dashboard_supplier_count(organization):
+    return Supplier.objects.filter(organization=organization).count()
+
+
+def dashboard_stock_value_chart(organization):
+    stock_by_month = (
+        Product.objects.filter(organization=organization)
+        .annotate(month=TruncMonth("created_at"))
+        .values("month")
+        .annotate(total_value=Sum(F("purchase_price") * F("current_stock")))
+        .order_by("month")
+    )
+    return [
+        {"month": item["month"].strftime("%b"), "value": float(item["total_value"] or 0)}
+        for item in stock_by_month
+    ]
+
+
+def dashboard_sales_trend_queryset(organization, now=None):
+    now = now or timezone.now()
+    seven_days_ago = timezone.localdate(now) - timedelta(days=6)
+    return (
+        Sale.objects.filter(organization=organization, created_at__gte=day_start(seven_days_ago))
+        .annotate(day=F("created_at__date"))
+        .values("day")
+        .annotate(total_sales=Sum("net_total"))
+        .order_by("day")
+    )
+
+
+def dashboard_sales_chart(organization, now=None):
+    return [
+        {"day": str(item["day"]), "sales": float(item["total_sales"] or 0)}
+        for item in dashboard_sales_trend_queryset(organization, now)
+    ]
+
+
+def dashboard_category_chart(organization):
+    category_distribution = (
+        Product.objects.filter(organization=organization)
+        .values("category__name")
+        .annotate(count=Count("id"))
+        .order_by("-count")
+    )
+    return [
+        {"category": item["category__name"] or "Uncategorized", "count": item["count"]}
+        for item in category_distribution
+    ]
+
+
+def dashboard_top_products(organization):
+    top_products = (
+        SaleItem.objects.filter(sale__organization=organization)
+        .values("product__name", "product__category__name")
+        .annotate(total_sold=Sum("quantity"), total_sales=Sum("subtotal"))
+        .order_by("-total_sold")[:5]
+    )
+    return [
+        {
+            "name": item["product__name"],
+            "category": item["product__category__name"],
+            "quantity_sold": item["total_sold"],
+            "sales_value": float(item["total_sales"] or 0),
+        }
+        for item in top_products
+    ]
+
+
+DASHBOARD_SECTIONS = {
+    "product_stats": dashboard_product_stats,
+    "total_suppliers": dashboard_supplier_count,
+    "stock_value_by_month": dashboard_stock_value_chart,
+    "sales_trend_last_7_days": dashboard_sales_chart,
+    "category_distribution": dashboard_category_chart,
+    "top_products_sold": dashboard_top_products,
+}
+
+
+def build_dashboard(sections):
+    """Assemble the dashboard payload from the results of DASHBOARD_SECTIONS."""
+    product_stats = sections["product_stats"]
+    return {
+        "summary": {
+            "total_products": product_stats["total_products"],
+            "total_suppliers": sections["total_suppliers"],
+            "low_stock_items": product_stats["low_stock_items"],
+            "total_stock_value_cost": product_stats["total_stock_value_cost"],
+            "total_stock_value_retail": product_stats["total_stock_value_retail"],
+        },
+        "charts": {
+            "stock_value_by_month": sections["stock_value_by_month"],
+            "sales_trend_last_7_days": sections["sales_trend_last_7_days"],
+            "category_distribution": sections["category_distribution"],
+        },
+        "top_products_sold": sections["top_products_sold"],
+    }
+
+
+# ----------------------------
+# Concurrent evaluation (async views)
+# ----------------------------
+# Each worker thread has its own DB connection, so sections run in parallel
+_query_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "REPORT_QUERY_WORKERS", 8), thread_name_prefix="report-query",
+)
+
+
+def _run_with_own_connection(call):
+    # Same connection lifecycle as a request: honour CONN_MAX_AGE, drop broken connections
+    close_old_connections()
+    try:
+        return call()
+    finally:
+        close_old_connections()
+
+
+def _in_transaction():
+    return connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+async def run_concurrently(calls):
+    """
+    Run independent blocking callables ({name: callable}) at the same time and
+    return {name: result}. The caller's context (organization shard, replica
+    routing) is carried into every worker.
+    """
+    if await sync_to_async(_in_transaction)():
+        # Other connections cannot see the open transaction's rows: run in order on its thread
+        return {name: await sync_to_async(call)() for name, call in calls.items()}
+    loop = asyncio.get_running_loop()
+    futures = {
+        name: loop.run_in_executor(_query_executor, contextvars.copy_context().run, _run_with_own_connection, call)
+        for name, call in calls.items()
+    }
+    results = await asyncio.gather(*futures.values())
+    return dict(zip(futures, results))
@@ -0,0 +1,152 @@
+"""
+Tenant sharding: each Organization's inventory data lives in the database
+named by `Organization.db_alias` (one of DATABASE_SHARDS).
+
+Organizations and users stay on `default`, which is the directory used for
+login; a copy of an organization's row and its users' rows is kept on its
+shard so foreign keys from shard tables resolve there. Org-scoped views
+activate the organization's shard for the request (see
+OrganizationDatabaseMixin), and ShardRouter sends every sharded model's
+queries there. `manage.py move_organization` moves a tenant between shards.
+"""
+import copy
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+
+# Parents before children: the order rows are copied in (and deleted in reverse)
+SHARDED_MODELS = (
+    "core.category", "core.product", "core.supplier", "core.customer",
+    "core.purchase", "core.purchaseitem", "core.sale", "core.saleitem", "core.stockmovement",
+)
+# Live on the organization's shard but are not moved with it: a log that restarts on the new shard
+SHARD_LOCAL_MODELS = ("core.catalogchange",)
+# Path from each sharded model to its Organization
+ORGANIZATION_LOOKUPS = {
+    "core.purchaseitem": "purchase__organization",
+    "core.saleitem": "sale__organization",
+}
+# Replicated from default onto every shard an organization lives on
+DIRECTORY_MODELS = ("accounts.organization", "accounts.customuser")
+# User fields only read on default (login); saves touching nothing else are not copied
+DEFAULT_ONLY_USER_FIELDS = frozenset({"last_login", "password"})
+
+_active_db = ContextVar("organization_db", default=None)
+
+
+def is_sharded(model):
+    return model._meta.label_lower in SHARDED_MODELS or model._meta.label_lower in SHARD_LOCAL_MODELS
+
+
+def is_directory(model):
+    return model._meta.label_lower in DIRECTORY_MODELS
+
+
+def shard_aliases():
+    return getattr(settings, "DATABASE_SHARDS", [DEFAULT_DB_ALIAS])
+
+
+def organization_db(organization):
+    """Alias holding `organization`'s data."""
+    alias = getattr(organization, "db_alias", None) or DEFAULT_DB_ALIAS
+    return alias if alias in settings.DATABASES else DEFAULT_DB_ALIAS
+
+
+def organization_db_cache_key(organization_id):
+    return f"organization-db:{organization_id}"
+
+
+def organization_db_for_id(organization_id, cached=True):
+    """
+    `organization_db` by id without loading the Organization on every call.
+    Cached for ORGANIZATION_DB_CACHE_SECONDS; move_organization clears its own
+    process's entry, other processes pick the move up when theirs expires.
+    """
+    key = organization_db_cache_key(organization_id)
+    alias = cache.get(key) if cached else None
+    if alias is None:
+        organization = apps.get_model("accounts.organization").objects.filter(pk=organization_id).only("db_alias").first()
+        alias = organization_db(organization)
+        cache.set(key, alias, getattr(settings, "ORGANIZATION_DB_CACHE_SECONDS", 60))
+    return alias
+
+
+def forget_organization_db(organization_id):
+    cache.delete(organization_db_cache_key(organization_id))
+
+
+def organization_querysets(organization, alias):
+    """(model, queryset on `alias`) for all of `organization`'s sharded rows, parents first."""
+    for label in SHARDED_MODELS:
+        model = apps.get_model(label)
+        lookup = ORGANIZATION_LOOKUPS.get(label, "organization")
+        yield model, model.objects.using(alias).filter(**{lookup: organization.pk}).order_by("pk")
+
+
+def shard_local_querysets(organization, alias):
+    """(model, queryset on `alias`) for `organization`'s SHARD_LOCAL_MODELS rows."""
+    for label in SHARD_LOCAL_MODELS:
+        model = apps.get_model(label)
+        yield model, model.objects.using(alias).filter(organization=organization.pk)
+
+
+def active_db():
+    return _active_db.get()
+
+
+@contextmanager
+def use_organization_db(organization):
+    """Route sharded models' queries in the block to `organization`'s shard."""
+    # Restored by value: a streaming response may close the block from another context
+    previous = _active_db.get()
+    _active_db.set(organization_db(organization) if organization is not None else None)
+    try:
+        yield
+    finally:
+        _active_db.set(previous)
+
+
+def copy_to_shard(instance, alias):
+    """Insert or update a directory row (organization or user) on `alias`."""
+    if alias == DEFAULT_DB_ALIAS:
+        return
+    # Saving a copy keeps the caller's instance bound to default
+    copy.copy(instance).save(using=alias)
+
+
+def bulk_copy_to_shard(instances, alias):
+    """`copy_to_shard` for rows created with bulk_create (which sends no post_save)."""
+    if alias == DEFAULT_DB_ALIAS or not instances:
+        return
+    type(instances[0]).objects.using(alias).bulk_create([copy.copy(instance) for instance in instances])
+
+
+class OrganizationDatabaseMixin:
+    """
+    For DRF views over org-scoped data: the user's shard is active for the
+    whole request, and for streaming responses until the server closes them.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        # Closed here, not in finalize_response: DRF skips that when the view raises
+        self._organization_db = ExitStack()
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+        except BaseException:
+            self._organization_db.close()
+            raise
+        if response.streaming:
+            response._resource_closers.append(self._organization_db.close)
+        else:
+            self._organization_db.close()
+        return response
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # After authentication: JWT users are only known from here on
+        self._organization_db.enter_context(use_organization_db(getattr(request.user, "organization", None)))
@@ -0,0 +1,225 @@
+"""
+Slow-query log built on `connection.execute_wrapper`.
+
+Queries slower than SLOW_QUERY_THRESHOLD_MS are collected while a block runs
+(normally one request, see SlowQueryLogMiddleware), then logged as JSON lines
+on the `core.slow_queries` logger. A background thread folds them into one
+`SlowQuery` row per normalized SQL fingerprint and stores the EXPLAIN plan of
+the slowest ones, so the request that was already slow does not also wait for
+those writes. `manage.py slow_queries` prints the top offenders.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from time import perf_counter
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+
+logger = logging.getLogger("core.slow_queries")
+
+# Storage and EXPLAIN run here, off the request path
+_slow_query_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-queries")
+_lock = threading.Lock()
+_queued = 0  # batches waiting for or being saved by the executor
+
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*%s\s*,)*\s*%s\s*\)", re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+# Frames from these paths are never reported as the call site
+_SKIPPED_FRAMES = ("/django/", "/rest_framework/", "/site-packages/", "/core/utils/slow_queries.py", "/core/middleware/")
+
+
+def normalize_sql(sql):
+    """Reduce SQL to its shape: literals become `?` and IN lists of any length match."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()
+
+
+def call_site():
+    """First project frame (not Django/DRF/this module) on the current stack."""
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        if str(settings.BASE_DIR) in frame.filename and not any(skip in frame.filename for skip in _SKIPPED_FRAMES):
+            return f"{frame.filename.removeprefix(str(settings.BASE_DIR) + '/')}:{frame.lineno} in {frame.name}"
+    return ""
+
+
+@dataclass
+class SlowQueryEvent:
+    alias: str
+    sql: str
+    params: object
+    many: bool
+    duration: float  # milliseconds
+    call_site: str
+
+    @property
+    def normalized_sql(self):
+        return normalize_sql(self.sql)
+
+
+class SlowQueryRecorder:
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.events = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (perf_counter() - start) * 1000
+            # The stack is only inspected for queries that crossed the threshold
+            if duration >= self.threshold:
+                self.events.append(SlowQueryEvent(
+                    context["connection"].alias, sql, params, many, duration, call_site(),
+                ))
+
+
+@contextmanager
+def record_slow_queries(threshold=None):
+    """Collect queries over `threshold` ms run on any connection inside the block."""
+    if threshold is None:
+        threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    recorder = SlowQueryRecorder(threshold)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+# -----------------------
+# EXPLAIN
+# -----------------------
+def explain(alias, sql, params):
+    """Plan for one SELECT as text, or "" where the backend or statement is not supported."""
+    if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+        return ""
+    connection = connections[alias]
+    prefix = {
+        "sqlite": "EXPLAIN QUERY PLAN",
+        "postgresql": "EXPLAIN (FORMAT TEXT)",
+        "mysql": "EXPLAIN",
+    }.get(connection.vendor)
+    if prefix is None:
+        return ""
+    try:
+        # Savepoint: a failing EXPLAIN must not break a surrounding transaction
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}", params)
+            rows = cursor.fetchall()
+    except Exception as exc:
+        return f"EXPLAIN failed: {exc}"
+    if connection.vendor == "sqlite":
+        return "\n".join(str(row[-1]) for row in rows)
+    return "\n".join(" | ".join(str(value) for value in row) for row in rows)
+
+
+# -----------------------
+# Storage
+# -----------------------
+def log_events(events, path="", organization_id=None):
+    for event in events:
+        normalized = event.normalized_sql
+        logger.warning(json.dumps({
+            "fingerprint": fingerprint(normalized),
+            "ms": round(event.duration, 1),
+            "sql": normalized,
+            "call_site": event.call_site,
+            "path": path,
+            "organization_id": str(organization_id) if organization_id else None,
+        }))
+
+
+def submit_events(events, path="", organization_id=None):
+    """
+    Log the events now and save them on the background thread. Batches beyond
+    SLOW_QUERY_QUEUE_LIMIT are only logged, so a struggling database is not
+    handed more writes.
+    """
+    global _queued
+    if not events:
+        return
+    log_events(events, path, organization_id)
+    with _lock:
+        if _queued >= getattr(settings, "SLOW_QUERY_QUEUE_LIMIT", 100):
+            return
+        _queued += 1
+    _slow_query_executor.submit(_save_in_background, events, path, organization_id)
+
+
+def _save_in_background(events, path, organization_id):
+    global _queued
+    close_old_connections()
+    try:
+        save_events(events, path, organization_id)
+    except Exception:
+        logger.exception("Saving %d slow queries failed", len(events))
+    finally:
+        close_old_connections()
+        with _lock:
+            _queued -= 1
+
+
+def save_events(events, path="", organization_id=None):
+    """Fold slow query events into the SlowQuery table and EXPLAIN the slowest fingerprints."""
+    from core.models import SlowQuery
+
+    if not events:
+        return
+    now = timezone.now()
+    by_fingerprint = {}
+    for event in events:
+        normalized = event.normalized_sql
+        by_fingerprint.setdefault(fingerprint(normalized), (normalized, []))[1].append(event)
+
+    explain_limit = getattr(settings, "SLOW_QUERY_EXPLAIN_PER_REQUEST", 1)
+    slowest_first = sorted(by_fingerprint.items(), key=lambda item: -max(e.duration for e in item[1][1]))
+    for rank, (digest, (normalized, group)) in enumerate(slowest_first):
+        slowest = max(group, key=lambda event: event.duration)
+        values = {
+            "sample_sql": slowest.sql[:10000],
+            "call_site": slowest.call_site[:500],
+            "path": path[:500],
+            "organization_id": organization_id,
+            "last_seen": now,
+        }
+        counters = {
+            "calls": F("calls") + len(group),
+            "total_ms": F("total_ms") + sum(event.duration for event in group),
+            "max_ms": Greatest("max_ms", slowest.duration),
+        }
+        if not SlowQuery.objects.filter(fingerprint=digest).update(**counters, **values):
+            try:
+                with transaction.atomic():
+                    SlowQuery.objects.create(
+                        fingerprint=digest, normalized_sql=normalized, calls=len(group),
+                        total_ms=sum(event.duration for event in group), max_ms=slowest.duration,
+                        first_seen=now, **values,
+                    )
+            except IntegrityError:
+                # Another worker created the row in the meantime
+                SlowQuery.objects.filter(fingerprint=digest).update(**counters, **values)
+        # Plans only for this request's slowest fingerprints, and only while they keep getting slower
+        if rank < explain_limit and not slowest.many and getattr(settings, "SLOW_QUERY_EXPLAIN", True):
+            row = SlowQuery.objects.filter(fingerprint=digest).only("max_ms", "explain").first()
+            if row is not None and (not row.explain or row.max_ms <= slowest.duration):
+                SlowQuery.objects.filter(pk=row.pk).update(explain=explain(slowest.alias, slowest.sql, slowest.params))
@@ -0,0 +1,236 @@
+"""
+Offline catalog snapshots for POS terminals: the whole catalog as one SQLite
+file, with a gzipped copy for download.
+
+A snapshot is named after its catalog digest (core.utils.bootstrap), so a
+file never changes once written and is served with a strong ETag. Terminals
+open it directly instead of parsing JSON, run the `indexes` script from its
+`meta` table (indexes are not shipped: they would double the download), then
+catch up through /v1/sync/catalog/ from `meta.sync_cursor`.
+
+Files are built on a background thread: when a terminal asks for a version
+that is not there yet, and after catalog writes for organizations that
+already use snapshots. Every checkout changes stock, so builds for an
+organization are at least CATALOG_SNAPSHOT_MIN_INTERVAL apart; changes made
+meanwhile are folded into one deferred build (terminals catch up from
+`meta.sync_cursor` either way). A replaced snapshot is kept for
+CATALOG_SNAPSHOT_GRACE_SECONDS, so terminals that were just handed its
+version can still download it, up to CATALOG_SNAPSHOT_KEEP_REPLACED of them.
+"""
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, models
+from django.utils import timezone
+
+from accounts.models import Organization
+from core.utils import catalog_sync
+from core.utils.bootstrap import BOOTSTRAP_SECTIONS, catalog_digest
+from core.utils.exports import chunk_size
+from core.utils.sharding import organization_db
+
+
+logger = logging.getLogger(__name__)
+
+# One build at a time; a build reads the whole catalog
+_snapshot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot")
+_lock = threading.Lock()
+_pending = {}  # organization id -> True if the catalog changed again while waiting, queued or building
+
+# Columns worth an index on the terminal (scanner and search lookups)
+SNAPSHOT_INDEXES = {
+    "products": ("barcode", "sku", "product_id", "category"),
+    "customers": ("mobile",),
+}
+
+
+def snapshot_dir(organization_id):
+    return Path(getattr(settings, "CATALOG_SNAPSHOT_DIR", settings.MEDIA_ROOT / "snapshots")) / str(organization_id)
+
+
+def snapshot_path(organization, digest):
+    return snapshot_dir(organization.pk) / f"{digest}.sqlite"
+
+
+def _modified(directory, pattern):
+    """(mtime, path) for the files matching `pattern`, oldest first; files removed meanwhile are left out."""
+    found = []
+    for path in directory.glob(pattern) if directory.is_dir() else ():
+        try:
+            found.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            continue
+    return sorted(found)
+
+
+def latest_snapshot(organization):
+    """Path of the newest finished snapshot, or None."""
+    snapshots = _modified(snapshot_dir(organization.pk), "*.sqlite")
+    return snapshots[-1][1] if snapshots else None
+
+
+def index_script():
+    return "".join(
+        f'CREATE INDEX IF NOT EXISTS "{table}_{column}_idx" ON "{table}" ("{column}");\n'
+        for table, columns in SNAPSHOT_INDEXES.items() for column in columns
+    )
+
+
+def _column_type(model_field):
+    if isinstance(model_field, (models.IntegerField, models.BooleanField)):
+        return "INTEGER"
+    if isinstance(model_field, models.FloatField):
+        return "REAL"
+    return "TEXT"  # decimals, dates and ids as in the JSON API
+
+
+# -----------------------
+# Building
+# -----------------------
+def _temporary_file(directory, digest):
+    # Unique per build: builds in other processes may write the same digest
+    descriptor, name = tempfile.mkstemp(prefix=f"{digest}.", suffix=".tmp", dir=directory)
+    os.close(descriptor)
+    return Path(name)
+
+
+def remove_old_snapshots(directory):
+    """
+    Delete snapshots replaced over CATALOG_SNAPSHOT_GRACE_SECONDS ago or beyond
+    the newest CATALOG_SNAPSHOT_KEEP_REPLACED, and temporary files that old.
+    """
+    cutoff = time.time() - getattr(settings, "CATALOG_SNAPSHOT_GRACE_SECONDS", 600)
+    keep = getattr(settings, "CATALOG_SNAPSHOT_KEEP_REPLACED", 2)
+    snapshots = _modified(directory, "*.sqlite")
+    # A snapshot was replaced when the next one was written
+    replaced = list(zip(snapshots, snapshots[1:]))
+    for index, ((_, old), (replaced_at, _)) in enumerate(replaced):
+        if replaced_at < cutoff or index < len(replaced) - keep:
+            old.with_suffix(".sqlite.gz").unlink(missing_ok=True)
+            old.unlink(missing_ok=True)
+    for modified, temporary in _modified(directory, "*.tmp"):
+        if modified < cutoff:  # left by a build that died
+            temporary.unlink(missing_ok=True)
+
+
+def write_snapshot(organization, alias, digest):
+    """Write the catalog to `<digest>.sqlite` (+ `.gz`) and remove snapshots past their grace period."""
+    directory = snapshot_dir(organization.pk)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = snapshot_path(organization, digest)
+    temporary = _temporary_file(directory, digest)
+    compressed = _temporary_file(directory, digest)
+    try:
+        _write_database(temporary, organization, alias, digest)
+        with open(temporary, "rb") as source, gzip.open(compressed, "wb") as target:
+            shutil.copyfileobj(source, target)
+        # The .sqlite file marks the snapshot as finished, so it is moved into place last
+        os.replace(compressed, path.with_suffix(".sqlite.gz"))
+        os.replace(temporary, path)
+    finally:
+        compressed.unlink(missing_ok=True)
+        temporary.unlink(missing_ok=True)
+
+    remove_old_snapshots(directory)
+    return path
+
+
+def _write_database(temporary, organization, alias, digest):
+    database = sqlite3.connect(temporary)
+    try:
+        database.execute("PRAGMA journal_mode = OFF")
+        database.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        # Taken before the rows are read: changes made meanwhile are replayed, not lost
+        database.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("sync_cursor", catalog_sync.head_cursor(organization, alias)),
+            ("catalog_version", digest),
+            ("organization", str(organization.pk)),
+            ("generated_at", timezone.now().isoformat()),
+            ("indexes", index_script()),
+        ])
+        for table, (model, serializer_class, ordering) in BOOTSTRAP_SECTIONS.items():
+            # Every row belongs to the organization in `meta`
+            serializer = serializer_class(fields=[
+                field.name for field in serializer_class.model_fields() if field.name != "organization"
+            ])
+            columns = serializer.outputs()
+            types = {field.name: _column_type(field) for field in serializer.model_fields()}
+            definitions = ", ".join(
+                f'"{name}" {types[name]}{" PRIMARY KEY" if name == "id" else ""}' for name in columns
+            )
+            database.execute(f'CREATE TABLE "{table}" ({definitions}) WITHOUT ROWID')
+            # Primary key order fills the table's pages instead of splitting them
+            queryset = model.objects.using(alias).filter(organization=organization).order_by("pk")
+            rows = serializer.iter_serialize(serializer.values(queryset).iterator(chunk_size=chunk_size()))
+            placeholders = ", ".join("?" for _ in columns)
+            database.executemany(
+                f'INSERT INTO "{table}" VALUES ({placeholders})',
+                ([row[name] for name in columns] for row in rows),
+            )
+        database.commit()
+        database.execute("VACUUM")
+    finally:
+        database.close()
+
+
+def build_snapshot(organization_id):
+    """Background job: snapshot the current catalog unless it already exists; schedule again if it changed meanwhile."""
+    close_old_connections()
+    with _lock:
+        _pending[organization_id] = False
+    try:
+        organization = Organization.objects.get(pk=organization_id)
+        alias = organization_db(organization)
+        digest = catalog_digest(organization, alias)
+        if not snapshot_path(organization, digest).exists():
+            write_snapshot(organization, alias, digest)
+    except Exception:
+        with _lock:
+            _pending.pop(organization_id, None)
+        logger.exception("Catalog snapshot for organization %s failed", organization_id)
+        return
+    finally:
+        close_old_connections()
+    with _lock:
+        changed = _pending.pop(organization_id)
+    if changed:
+        schedule_snapshot(organization_id)  # after the minimum interval, not right away
+
+
+def next_build_delay(organization_id):
+    """Seconds until the organization may be built again; on disk, so every process agrees."""
+    snapshots = _modified(snapshot_dir(organization_id), "*.sqlite")
+    if not snapshots:
+        return 0
+    return max(0, snapshots[-1][0] + getattr(settings, "CATALOG_SNAPSHOT_MIN_INTERVAL", 300) - time.time())
+
+
+def schedule_snapshot(organization_id):
+    """Queue a build; a build already waiting, queued or running for the organization picks the change up."""
+    with _lock:
+        if organization_id in _pending:
+            _pending[organization_id] = True
+            return
+        _pending[organization_id] = False
+    delay = next_build_delay(organization_id)
+    if delay > 0:
+        timer = threading.Timer(delay, _snapshot_executor.submit, (build_snapshot, organization_id))
+        timer.daemon = True
+        timer.start()
+    else:
+        _snapshot_executor.submit(build_snapshot, organization_id)
+
+
+def snapshot_changed_catalog(organization_id):
+    """After a catalog write: rebuild only for organizations whose terminals use snapshots."""
+    if snapshot_dir(organization_id).is_dir():
+        schedule_snapshot(organization_id)
@@ -0,0 +1,103 @@
+"""
+Sparse fieldsets (`?fields=id,name,sell_price`) and expansion
+(`?expand=category`) for read requests.
+
+The serializer drops unrequested fields and swaps expanded foreign keys for
+nested objects; the view narrows its queryset to match, selecting only the
+columns the response needs (`.only()`), joining expanded foreign keys
+(`select_related`) and prefetching nested lists (`prefetch_related`).
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def requested(request, param):
+    """Comma-separated names from a query parameter, or None when absent."""
+    value = request.query_params.get(param)
+    if not value:
+        return None
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+class SparseFieldsSerializerMixin:
+    """
+    ModelSerializer accepting `fields=[...]` and `expand=[...]`. Expandable
+    relations are declared as `expandable_fields = {"category": CategorySerializer}`.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        expand = [name for name in expand or () if name in self.expandable_fields]
+        for name in expand:
+            self.fields[name] = self.expandable_fields[name](read_only=True)
+        if fields:
+            for name in set(self.fields) - set(fields) - set(expand):
+                self.fields.pop(name)
+
+
+def narrow_queryset(queryset, fields, keep=()):
+    """
+    Load what serializing `fields` (a serializer's `.fields`) touches and no more.
+    Falls back to all columns when a field reads something other than model fields.
+    """
+    model = queryset.model
+    columns = {model._meta.pk.name, *keep}
+    related, prefetch = [], []
+    for field in fields.values():
+        if field.source == "*":  # method fields see the whole instance
+            columns = None
+            continue
+        name = field.source.split(".")[0]
+        try:
+            model_field = model._meta.get_field(name)
+        except FieldDoesNotExist:  # property or method on the model
+            columns = None
+            continue
+        if model_field.many_to_many or model_field.one_to_many:
+            prefetch.append(name)
+            continue
+        if columns is not None:
+            columns.add(name)
+        if model_field.is_relation and (isinstance(field, serializers.BaseSerializer) or "." in field.source):
+            related.append(name)
+
+    if related:
+        queryset = queryset.select_related(*related)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if columns is not None:
+        queryset = queryset.only(*columns)
+    return queryset
+
+
+class SparseFieldsViewMixin:
+    """For viewsets whose serializer uses SparseFieldsSerializerMixin; only reads are narrowed."""
+
+    def sparse_fields_enabled(self):
+        return (
+            self.request is not None
+            and self.request.method in SAFE_METHODS
+            and issubclass(self.get_serializer_class(), SparseFieldsSerializerMixin)
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        if self.sparse_fields_enabled():
+            kwargs.setdefault("fields", requested(self.request, "fields"))
+            kwargs.setdefault("expand", requested(self.request, "expand"))
+        return super().get_serializer(*args, **kwargs)
+
+    def pagination_ordering(self):
+        ordering = getattr(self, "cursor_ordering", None) or getattr(self.pagination_class, "ordering", None) or ()
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+    def pagination_columns(self):
+        """Columns the paginator orders and builds cursors from; they must stay loaded."""
+        return [name.lstrip("-") for name in self.pagination_ordering()]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.sparse_fields_enabled():
+            return queryset
+        return narrow_queryset(queryset, self.get_serializer().fields, keep=self.pagination_columns())
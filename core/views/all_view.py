@@ -1,13 +1,18 @@
 #  core/views.py
 import io
+import logging
+from django.conf import settings
 from decimal import Decimal
-from django.http import HttpResponse, Http404
+from django.http import FileResponse, HttpResponse, Http404
 from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
 import os
 from django.templatetags.static import static
 PDF_STORAGE_PATH = os.path.join("media", "invoices")
+from django.db import transaction
 from django.db.models import Sum, F, Count
 from django.db.models.functions import TruncMonth
 from django.utils import timezone
@@ -27,26 +32,49 @@ from weasyprint import HTML, CSS
 
 
 from rest_framework import viewsets, permissions
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import JSONRenderer
 from accounts.models import Organization, CustomUser
+from accounts.serializer.serializers import UserProfileDetailSerializer
+from accounts.utils.custom_pagination import CustomPageNumberPagination, KeysetCursorPagination
 from core.models import (
     Category, Product, Supplier, Customer, Sale, SaleItem, 
     Purchase, PurchaseItem, StockMovement, ContactMessage
 )
+from core.utils import bootstrap, catalog_sync, metrics, reports, snapshots
+from core.utils.compression import accepted_encoding
+from core.utils.conditional import ConditionalListMixin
+from core.utils.exports import EXPORT_RENDERER_CLASSES, StreamingExportMixin, export_values, is_export
+from core.utils.instrumentation import timed
+from core.utils.replica import ReplicaReadMixin
+from core.utils.sharding import OrganizationDatabaseMixin, organization_db
+from core.utils.sparse_fields import SparseFieldsViewMixin
 from core.serializers.all_serializers import (
     OrganizationSerializer, UserSerializer, CategorySerializer, ProductSerializer,
     SupplierSerializer, CustomerSerializer, SaleSerializer, SaleItemSerializer,
-    PurchaseSerializer, PurchaseItemSerializer, StockMovementSerializer, ContactMessageSerializer, SaleSummarySerializer, ProductStockSerializer
+    PurchaseSerializer, PurchaseItemSerializer, StockMovementSerializer, ContactMessageSerializer
 )
+from core.serializers.fast_serializers import (
+    FastListMixin, FastProductSerializer, FastCustomerSerializer, FastStockMovementSerializer,
+    FastSaleSummarySerializer, FastProductStockSerializer,
+)
+
+
+logger = logging.getLogger(__name__)
 
 
 # Base class for all organization-scoped models
-class OrgModelViewSet(viewsets.ModelViewSet):
+class OrgModelViewSet(StreamingExportMixin, SparseFieldsViewMixin, OrganizationDatabaseMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]  # must be logged in
+    organization_field = "organization"  # lookup from the model to its Organization
+    pagination_class = KeysetCursorPagination  # newest first on (created_at, id); ?cursor=
+    renderer_classes = EXPORT_RENDERER_CLASSES  # adds ?format=ndjson|csv streaming exports
 
     def get_queryset(self):
         user = self.request.user
-        # Ensure model has an 'organization' FK
-        return self.queryset.filter(organization=user.organization)
+        return super().get_queryset().using(organization_db(user.organization)).filter(
+            **{self.organization_field: user.organization}
+        )
 
     def perform_create(self, serializer):
         serializer.save(organization=self.request.user.organization)
@@ -75,14 +103,17 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer.save(organization=self.request.user.organization)
 
 
-class CategoryViewSet(OrgModelViewSet):
-    queryset = Category.objects.all()
+class CategoryViewSet(ConditionalListMixin, OrgModelViewSet):
+    queryset = Category.objects.order_by("name", "id")
     serializer_class = CategorySerializer
+    pagination_class = CustomPageNumberPagination  # small table: ?page= works here
 
 
-class ProductViewSet(OrgModelViewSet):
+class ProductViewSet(ConditionalListMixin, FastListMixin, OrgModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    fast_serializer_class = FastProductSerializer
+    version_dependencies = (Category,)  # ?expand=category, and category deletes null product rows
 
 
 class SupplierViewSet(OrgModelViewSet):
@@ -90,9 +121,10 @@ class SupplierViewSet(OrgModelViewSet):
     serializer_class = SupplierSerializer
 
 
-class CustomerViewSet(OrgModelViewSet):
+class CustomerViewSet(FastListMixin, OrgModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
+    fast_serializer_class = FastCustomerSerializer
 
 
 class SaleViewSet(OrgModelViewSet):
@@ -103,6 +135,8 @@ class SaleViewSet(OrgModelViewSet):
 class SaleItemViewSet(OrgModelViewSet):
     queryset = SaleItem.objects.all()
     serializer_class = SaleItemSerializer
+    organization_field = "sale__organization"
+    cursor_ordering = ("id",)  # no created_at of its own
 
 
 class PurchaseViewSet(OrgModelViewSet):
@@ -113,11 +147,14 @@ class PurchaseViewSet(OrgModelViewSet):
 class PurchaseItemViewSet(OrgModelViewSet):
     queryset = PurchaseItem.objects.all()
     serializer_class = PurchaseItemSerializer
+    organization_field = "purchase__organization"
+    cursor_ordering = ("id",)  # no created_at of its own
 
 
-class StockMovementViewSet(OrgModelViewSet):
+class StockMovementViewSet(FastListMixin, OrgModelViewSet):
     queryset = StockMovement.objects.all()
     serializer_class = StockMovementSerializer
+    fast_serializer_class = FastStockMovementSerializer
 
 
 class ContactMessageViewSet(viewsets.ModelViewSet):
@@ -132,12 +169,12 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
 
 
 # ============  Custom View ========
-class InvoicePDFDownloadAPIView(APIView):
+class InvoicePDFDownloadAPIView(OrganizationDatabaseMixin, APIView):
     # permission_classes = [IsAuthenticated]  # enable if you want auth
 
     def get(self, request, id):
         """Generates and returns the PDF for a Sale invoice."""
-        print("========== Generating Invoice ==========")
+        logger.debug("Generating invoice PDF for sale %s", id)
 
         # 1️⃣ Get the Sale record (invoice)
         invoice = get_object_or_404(Sale, id=id)
@@ -156,7 +193,8 @@ class InvoicePDFDownloadAPIView(APIView):
         pdf_filename = f"invoice_{invoice.invoice_number}.pdf"
         pdf_file_path = os.path.join(PDF_STORAGE_PATH, pdf_filename)
 
-        HTML(string=html_string, base_url=request.build_absolute_uri("/")).write_pdf(pdf_file_path)
+        with timed("pdf"), metrics.PDF_RENDER.time():
+            HTML(string=html_string, base_url=request.build_absolute_uri("/")).write_pdf(pdf_file_path)
 
         # 5️⃣ Serve the PDF for download
         with open(pdf_file_path, 'rb') as pdf_file:
@@ -170,8 +208,9 @@ class InvoicePDFDownloadAPIView(APIView):
 
 # ============  SalesReportAPIView  ========
 
-class SalesReportAPIView(APIView):
+class SalesReportAPIView(ReplicaReadMixin, OrganizationDatabaseMixin, APIView):
     permission_classes = [IsAuthenticated]  # optional
+    renderer_classes = EXPORT_RENDERER_CLASSES  # ?format=ndjson|csv streams the rows only
 
     def get(self, request):
         # ---- Filters ----
@@ -179,43 +218,21 @@ class SalesReportAPIView(APIView):
         end_date = request.query_params.get("to")
         search = request.query_params.get("search")
 
-        sales = Sale.objects.select_related("customer").prefetch_related("items")
-
-        if start_date:
-            sales = sales.filter(created_at__date__gte=parse_date(start_date))
-        if end_date:
-            sales = sales.filter(created_at__date__lte=parse_date(end_date))
-
-        if search:
-            sales = sales.filter(
-                Q(invoice_number__icontains=search)
-                | Q(customer__name__icontains=search)
-            )
-
-        # ---- Totals ----
-        invoices_count = sales.count()
-        total_items_sold = (
-            SaleItem.objects.filter(sale__in=sales).aggregate(total=Sum("quantity"))["total"]
-            or 0
-        )
-        total_revenue = (
-            sales.aggregate(total=Sum("net_total"))["total"] or 0
-        )
-        total_discount = (
-            sales.aggregate(total=Sum("discount"))["total"] or 0
+        sales = reports.sales_report_queryset(
+            request.user.organization,
+            start_date=parse_date(start_date) if start_date else None,
+            end_date=parse_date(end_date) if end_date else None,
+            search=search,
         )
 
         # ---- Serialize invoice list ----
-        serializer = SaleSummarySerializer(sales, many=True)
+        serializer = FastSaleSummarySerializer()
+        if is_export(request):
+            return export_values(request, serializer, sales, "sales-report")
 
         data = {
-            "summary": {
-                "invoices": invoices_count,
-                "items_sold": total_items_sold,
-                "revenue": float(total_revenue),
-                "discounts": float(total_discount),
-            },
-            "sales": serializer.data,
+            "summary": reports.sales_report_summary(sales),
+            "sales": serializer.serialize(serializer.values(sales)),
         }
         return Response(data)
 
@@ -224,152 +241,135 @@ class SalesReportAPIView(APIView):
 # ============  StockReportAPIView  ========
 
 
-class StockReportAPIView(APIView):
+class StockReportAPIView(ReplicaReadMixin, OrganizationDatabaseMixin, APIView):
     permission_classes = [IsAuthenticated]  # optional
+    renderer_classes = EXPORT_RENDERER_CLASSES  # ?format=ndjson|csv streams the rows only
 
     def get(self, request):
         search = request.query_params.get("search")
 
         # ---- Filter products ----
-        products = Product.objects.select_related("category").all()
-
-        if search:
-            products = products.filter(
-                Q(name__icontains=search)
-                | Q(sku__icontains=search)
-                | Q(product_id__icontains=search)
-            )
-
-        # ---- Aggregates ----
-        stock_value_cost = (
-            products.aggregate(
-                total=Sum(F("purchase_price") * F("current_stock"))
-            )["total"]
-            or 0
-        )
-        stock_value_retail = (
-            products.aggregate(
-                total=Sum(F("sell_price") * F("current_stock"))
-            )["total"]
-            or 0
-        )
-        low_stock_count = products.filter(current_stock__lte=F("reorder_level")).count()
-        out_of_stock_count = products.filter(current_stock__lte=0).count()
+        products = reports.stock_report_queryset(request.user.organization, search=search)
 
         # ---- Serialize detailed product list ----
-        serializer = ProductStockSerializer(products, many=True)
+        serializer = FastProductStockSerializer()
+        if is_export(request):
+            return export_values(request, serializer, products, "stock-report")
 
         data = {
-            "summary": {
-                "stock_value_cost": float(stock_value_cost),
-                "stock_value_retail": float(stock_value_retail),
-                "low_stock_items": low_stock_count,
-                "out_of_stock_items": out_of_stock_count,
-            },
-            "products": serializer.data,
+            "summary": reports.stock_report_summary(products),
+            "products": serializer.serialize(serializer.values(products)),
         }
         return Response(data)
 
 
 
 # ===========  InventoryDashboardAPIView  ========
-class InventoryDashboardAPIView(APIView):
+class InventoryDashboardAPIView(ReplicaReadMixin, OrganizationDatabaseMixin, APIView):
     permission_classes = [IsAuthenticated]  # optional
 
     def get(self, request):
-        now = timezone.now()
-        seven_days_ago = now - timedelta(days=6)
-
-        # 1️⃣ Basic Stats
-        total_products = Product.objects.count()
-        total_suppliers = Supplier.objects.count()
-        low_stock_items = Product.objects.filter(current_stock__lte=F("reorder_level")).count()
-
-        total_stock_value_cost = (
-            Product.objects.aggregate(
-                total=Sum(F("purchase_price") * F("current_stock"))
-            )["total"]
-            or 0
-        )
+        organization = request.user.organization
+        sections = {
+            name: section(organization)
+            for name, section in reports.DASHBOARD_SECTIONS.items()
+        }
+        return Response(reports.build_dashboard(sections))
 
-        total_stock_value_retail = (
-            Product.objects.aggregate(
-                total=Sum(F("sell_price") * F("current_stock"))
-            )["total"]
-            or 0
-        )
 
 
-        # 2️⃣ Stock Value by Month (last 6 months)
-        stock_by_month = (
-            Product.objects.annotate(month=TruncMonth("created_at"))
-            .values("month")
-            .annotate(total_value=Sum(F("purchase_price") * F("current_stock")))
-            .order_by("month")
-        )
+# ===========  CatalogSyncAPIView  ========
+class CatalogSyncAPIView(OrganizationDatabaseMixin, APIView):
+    """
+    Catalog changes since `?cursor=` for POS terminals (see core.utils.catalog_sync).
+    Reads the primary: a replica could hand out a cursor ahead of its own data.
+    """
+    permission_classes = [IsAuthenticated]
 
-        stock_value_chart = [
-            {"month": item["month"].strftime("%b"), "value": float(item["total_value"] or 0)}
-            for item in stock_by_month
-        ]
-
-        # 3️⃣ Sales Trend (last 7 days)
-        sales_trend = (
-            Sale.objects.filter(created_at__date__gte=seven_days_ago)
-            .annotate(day=F("created_at__date"))
-            .values("day")
-            .annotate(total_sales=Sum("net_total"))
-            .order_by("day")
-        )
-        sales_chart = [
-            {"day": str(item["day"]), "sales": float(item["total_sales"] or 0)}
-            for item in sales_trend
-        ]
-
-        # 4️⃣ Product Category Distribution
-        category_distribution = (
-            Product.objects.values("category__name")
-            .annotate(count=Count("id"))
-            .order_by("-count")
-        )
-        category_chart = [
-            {"category": item["category__name"] or "Uncategorized", "count": item["count"]}
-            for item in category_distribution
-        ]
-
-        # 5️⃣ Top 5 Products Sold
-        top_products = (
-            SaleItem.objects.values("product__name", "product__category__name")
-            .annotate(total_sold=Sum("quantity"), total_sales=Sum("subtotal"))
-            .order_by("-total_sold")[:5]
+    def get(self, request):
+        organization = request.user.organization
+        try:
+            limit = int(request.query_params.get("limit", settings.CATALOG_SYNC_PAGE_SIZE))
+        except ValueError:
+            limit = settings.CATALOG_SYNC_PAGE_SIZE
+        limit = max(1, min(limit, settings.CATALOG_SYNC_PAGE_SIZE))
+        try:
+            payload = catalog_sync.sync_payload(
+                organization, organization_db(organization), request.query_params.get("cursor"), limit,
+            )
+        except catalog_sync.InvalidCursor:
+            raise NotFound("Invalid cursor")
+        return Response(payload)
+
+
+
+# ===========  PosBootstrapAPIView  ========
+class PosBootstrapAPIView(OrganizationDatabaseMixin, APIView):
+    """
+    Everything a till needs at start-up in one response: the user's profile
+    plus the cached catalog (see core.utils.bootstrap). Compressed by
+    CompressionMiddleware. Continue with /v1/sync/catalog/ from
+    `catalog.sync_cursor`.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        organization = request.user.organization
+        catalog = bootstrap.catalog_bytes(organization, organization_db(organization))
+        user = JSONRenderer().render(UserProfileDetailSerializer(request.user).data)
+        response = HttpResponse(b'{"user":' + user + b',"catalog":' + catalog + b"}", content_type="application/json")
+        patch_vary_headers(response, ["Authorization"])
+        return response
+
+
+
+# ===========  PosSnapshotAPIView  ========
+class PosSnapshotAPIView(OrganizationDatabaseMixin, APIView):
+    """
+    The catalog as a SQLite file for offline terminals (see core.utils.snapshots).
+    While the current version is being built the previous snapshot is served;
+    its `meta.sync_cursor` brings the terminal up to date via /v1/sync/catalog/.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def generating(self):
+        response = Response({"detail": "Catalog snapshot is being generated."}, status=202)
+        response["Retry-After"] = "5"
+        return response
+
+    def get(self, request):
+        organization = request.user.organization
+        digest = bootstrap.catalog_digest(organization, organization_db(organization))
+        path = snapshots.snapshot_path(organization, digest)
+        if not path.exists():
+            transaction.on_commit(lambda: snapshots.schedule_snapshot(organization.pk))
+            path = snapshots.latest_snapshot(organization)
+            if path is None:
+                return self.generating()
+
+        gzipped = (
+            accepted_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""), ("gzip",)) == "gzip"
+            and path.with_suffix(".sqlite.gz").exists()
         )
-        top_sold_list = [
-            {
-                "name": item["product__name"],
-                "category": item["product__category__name"],
-                "quantity_sold": item["total_sold"],
-                "sales_value": float(item["total_sales"] or 0),
-            }
-            for item in top_products
-        ]
-
-        # ✅ Final Response
-        data = {
-            "summary": {
-                "total_products": total_products,
-                "total_suppliers": total_suppliers,
-                "low_stock_items": low_stock_items,
-                "total_stock_value_cost": float(total_stock_value_cost),
-                "total_stock_value_retail": float(total_stock_value_retail),
-            },
-            "charts": {
-                "stock_value_by_month": stock_value_chart,
-                "sales_trend_last_7_days": sales_chart,
-                "category_distribution": category_chart,
-            },
-            "top_products_sold": top_sold_list,
-        }
-        return Response(data)
+        etag = quote_etag(f"{path.stem}-gz" if gzipped else path.stem)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            try:
+                file = open(path.with_suffix(".sqlite.gz") if gzipped else path, "rb")
+            except FileNotFoundError:
+                # Removed past its grace period since the lookup above; a newer one is built or queued
+                return self.generating()
+            response = FileResponse(
+                file, as_attachment=True, filename=f"catalog-{path.stem}.sqlite", content_type="application/vnd.sqlite3",
+            )
+            if gzipped:
+                response["Content-Encoding"] = "gzip"
+        response["ETag"] = etag
+        response["X-Catalog-Version"] = path.stem
+        # Snapshot files never change; clients keep them and revalidate for a newer version
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ["Accept-Encoding", "Authorization"])
+        return response
 
 
 
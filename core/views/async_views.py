@@ -0,0 +1,87 @@
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.dateparse import parse_date
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from core.serializers.fast_serializers import FastSaleSummarySerializer, FastProductStockSerializer
+from core.utils import reports
+from core.utils.replica import read_from_replica
+from core.utils.sharding import use_organization_db
+
+
+class AsyncReportView(View):
+    """
+    Base for async report endpoints. Authenticates like the DRF views (JWT),
+    then `build()` hands independent queries to `reports.run_concurrently`,
+    so the response takes about as long as the slowest of them.
+    """
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+
+    def authenticate(self, request):
+        drf_request = Request(request, authenticators=[auth() for auth in self.authentication_classes])
+        user = drf_request.user
+        if not user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+        user.organization  # load it here; lazy loading is not allowed in async code
+        return user, drf_request.query_params
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            user, params = await sync_to_async(self.authenticate)(request)
+        except exceptions.APIException as exc:
+            return self.render({"detail": exc.detail}, status=exc.status_code)
+
+        with use_organization_db(user.organization), read_from_replica(user):
+            data = await self.build(user.organization, params)
+        return self.render(data)
+
+    async def build(self, organization, params):
+        raise NotImplementedError
+
+    def render(self, data, status=200):
+        return HttpResponse(JSONRenderer().render(data), status=status, content_type="application/json")
+
+
+# ===========  AsyncInventoryDashboardView  ========
+class AsyncInventoryDashboardView(AsyncReportView):
+    async def build(self, organization, params):
+        sections = await reports.run_concurrently({
+            name: partial(section, organization)
+            for name, section in reports.DASHBOARD_SECTIONS.items()
+        })
+        return reports.build_dashboard(sections)
+
+
+# ============  AsyncSalesReportView  ========
+class AsyncSalesReportView(AsyncReportView):
+    async def build(self, organization, params):
+        start_date = params.get("from")
+        end_date = params.get("to")
+        sales = reports.sales_report_queryset(
+            organization,
+            start_date=parse_date(start_date) if start_date else None,
+            end_date=parse_date(end_date) if end_date else None,
+            search=params.get("search"),
+        )
+        serializer = FastSaleSummarySerializer()
+        return await reports.run_concurrently({
+            "summary": partial(reports.sales_report_summary, sales),
+            "sales": lambda: serializer.serialize(serializer.values(sales)),
+        })
+
+
+# ============  AsyncStockReportView  ========
+class AsyncStockReportView(AsyncReportView):
+    async def build(self, organization, params):
+        products = reports.stock_report_queryset(organization, search=params.get("search"))
+        serializer = FastProductStockSerializer()
+        return await reports.run_concurrently({
+            "summary": partial(reports.stock_report_summary, products),
+            "products": lambda: serializer.serialize(serializer.values(products)),
+        })
@@ -0,0 +1,22 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views import View
+
+from core.utils.metrics import REGISTRY
+
+
+class MetricsView(View):
+    """
+    Prometheus scrape endpoint. Scrapers must send METRICS_TOKEN as
+    `Authorization: Bearer <token>`; with no token configured the endpoint is
+    closed.
+    """
+
+    def get(self, request):
+        token = getattr(settings, "METRICS_TOKEN", "")
+        provided = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not token or not hmac.compare_digest(provided.encode(), token.encode()):
+            return HttpResponseForbidden()
+        return HttpResponse(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
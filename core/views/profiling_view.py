@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.http import FileResponse, Http404
+from rest_framework import permissions
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from core.middleware.profiling import profiling_dir
+
+
+class ProfileDownloadView(APIView):
+    """
+    Staff-only download of a file written by RequestProfilingMiddleware.
+    Profiles show code paths, SQL and timings, so they live outside
+    MEDIA_ROOT and are never served as public media.
+    """
+    authentication_classes = [JWTAuthentication, SessionAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, name):
+        if not name.endswith((".prof", ".collapsed")) or name.startswith("."):
+            raise Http404
+        path = profiling_dir() / name
+        if not path.is_file():
+            raise Http404
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=name)
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 import os
+import tempfile
 import environ
 
 env = environ.Env()
@@ -71,10 +72,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.compression.CompressionMiddleware',
+    'core.middleware.slow_queries.SlowQueryLogMiddleware',
+    'core.middleware.instrumentation.RequestInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.replica.ReplicaStickinessMiddleware',
+    'core.middleware.profiling.RequestProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -128,7 +134,16 @@ if PRODUCTION:
             "PASSWORD": "DB_PASSWORD",
             "HOST": "DB_HOST",
             "PORT": "DB_PORT",
-        }
+        },
+        # Streaming replica used for reports and dashboards (REPLICA_DATABASE_ALIAS)
+        "replica": {
+            "ENGINE": "django.db.backends.postgresql_psycopg2",
+            "NAME": "DB_NAME",
+            "USER": "DB_REPLICA_USER",
+            "PASSWORD": "DB_REPLICA_PASSWORD",
+            "HOST": "DB_REPLICA_HOST",
+            "PORT": "DB_PORT",
+        },
     }
 
 else:
@@ -136,9 +151,40 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / "db.sqlite3",
-        }
+        },
+        # Local stand-in for the read replica (copy db.sqlite3 over it to try routing)
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / "db_replica.sqlite3",
+        },
+        # Local tenant shards (`manage.py migrate --database shard_1`)
+        'shard_1': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / "db_shard_1.sqlite3",
+        },
+        'shard_2': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / "db_shard_2.sqlite3",
+        },
     }
-    
+
+# Analytic reads (reports, dashboard, admin stats) go to this alias when set
+REPLICA_DATABASE_ALIAS = env('REPLICA_DATABASE_ALIAS', default=None)
+REPLICA_STICKY_SECONDS = 10          # a user reads from the primary this long after writing
+REPLICA_MAX_LAG_SECONDS = 5          # fall back to the primary when the replica lags more
+REPLICA_HEALTH_CHECK_INTERVAL = 5    # seconds between lag checks, per process
+
+# Databases an Organization.db_alias may point at; inventory data of each tenant lives on one
+DATABASE_SHARDS = ['default'] + [alias for alias in DATABASES if alias.startswith('shard_')]
+ORGANIZATION_DB_CACHE_SECONDS = 60   # how long a process trusts its cached Organization.db_alias
+
+DATABASE_ROUTERS = ['core.db_routers.ShardRouter', 'core.db_routers.ReplicaRouter']
+
+# Processes (spawned once per web worker) hashing passwords for bulk operator creation
+PASSWORD_HASHING_WORKERS = 4
+
+# Threads (one DB connection each) the async report views run their queries on
+REPORT_QUERY_WORKERS = 8
 
 
 ##================= Email Account Setup ====================
@@ -192,6 +238,39 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 
 
 
+# Paginated tables larger than this use estimated instead of exact counts
+PAGINATION_EXACT_COUNT_THRESHOLD = 10000
+PAGINATION_COUNT_CACHE_TIMEOUT = 300
+
+# Rows fetched per round trip by ?format=ndjson|csv streaming exports
+EXPORT_CHUNK_SIZE = 2000
+
+# Response compression (brotli preferred, else gzip). Levels per media type, `type/*` or `*`:
+# brotli quality 0-11, gzip 1-9. Streams are flushed every COMPRESSION_STREAM_FLUSH_BYTES of input.
+COMPRESSION_MIN_SIZE = 500
+COMPRESSION_STREAM_FLUSH_BYTES = 16384
+COMPRESSION_SKIP_TYPES = (
+    'application/pdf', 'application/zip', 'application/gzip', 'application/x-brotli',
+    'image/', 'audio/', 'video/', 'font/woff2',
+)
+COMPRESSION_LEVELS = {
+    'application/json': {'br': 5, 'gzip': 6},
+    'application/x-ndjson': {'br': 4, 'gzip': 6},   # exports: streamed, keep CPU per row low
+    'text/csv': {'br': 4, 'gzip': 6},
+    'application/vnd.sqlite3': {'br': 6, 'gzip': 6},
+    '*': {'br': 4, 'gzip': 6},
+}
+
+# POS catalog delta sync: max changes per page, how old a change must be before
+# it is handed out (lets slower transactions commit), and change-log retention
+CATALOG_SYNC_PAGE_SIZE = 1000
+CATALOG_SYNC_SETTLE_SECONDS = 2
+CATALOG_CHANGE_RETENTION_DAYS = 30
+
+# Rendered POS bootstrap catalog, cached per organization and catalog version
+POS_BOOTSTRAP_CACHE_TIMEOUT = 600
+
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -251,8 +330,64 @@ CSRF_TRUSTED_ORIGINS = [
 # Cache settings
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.utils.cache.MeteredLocMemCache',  # LocMemCache + hit/miss counts for /metrics
         'LOCATION': 'unique-snowflake',
         'TIMEOUT': 300,  # 5 minutes
     }
-}
\ No newline at end of file
+}
+
+# Admin analytics panels (product/supplier/customer stats) cache lifetime in seconds
+ADMIN_STATS_CACHE_TIMEOUT = 60
+
+
+# Request instrumentation (Server-Timing header + JSON log lines)
+SLOW_REQUEST_THRESHOLD_MS = 1000
+SLOW_REQUEST_SAMPLE_RATE = 1.0     # share of slow requests logged with their SQL
+SLOW_REQUEST_TRACE_QUERIES = 10
+
+# Slow-query log (SlowQuery table + `manage.py slow_queries`); None disables it
+SLOW_QUERY_THRESHOLD_MS = 200
+SLOW_QUERY_EXPLAIN = True
+SLOW_QUERY_EXPLAIN_PER_REQUEST = 1   # EXPLAIN the N slowest fingerprints of a request
+SLOW_QUERY_QUEUE_LIMIT = 100   # request batches waiting to be saved; later ones are only logged
+
+# On-demand request profiling (staff header or per-user admin toggle); off = no middleware at all
+PROFILING_ENABLED = env.bool('PROFILING_ENABLED', default=False)
+PROFILING_HEADER = 'X-Profile'
+# Not under MEDIA_ROOT: profiles are served only to staff, through /profiles/<name>
+PROFILING_DIR = BASE_DIR / 'var' / 'profiles'
+PROFILING_SAMPLE_INTERVAL_MS = 5
+PROFILING_USERS_CACHE_TIMEOUT = 30   # seconds until other workers see an admin profiling toggle
+
+# Offline POS catalog snapshots (SQLite files, one directory per organization)
+CATALOG_SNAPSHOT_DIR = MEDIA_ROOT / 'snapshots'
+CATALOG_SNAPSHOT_GRACE_SECONDS = 600   # a replaced snapshot stays this long for downloads already sent its ETag
+CATALOG_SNAPSHOT_KEEP_REPLACED = 2      # at most this many replaced snapshots per organization, grace or not
+# Seconds between builds per organization: checkouts change stock, and terminals catch up through sync anyway
+CATALOG_SNAPSHOT_MIN_INTERVAL = 300
+
+# /metrics (Prometheus). Each worker writes its values here; exited workers are folded into one archive file.
+METRICS_DIR = env('METRICS_DIR', default=os.path.join(tempfile.gettempdir(), 'inventory-metrics'))
+METRICS_FLUSH_INTERVAL = 1   # seconds between a worker's writes to METRICS_DIR
+METRICS_TOKEN = env('METRICS_TOKEN', default='')   # bearer token scrapers must send; empty keeps /metrics closed
+
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+        'accounts': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
@@ -22,12 +22,16 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import path, include
 
+from core.views.metrics_view import MetricsView
+from core.views.profiling_view import ProfileDownloadView
 
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("core.urls")),
     path("api/", include("accounts.urls")),
+    path("metrics", MetricsView.as_view(), name="metrics"),
+    path("profiles/<str:name>", ProfileDownloadView.as_view(), name="profile-download"),
 
 
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)